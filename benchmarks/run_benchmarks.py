@@ -0,0 +1,119 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from bloat_my_db import __version__
+from benchmarks.throwaway_postgres import ThrowawayPostgres
+from benchmarks.suites import (BenchmarkRecorder, benchmark_suites, bench_randoms, bench_table_plan, bench_build_schema, bench_feed_db,
+                               bench_csv_import, get_server_version)
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+database_suites = ['build_schema', 'feed_db', 'csv_import']
+default_results_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(description="Benchmarks bloat_my_db against a throwaway PostgreSQL cluster")
+    parser.add_argument('-suites', help="Which suites to run, default is all of them", nargs='+', choices=benchmark_suites)
+    parser.add_argument('-rows', help="Rows per table loaded by feed_db and csv_import, default is 50000", type=int, default=50000)
+    parser.add_argument('-randomValues', help="Values generated per randoms benchmark (a tenth of it for the per value Randoms), default is 1000000", type=int, default=1000000)
+    parser.add_argument('-chunkSize', help="Rows per chunk, default is 10000", type=int, default=10000)
+    parser.add_argument('-tableCounts', help="Sizes of the synthetic catalogs build_schema runs on, default is 10 100 1000", nargs='+', type=int, default=[10, 100, 1000])
+    parser.add_argument('-workers', help="Also runs feed_db and csv_import with this many workers, default is 4", type=int, default=4)
+    parser.add_argument('-repeat', help="Runs every benchmark N times and keeps the fastest, default is 3", type=int, default=3)
+    parser.add_argument('-pgBin', help="Directory of initdb and pg_ctl, default is the PATH, then PG_BIN, then the usual install locations", type=str)
+    parser.add_argument('-output', help="JSON results file, default is benchmarks/results/<version>_<date>.json", type=str)
+    parser.add_argument('-compare', help="JSON results of an earlier run, rates more than -threshold percent lower are reported as regressions", type=str)
+    parser.add_argument('-threshold', help="Percent a rate may drop against -compare before it counts as a regression, default is 10", type=float, default=10.0)
+    return parser.parse_args(args)
+
+
+def get_git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_output_path(args):
+    if args.output:
+        return args.output
+    return os.path.join(default_results_path, "{version}_{date}.json".format(
+        version=__version__.replace('+', '_'), date=time.strftime("%Y%m%d_%H%M%S")))
+
+
+def compare_results(results, baseline_path, threshold):
+    """Prints the rate change of every benchmark also in ``baseline_path``, returns the regressions."""
+    with open(baseline_path) as json_file:
+        baseline = json.load(json_file)
+    baseline_rates = {(result['benchmark'], result['variant']): result['rate'] for result in baseline['results']}
+    print("- Compared with {version} ({revision}) from {created}:".format(
+        version=baseline.get('version'), revision=baseline.get('git_revision'), created=baseline.get('created')))
+    regressions = []
+    for result in results:
+        key = (result['benchmark'], result['variant'])
+        if key not in baseline_rates:
+            continue
+        change = (result['rate'] / baseline_rates[key] - 1) * 100
+        regressed = change < -threshold
+        if regressed:
+            regressions.append(result)
+        print(" - {benchmark} [{variant}]: {change:+.1f}%{flag}".format(
+            benchmark=result['benchmark'], variant=result['variant'], change=change, flag=" REGRESSION" if regressed else ""))
+    return regressions
+
+
+def main(args):
+    args = parse_args(args)
+    suites = args.suites if args.suites else benchmark_suites
+    recorder = BenchmarkRecorder(repeat=args.repeat)
+    server_version = None
+
+    if 'randoms' in suites:
+        bench_randoms(recorder, args.randomValues)
+    if 'table_plan' in suites:
+        bench_table_plan(recorder, args.rows, args.chunkSize)
+    if any(suite in database_suites for suite in suites):
+        with ThrowawayPostgres(pg_bin=args.pgBin) as postgres:
+            server_version = get_server_version(postgres)
+            if 'build_schema' in suites:
+                bench_build_schema(recorder, postgres, args.tableCounts)
+            if 'feed_db' in suites:
+                bench_feed_db(recorder, postgres, args.rows, args.chunkSize, args.workers)
+            if 'csv_import' in suites:
+                bench_csv_import(recorder, postgres, args.rows, args.chunkSize, args.workers)
+
+    report = {
+        "version": __version__,
+        "git_revision": get_git_revision(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "postgres": server_version,
+        "settings": {"rows": args.rows, "random_values": args.randomValues, "chunk_size": args.chunkSize,
+                     "table_counts": args.tableCounts, "workers": args.workers, "repeat": args.repeat},
+        "results": recorder.results
+    }
+    output_path = get_output_path(args)
+    if os.path.dirname(output_path) and not os.path.exists(os.path.dirname(output_path)):
+        os.makedirs(os.path.dirname(output_path))
+    with open(output_path, 'w') as outfile:
+        outfile.write(json.dumps(report, indent=4))
+    print("- Saved benchmark results to {path}".format(path=output_path))
+
+    if args.compare and compare_results(recorder.results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,280 @@
+import contextlib
+import glob
+import logging
+import os
+import tempfile
+import time
+import numpy as np
+import psycopg2
+import bloat_my_db
+from bloat_my_db.randoms import Randoms
+from bloat_my_db.randoms.batch_randoms import BatchRandoms
+from bloat_my_db.randoms.value_pools import ValuePools
+from bloat_my_db.data_bloaters.column_plan import compile_table_plan
+from bloat_my_db.data_bloaters.pg_data_bloater import PgDataBloater
+from bloat_my_db.importers.csv_import import CsvImporter
+from bloat_my_db.loaders.pg_binary_encoder import encode_binary_batch
+from bloat_my_db.schema_builders.pg_schema_builder import PgSchemaBuilder
+from bloat_my_db.schema_analyzers.pg_schema_analyzer import PgSchemaAnalyzer
+from bloat_my_db.utilities.connection import ConnectionManager
+from bloat_my_db.utilities.db import DatabaseUtility
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+benchmark_suites = ['randoms', 'table_plan', 'build_schema', 'feed_db', 'csv_import']
+load_schema_sql = """
+CREATE TYPE account_role AS ENUM ('admin', 'member', 'guest');
+CREATE TABLE users (id uuid PRIMARY KEY, first_name varchar(100) NOT NULL, last_name text NOT NULL, phone_number text NOT NULL UNIQUE,
+                    created timestamp NOT NULL, active boolean NOT NULL, role account_role NOT NULL, balance numeric(12,2) NOT NULL, nickname text);
+CREATE TABLE products (id serial PRIMARY KEY, name text NOT NULL, price numeric(10,2) NOT NULL, stock integer NOT NULL, tags text[] NOT NULL);
+CREATE TABLE orders (id bigserial PRIMARY KEY, user_id uuid NOT NULL REFERENCES users(id), placed timestamp NOT NULL, shipped date NOT NULL,
+                     address inet NOT NULL, details jsonb NOT NULL);
+CREATE TABLE order_items (id uuid PRIMARY KEY, order_id bigint NOT NULL REFERENCES orders(id), product_id integer NOT NULL REFERENCES products(id),
+                          quantity integer NOT NULL, discount float8 NOT NULL);
+CREATE INDEX ON orders (placed);
+CREATE INDEX ON order_items (order_id);
+"""
+synthetic_table_sql = """
+CREATE TABLE t_{index:04d} (id serial PRIMARY KEY, {parent}name varchar(100) NOT NULL, email text, created timestamp NOT NULL,
+                            amount numeric(12,2), active boolean NOT NULL, role account_role NOT NULL, tags text[]);
+CREATE INDEX ON t_{index:04d} (created);
+"""
+
+
+@contextlib.contextmanager
+def quiet():
+    # the library reports its progress on stdout, keep it out of the timings output
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        yield
+
+
+def remove_generated_files(database):
+    # the schema builder and analyzer cache their output inside the package, don't leave the benchmark databases there
+    generated_path = os.path.join(os.path.dirname(bloat_my_db.__file__), 'generated')
+    for generation_type in ('schemas', 'analyzers'):
+        for file_path in glob.glob(os.path.join(generated_path, generation_type, '{database}_*.json'.format(database=database))):
+            os.unlink(file_path)
+
+
+class BenchmarkRecorder:
+    """Times every benchmark ``repeat`` times and keeps the best run, results are plain dicts ready for JSON."""
+
+    def __init__(self, repeat=3):
+        self.repeat = max(1, repeat)
+        self.results = []
+
+    def measure(self, benchmark, variant, work, amount, unit, setup=None):
+        timings = []
+        for attempt in range(self.repeat):
+            if setup:
+                with quiet():
+                    setup()
+            start = time.perf_counter()
+            with quiet():
+                work()
+            timings.append(time.perf_counter() - start)
+        seconds = min(timings)
+        result = {"benchmark": benchmark, "variant": variant, "seconds": seconds, "amount": amount, "unit": unit,
+                  "rate": amount / max(seconds, 1e-9), "timings": timings}
+        self.results.append(result)
+        print(" - {benchmark} [{variant}]: {rate:,.0f} {unit}/s ({seconds:.3f}s)".format(
+            benchmark=benchmark, variant=variant, rate=result['rate'], unit=unit, seconds=seconds))
+        return result
+
+
+def bench_randoms(recorder, size):
+    """Per value ``Randoms`` against the column at a time ``BatchRandoms``."""
+    scalar_size = max(1, size // 10)
+    recorder.measure('randoms', 'scalar get_hash', lambda: [Randoms.get_hash(25) for index in range(scalar_size)], scalar_size, 'values')
+    recorder.measure('randoms', 'batch get_hashes', lambda: BatchRandoms.get_hashes(size, 25), size, 'values')
+    recorder.measure('randoms', 'scalar get_datetime', lambda: [Randoms.get_datetime(2000) for index in range(scalar_size)], scalar_size, 'values')
+    recorder.measure('randoms', 'batch get_datetimes', lambda: BatchRandoms.get_datetimes(size, min_year=2000), size, 'values')
+    recorder.measure('randoms', 'scalar get_number', lambda: [Randoms.get_number() for index in range(scalar_size)], scalar_size, 'values')
+    recorder.measure('randoms', 'batch get_numbers', lambda: BatchRandoms.get_numbers(size), size, 'values')
+    recorder.measure('randoms', 'batch get_uuids', lambda: BatchRandoms.get_uuids(size), size, 'values')
+    recorder.measure('randoms', 'scalar get_faker_value first_name',
+                     lambda: [Randoms.get_faker_value('first_name') for index in range(scalar_size // 10)], scalar_size // 10, 'values')
+    with tempfile.TemporaryDirectory() as cache_directory:
+        value_pools = ValuePools(pool_size=10000, cache_directory=cache_directory)
+        recorder.measure('randoms', 'value pool generate first_name 10000', lambda: value_pools.generate_pool('first_name'), 10000, 'values')
+        rng = np.random.default_rng(0)
+        recorder.measure('randoms', 'value pool sample first_name', lambda: value_pools.sample('first_name', size, rng), size, 'values',
+                         setup=lambda: value_pools.get_pool('first_name'))
+
+
+def get_benchmark_columns():
+    parent_keys = BatchRandoms.get_uuids(10000, rng=np.random.default_rng(0))
+    columns = [
+        {'name': 'id', 'data_type': 'uuid', 'udt_name': 'uuid', 'is_nullable': False, 'constraint': {'pk': {'type': 'PRIMARY KEY'}}},
+        {'name': 'user_id', 'data_type': 'uuid', 'udt_name': 'uuid', 'is_nullable': False,
+         'constraint': {'fk': {'type': 'FOREIGN KEY', 'referenced_table': 'users', 'referenced_column': 'id'}}},
+        {'name': 'first_name', 'data_type': 'character varying', 'udt_name': 'varchar', 'character_maximum_length': 100, 'is_nullable': False},
+        {'name': 'code', 'data_type': 'text', 'udt_name': 'text', 'is_nullable': False},
+        {'name': 'created', 'data_type': 'timestamp without time zone', 'udt_name': 'timestamp', 'is_nullable': False},
+        {'name': 'active', 'data_type': 'boolean', 'udt_name': 'bool', 'is_nullable': False},
+        {'name': 'quantity', 'data_type': 'integer', 'udt_name': 'int4', 'is_nullable': False},
+        {'name': 'price', 'data_type': 'numeric', 'udt_name': 'numeric', 'numeric_precision': 10, 'numeric_scale': 2, 'is_nullable': False},
+        {'name': 'details', 'data_type': 'jsonb', 'udt_name': 'jsonb', 'is_nullable': False},
+        {'name': 'note', 'data_type': 'text', 'udt_name': 'text', 'is_nullable': True},
+    ]
+
+    def sample_keys(table_name, column_name, size, rng=None):
+        return parent_keys[rng.integers(0, len(parent_keys), size=size)]
+    return columns, sample_keys
+
+
+def bench_table_plan(recorder, rows, chunk_size):
+    """``TablePlan.build_batch`` (what replaced ``build_dataframe``) and the binary COPY encoding of its batches."""
+    columns, sample_keys = get_benchmark_columns()
+    plan = compile_table_plan('orders', columns, sample_keys, ValuePools(), lambda table, column: np.random.default_rng(0),
+                              lambda table, column: 1)
+    chunks = [(min(chunk_size, rows - start), start) for start in range(0, rows, chunk_size)]
+    batches = []
+
+    def build():
+        batches[:] = [plan.build_batch(size, np.random.default_rng(start), row_offset=start) for size, start in chunks]
+
+    def encode():
+        for batch in batches:
+            encode_binary_batch(batch)
+
+    recorder.measure('table_plan', 'build_batch {columns} columns'.format(columns=len(columns)), build, rows, 'rows')
+    encoded_bytes = sum(len(encode_binary_batch(batch).getvalue()) for batch in batches)
+    recorder.measure('table_plan', 'encode_binary_batch rows', encode, rows, 'rows')
+    recorder.measure('table_plan', 'encode_binary_batch bytes', encode, encoded_bytes, 'bytes')
+
+
+def create_synthetic_catalog(connection, table_count):
+    statements = ["CREATE TYPE account_role AS ENUM ('admin', 'member', 'guest');"]
+    for index in range(table_count):
+        # every table but the first references one of the tables before it, a tree four wide
+        parent = "parent_id integer NOT NULL REFERENCES t_{parent:04d}(id), ".format(parent=(index - 1) // 4) if index else ""
+        statements.append(synthetic_table_sql.format(index=index, parent=parent))
+    with connection.cursor() as cursor:
+        cursor.execute(''.join(statements))
+    connection.commit()
+
+
+def bench_build_schema(recorder, postgres, table_counts):
+    """``PgSchemaBuilder.build_schema`` on synthetic catalogs, forced to rebuild on every run."""
+    for table_count in table_counts:
+        database = 'bloat_benchmark_catalog_{count}'.format(count=table_count)
+        postgres.create_database(database)
+        connection_manager = ConnectionManager(postgres.get_conn_info(database))
+        with connection_manager.connection() as connection:
+            create_synthetic_catalog(connection, table_count)
+        builder = PgSchemaBuilder(connection_manager)
+        try:
+            recorder.measure('build_schema', '{count} tables'.format(count=table_count),
+                             lambda: builder.build_schema(force_rebuild=True), table_count, 'tables')
+        finally:
+            builder.close()
+            connection_manager.close_all()
+            remove_generated_files(database)
+
+
+def get_load_schema(connection_manager):
+    with quiet():
+        builder = PgSchemaBuilder(connection_manager)
+        schema = builder.build_schema(force_rebuild=True)
+        builder.close()
+        analyzer = PgSchemaAnalyzer(schema, connection_manager)
+        analyzed_schema = analyzer.build_analyzer_schema(force_rebuild=True)
+        analyzer.close()
+    return schema, analyzed_schema
+
+
+def truncate(connection_manager):
+    db_utility = DatabaseUtility(connection_manager)
+    db_utility.truncate_db()
+    db_utility.close()
+
+
+def feed(connection_manager, analyzed_schema, rows, chunk_size, workers, conflict_mode='merge'):
+    bloater = PgDataBloater(analyzed_schema, connection_manager, chunk_size=chunk_size, workers=workers, conflict_mode=conflict_mode,
+                            entropy=1, show_progress=False)
+    try:
+        bloater.feed_db(rows)
+    finally:
+        bloater.close()
+
+
+def setup_load_database(postgres, database):
+    postgres.create_database(database)
+    connection_manager = ConnectionManager(postgres.get_conn_info(database))
+    with connection_manager.connection() as connection, connection.cursor() as cursor:
+        cursor.execute(load_schema_sql)
+        connection.commit()
+    schema, analyzed_schema = get_load_schema(connection_manager)
+    # builds the Faker value pools once, outside the timings
+    with quiet():
+        truncate(connection_manager)
+        feed(connection_manager, analyzed_schema, 100, 100, 1)
+    return connection_manager, analyzed_schema
+
+
+def bench_feed_db(recorder, postgres, rows, chunk_size, workers):
+    """``PgDataBloater.feed_db`` into an emptied database, rows are counted over every table."""
+    database = 'bloat_benchmark_feed'
+    connection_manager, analyzed_schema = setup_load_database(postgres, database)
+    total_rows = rows * len(analyzed_schema)
+    try:
+        for worker_count in sorted({1, workers}):
+            for conflict_mode in ('direct', 'merge'):
+                recorder.measure('feed_db', '{workers} workers {mode}'.format(workers=worker_count, mode=conflict_mode),
+                                 lambda: feed(connection_manager, analyzed_schema, rows, chunk_size, worker_count, conflict_mode),
+                                 total_rows, 'rows', setup=lambda: truncate(connection_manager))
+    finally:
+        connection_manager.close_all()
+        remove_generated_files(database)
+
+
+def export_tables(connection_manager, analyzed_schema, export_path):
+    """Dumps the loaded tables as ``<table>.csv`` files, the rows the importer is benchmarked with."""
+    total_bytes = 0
+    with connection_manager.connection() as connection, connection.cursor() as cursor:
+        for value in analyzed_schema.values():
+            table = list(value.keys())[0]
+            file_path = os.path.join(export_path, '{table}.csv'.format(table=table))
+            with open(file_path, 'wb') as outfile:
+                cursor.copy_expert('COPY "{table}" TO STDOUT WITH (FORMAT csv, HEADER)'.format(table=table), outfile)
+            total_bytes += os.path.getsize(file_path)
+        connection.rollback()
+    return total_bytes
+
+
+def bench_csv_import(recorder, postgres, rows, chunk_size, workers):
+    """``CsvImporter.import_db`` of a directory of plain CSVs dumped from a bloated database."""
+    database = 'bloat_benchmark_import'
+    connection_manager, analyzed_schema = setup_load_database(postgres, database)
+    try:
+        with quiet():
+            truncate(connection_manager)
+            feed(connection_manager, analyzed_schema, rows, chunk_size, 1)
+        with tempfile.TemporaryDirectory() as export_path:
+            total_bytes = export_tables(connection_manager, analyzed_schema, export_path)
+            for worker_count in sorted({1, workers}):
+                def work():
+                    importer = CsvImporter(analyzed_schema, connection_manager, workers=worker_count)
+                    try:
+                        importer.import_db(export_path, analyzed_schema, database)
+                    finally:
+                        importer.close()
+                recorder.measure('csv_import', '{workers} workers'.format(workers=worker_count), work, total_bytes, 'bytes',
+                                 setup=lambda: truncate(connection_manager))
+    finally:
+        connection_manager.close_all()
+        remove_generated_files(database)
+
+
+def get_server_version(postgres):
+    connection = psycopg2.connect(**postgres.get_conn_info('postgres'))
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW server_version')
+            return cursor.fetchone()[0]
+    finally:
+        connection.close()
@@ -0,0 +1,83 @@
+import glob
+import logging
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+# where distributions install the server binaries when they aren't on the PATH
+pg_bin_patterns = ['/usr/lib/postgresql/*/bin', '/usr/pgsql-*/bin', '/usr/local/pgsql/bin', '/opt/homebrew/opt/postgresql*/bin']
+
+
+def find_pg_bin(pg_bin=None):
+    if pg_bin:
+        return pg_bin
+    if os.getenv('PG_BIN'):
+        return os.getenv('PG_BIN')
+    if shutil.which('initdb'):
+        return os.path.dirname(shutil.which('initdb'))
+    candidates = sorted(path for pattern in pg_bin_patterns for path in glob.glob(pattern) if os.path.exists(os.path.join(path, 'initdb')))
+    if not candidates:
+        raise Exception("initdb not found, put the PostgreSQL bin directory on the PATH or pass -pgBin!")
+    return candidates[-1]
+
+
+def get_free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+class ThrowawayPostgres:
+    """A PostgreSQL cluster created with ``initdb`` in a temporary directory, removed again on exit.
+
+    The server only listens on a unix socket inside that directory, so it never clashes
+    with a server already running on the machine.
+    """
+
+    def __init__(self, pg_bin=None, settings=None, user='postgres'):
+        self.pg_bin = find_pg_bin(pg_bin)
+        self.settings = settings if settings else dict()
+        self.user = user
+        self.port = get_free_port()
+        self.directory = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def run(self, command, *arguments):
+        subprocess.run([os.path.join(self.pg_bin, command)] + list(arguments), check=True, stdout=subprocess.DEVNULL)
+
+    def start(self):
+        self.directory = tempfile.mkdtemp(prefix='bloat_benchmark_')
+        data_directory = os.path.join(self.directory, 'data')
+        print("- Creating a throwaway PostgreSQL cluster in {path}...".format(path=self.directory))
+        self.run('initdb', '-D', data_directory, '-U', self.user, '-A', 'trust', '-E', 'UTF8', '--no-sync')
+        options = ["-p {port}".format(port=self.port), "-k {directory}".format(directory=self.directory), "-c listen_addresses=''"]
+        options += ["-c {name}={value}".format(name=name, value=value) for name, value in self.settings.items()]
+        self.run('pg_ctl', '-D', data_directory, '-l', os.path.join(self.directory, 'server.log'), '-o', ' '.join(options), '-w', 'start')
+
+    def stop(self):
+        if self.directory is None:
+            return
+        try:
+            self.run('pg_ctl', '-D', os.path.join(self.directory, 'data'), '-m', 'immediate', '-w', 'stop')
+        finally:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
+
+    def create_database(self, database):
+        self.run('createdb', '-h', self.directory, '-p', str(self.port), '-U', self.user, database)
+
+    def get_conn_info(self, database):
+        return {"host": self.directory, "port": self.port, "database": database, "user": self.user, "password": ""}
@@ -0,0 +1,318 @@
+import logging
+import numpy as np
+from bloat_my_db.randoms.batch_randoms import BatchRandoms
+from bloat_my_db.randoms.value_pools import get_semantic_type
+from bloat_my_db.data_bloaters.row_batch import RowBatch
+from bloat_my_db.loaders.pg_binary_encoder import get_type_name, get_numeric_scale
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+text_type_names = ('varchar', 'text', 'bpchar', 'name')
+integer_type_names = ('int2', 'int4', 'int8')
+default_text_length = 25
+
+
+class ColumnGenerator:
+    """Produces the values of one column for a chunk, bound to everything it needs when the plan is compiled."""
+
+    def generate(self, size, rng, row_offset):
+        raise NotImplementedError
+
+
+class NullGenerator(ColumnGenerator):
+    def generate(self, size, rng, row_offset):
+        return None
+
+
+class ConstantGenerator(ColumnGenerator):
+    def __init__(self, value):
+        self.value = value
+
+    def generate(self, size, rng, row_offset):
+        return np.full(size, self.value)
+
+
+class ForeignKeyGenerator(ColumnGenerator):
+    def __init__(self, sample_keys, referenced_table, referenced_column):
+        self.sample_keys = sample_keys
+        self.referenced_table = referenced_table
+        self.referenced_column = referenced_column
+
+    def generate(self, size, rng, row_offset):
+        return self.sample_keys(self.referenced_table, self.referenced_column, size, rng=rng)
+
+
+class UuidGenerator(ColumnGenerator):
+    def generate(self, size, rng, row_offset):
+        return BatchRandoms.get_uuids(size, rng=rng)
+
+
+class HashGenerator(ColumnGenerator):
+    def __init__(self, length):
+        self.length = length
+
+    def generate(self, size, rng, row_offset):
+        return BatchRandoms.get_hashes(size, self.length, rng=rng)
+
+
+class PoolTextGenerator(ColumnGenerator):
+    def __init__(self, value_pools, semantic_type, max_length=None):
+        self.value_pools = value_pools
+        self.semantic_type = semantic_type
+        self.max_length = max_length
+
+    def generate(self, size, rng, row_offset):
+        values = self.value_pools.sample(self.semantic_type, size, rng)
+        if self.max_length:
+            values = values.astype('U{length}'.format(length=self.max_length))
+        return values
+
+
+class UniquePoolTextGenerator(ColumnGenerator):
+    """Walks one permutation of the value pool by row offset, so values never repeat across chunks or shards."""
+
+    def __init__(self, value_pools, semantic_type, permutation_rng, max_length=None):
+        self.value_pools = value_pools
+        self.semantic_type = semantic_type
+        self.permutation_rng = permutation_rng
+        self.max_length = max_length
+        self.permutation = None
+
+    def generate(self, size, rng, row_offset):
+        if self.permutation is None:
+            self.permutation = self.value_pools.get_permutation(self.semantic_type, self.permutation_rng)
+        return self.value_pools.take_unique(self.semantic_type, self.permutation, row_offset, size, max_length=self.max_length)
+
+
+class DatetimeGenerator(ColumnGenerator):
+    def __init__(self, min_year):
+        self.min_year = min_year
+
+    def generate(self, size, rng, row_offset):
+        return BatchRandoms.get_datetimes(size, min_year=self.min_year, rng=rng)
+
+
+class BooleanGenerator(ColumnGenerator):
+    def generate(self, size, rng, row_offset):
+        return BatchRandoms.get_booleans(size, rng=rng)
+
+
+class ListGenerator(ColumnGenerator):
+    def __init__(self, values):
+        self.values = np.asarray(values)
+
+    def generate(self, size, rng, row_offset):
+        return self.values[rng.integers(0, len(self.values), size=size)]
+
+
+class NumberGenerator(ColumnGenerator):
+    def generate(self, size, rng, row_offset):
+        return BatchRandoms.get_numbers(size, rng=rng)
+
+
+class IntegerGenerator(ColumnGenerator):
+    def __init__(self, low, high):
+        self.low = low
+        self.high = high
+
+    def generate(self, size, rng, row_offset):
+        return BatchRandoms.get_integers(size, self.low, self.high, rng=rng)
+
+
+class SequenceGenerator(ColumnGenerator):
+    """Integer keys counting up from ``start`` by row offset, unique across chunks and shards."""
+
+    def __init__(self, start):
+        self.start = start
+
+    def generate(self, size, rng, row_offset):
+        return np.arange(self.start + row_offset, self.start + row_offset + size, dtype=np.int64)
+
+
+class FloatGenerator(ColumnGenerator):
+    def generate(self, size, rng, row_offset):
+        return BatchRandoms.get_floats(size, rng=rng)
+
+
+class DecimalGenerator(ColumnGenerator):
+    def __init__(self, precision, scale):
+        self.precision = precision
+        self.scale = scale
+
+    def generate(self, size, rng, row_offset):
+        return BatchRandoms.get_decimals(size, self.precision, self.scale, rng=rng)
+
+
+class DateGenerator(ColumnGenerator):
+    def __init__(self, min_year):
+        self.min_year = min_year
+
+    def generate(self, size, rng, row_offset):
+        return BatchRandoms.get_dates(size, min_year=self.min_year, rng=rng)
+
+
+class JsonGenerator(ColumnGenerator):
+    def generate(self, size, rng, row_offset):
+        return BatchRandoms.get_json_documents(size, rng=rng)
+
+
+class BytesGenerator(ColumnGenerator):
+    def __init__(self, length):
+        self.length = length
+
+    def generate(self, size, rng, row_offset):
+        return BatchRandoms.get_bytes(size, self.length, rng=rng)
+
+
+class Ipv4Generator(ColumnGenerator):
+    def generate(self, size, rng, row_offset):
+        return BatchRandoms.get_ipv4s(size, rng=rng)
+
+
+class ArrayGenerator(ColumnGenerator):
+    def __init__(self, element_generator):
+        self.element_generator = element_generator
+
+    def generate(self, size, rng, row_offset):
+        return BatchRandoms.get_arrays(size, lambda count: self.element_generator.generate(count, rng, 0), rng=rng)
+
+
+class TablePlan:
+    """The column generators of one table, compiled once and run for every chunk."""
+
+    def __init__(self, table_name, columns, generators, unsupported_columns=None, column_types=None):
+        self.table_name = table_name
+        self.columns = columns
+        self.generators = generators
+        self.unsupported_columns = unsupported_columns if unsupported_columns else []
+        self.column_types = column_types if column_types else [None] * len(columns)
+
+    def build_batch(self, size, rng, row_offset=0):
+        batch = RowBatch(size)
+        for column, generator, column_type in zip(self.columns, self.generators, self.column_types):
+            batch.add_column(column, generator.generate(size, rng, row_offset), column_type)
+        return batch
+
+
+def get_constraint_types(column):
+    return {constraint['type']: constraint for constraint in reversed(list(column.get('constraint', {}).values()))}
+
+
+def get_text_length(column):
+    max_length = column.get('character_maximum_length')
+    return min(default_text_length, max_length) if max_length else default_text_length
+
+
+def compile_text_generator(column, value_pools):
+    semantic_type = get_semantic_type(column.get('name'))
+    if semantic_type:
+        return PoolTextGenerator(value_pools, semantic_type, column.get('character_maximum_length'))
+    return HashGenerator(get_text_length(column))
+
+
+def compile_value_generator(column, value_pools):
+    """Returns the generator of the values of a column type, ``None`` when the type isn't supported."""
+    if column.get('data_type') == 'ARRAY':
+        element_type = column.get('element_type', {})
+        element_column = {'udt_name': element_type.get('name')}
+        if element_type.get('values') is not None:
+            element_column.update(data_type='USER-DEFINED', user_defined_type={'values': element_type['values']})
+        element_generator = compile_value_generator(element_column, value_pools)
+        return ArrayGenerator(element_generator) if element_generator else None
+
+    type_name = get_type_name(column)
+    if type_name in text_type_names:
+        return compile_text_generator(column, value_pools)
+    elif type_name == 'enum':
+        values = column.get('user_defined_type', {}).get('values')
+        return ListGenerator(values) if values else None
+    elif type_name == 'bool':
+        return BooleanGenerator()
+    elif type_name in ('int2', 'int4'):
+        return NumberGenerator()
+    elif type_name == 'int8':
+        return IntegerGenerator(1, 10 ** 12)
+    elif type_name in ('float4', 'float8'):
+        return FloatGenerator()
+    elif type_name == 'numeric':
+        return DecimalGenerator(column.get('numeric_precision') or 12, get_numeric_scale(column))
+    elif type_name == 'date':
+        return DateGenerator(2000)
+    elif type_name in ('timestamp', 'timestamptz'):
+        return DatetimeGenerator(2000)
+    elif type_name == 'uuid':
+        return UuidGenerator()
+    elif type_name in ('json', 'jsonb'):
+        return JsonGenerator()
+    elif type_name == 'bytea':
+        return BytesGenerator(16)
+    elif type_name == 'inet':
+        return Ipv4Generator()
+    return None
+
+
+def compile_key_generator(table_name, column, constraint_types, value_pools, get_permutation_rng, get_key_start):
+    """Generators of primary key and unique columns, ``None`` when no type specific unique generator exists."""
+    type_name = get_type_name(column)
+    semantic_type = get_semantic_type(column['name'])
+    if type_name == 'uuid':
+        return UuidGenerator()
+    elif type_name in text_type_names and 'PRIMARY KEY' not in constraint_types and semantic_type:
+        return UniquePoolTextGenerator(value_pools, semantic_type, get_permutation_rng(table_name, column['name']),
+                                       column.get('character_maximum_length'))
+    elif type_name in text_type_names:
+        return HashGenerator(get_text_length(column))
+    elif type_name in integer_type_names:
+        return SequenceGenerator(get_key_start(table_name, column['name']))
+    return None
+
+
+def compile_column_generator(table_name, column, sample_keys, value_pools, get_permutation_rng, get_key_start):
+    """Returns the generator of one column, ``None`` when its data type isn't supported."""
+    # nullable columns are left NULL
+    if column['is_nullable']:
+        return NullGenerator()
+
+    constraint_types = get_constraint_types(column)
+    if 'FOREIGN KEY' in constraint_types:
+        constraint = constraint_types['FOREIGN KEY']
+        return ForeignKeyGenerator(sample_keys, constraint['referenced_table'], constraint['referenced_column'])
+    elif 'PRIMARY KEY' in constraint_types or 'UNIQUE' in constraint_types:
+        return compile_key_generator(table_name, column, constraint_types, value_pools, get_permutation_rng, get_key_start)
+    return compile_value_generator(column, value_pools)
+
+
+def compile_table_plan(table_name, columns, sample_keys, value_pools, get_permutation_rng, get_key_start):
+    names, generators, unsupported_columns = [], [], []
+    for column in columns:
+        generator = compile_column_generator(table_name, column, sample_keys, value_pools, get_permutation_rng, get_key_start)
+        if generator is None:
+            unsupported_columns.append((column['name'], column['data_type']))
+            generator = NullGenerator()
+        names.append(column['name'])
+        generators.append(generator)
+    return TablePlan(table_name, names, generators, unsupported_columns, column_types=list(columns))
+
+
+def compile_csv_template_plan(table_name, columns, sample_keys):
+    """The plan behind the ``-buildCSVSchema`` files: keys are filled in, every other column is a placeholder to edit."""
+    names, generators = [], []
+    for column in columns:
+        constraint_types = get_constraint_types(column)
+        if 'FOREIGN KEY' in constraint_types:
+            constraint = constraint_types['FOREIGN KEY']
+            generator = ForeignKeyGenerator(sample_keys, constraint['referenced_table'], constraint['referenced_column'])
+        elif 'PRIMARY KEY' in constraint_types and column['data_type'] == 'uuid':
+            generator = UuidGenerator()
+        elif constraint_types:
+            generator = ConstantGenerator("")
+        elif column['is_nullable']:
+            generator = ConstantGenerator("NOT NULL")
+        else:
+            generator = ConstantGenerator("")
+        names.append(column['name'])
+        generators.append(generator)
+    return TablePlan(table_name, names, generators)
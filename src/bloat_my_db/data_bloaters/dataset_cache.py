@@ -0,0 +1,155 @@
+import logging
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+import numpy as np
+from bloat_my_db.data_bloaters.row_batch import RowBatch, ArrayColumn
+from bloat_my_db.randoms import get_faker_version
+from bloat_my_db.options import default_dataset_cache_size
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+# bumped when generated values or the chunk layout change, so older entries are never replayed
+dataset_format_version = 1
+manifest_file_name = 'manifest.json'
+abandoned_entry_age = 24 * 60 * 60
+
+
+def get_directory_size(path):
+    size = 0
+    for root, directories, files in os.walk(path):
+        size += sum(os.path.getsize(os.path.join(root, file)) for file in files)
+    return size
+
+
+class DatasetCache:
+    """Keeps the chunks of a seeded ``-populateRandomData`` run on disk so later runs replay them instead of generating.
+
+    An entry is keyed by everything the generated values depend on (schema fingerprint,
+    seed, rows, chunk size, integer key starts, value pool size and Faker version) and
+    holds one directory per chunk with a ``.npy`` file per column, read back memory
+    mapped. Only entries whose run finished get a manifest and are replayed. Entries
+    beyond ``max_bytes`` are evicted least recently used first.
+    """
+
+    def __init__(self, max_bytes=default_dataset_cache_size * 1024 * 1024, cache_directory=None):
+        self.max_bytes = max_bytes
+        self.cache_directory = cache_directory if cache_directory else os.path.join(
+            os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)), 'generated', 'datasets')
+
+    @staticmethod
+    def get_entry_key(fingerprint, seed, rows, chunk_size, key_starts, value_pool_size, table_rows=None):
+        identity = {
+            'format': dataset_format_version, 'fingerprint': fingerprint, 'seed': str(seed), 'rows': rows, 'chunk_size': chunk_size,
+            'key_starts': sorted("{table}.{column}={start}".format(table=table, column=column, start=start)
+                                 for (table, column), start in key_starts.items()),
+            'value_pool_size': value_pool_size, 'faker': get_faker_version()
+        }
+        # only part of the key when set, entries of runs with the same rows everywhere keep their key
+        if table_rows:
+            identity['table_rows'] = table_rows
+        return hashlib.sha256(json.dumps(identity, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+    def get_entry_path(self, entry_key):
+        return os.path.join(self.cache_directory, entry_key)
+
+    def get_chunk_path(self, entry_key, table_name, chunk_index):
+        return os.path.join(self.get_entry_path(entry_key), table_name, "{index:08d}".format(index=chunk_index))
+
+    def is_complete(self, entry_key):
+        return os.path.exists(os.path.join(self.get_entry_path(entry_key), manifest_file_name))
+
+    def write_chunk(self, entry_key, table_name, chunk_index, batch):
+        chunk_path = self.get_chunk_path(entry_key, table_name, chunk_index)
+        if os.path.exists(chunk_path):
+            return
+        # written under a unique name first, the chunk only appears once every column is on disk
+        temporary_path = "{path}.{name}".format(path=chunk_path, name=uuid.uuid4().hex)
+        os.makedirs(temporary_path)
+        for index, values in enumerate(batch.values):
+            if values is None:
+                continue
+            if isinstance(values, ArrayColumn):
+                np.save(os.path.join(temporary_path, "{index}.values.npy".format(index=index)), values.values, allow_pickle=True)
+                np.save(os.path.join(temporary_path, "{index}.lengths.npy".format(index=index)), values.lengths)
+            else:
+                np.save(os.path.join(temporary_path, "{index}.npy".format(index=index)), values, allow_pickle=True)
+        os.replace(temporary_path, chunk_path)
+
+    @staticmethod
+    def load_array(file_path):
+        try:
+            return np.load(file_path, mmap_mode='r')
+        except ValueError:
+            # object arrays (values read back from the database) can't be memory mapped
+            return np.load(file_path, allow_pickle=True)
+
+    def read_chunk(self, entry_key, table_plan, chunk_index, size):
+        chunk_path = self.get_chunk_path(entry_key, table_plan.table_name, chunk_index)
+        if not os.path.exists(chunk_path):
+            return None
+        batch = RowBatch(size)
+        for index, (column, column_type) in enumerate(zip(table_plan.columns, table_plan.column_types)):
+            file_path = os.path.join(chunk_path, "{index}.npy".format(index=index))
+            values = None
+            if os.path.exists(file_path):
+                values = self.load_array(file_path)
+            elif os.path.exists(os.path.join(chunk_path, "{index}.lengths.npy".format(index=index))):
+                values = ArrayColumn(self.load_array(os.path.join(chunk_path, "{index}.values.npy".format(index=index))),
+                                     self.load_array(os.path.join(chunk_path, "{index}.lengths.npy".format(index=index))))
+            batch.add_column(column, values, column_type)
+        return batch
+
+    def clear(self, entry_key):
+        shutil.rmtree(self.get_entry_path(entry_key), ignore_errors=True)
+
+    def complete(self, entry_key, details):
+        manifest = dict(details, created=time.strftime("%Y-%m-%dT%H:%M:%S"), size=get_directory_size(self.get_entry_path(entry_key)))
+        with open(os.path.join(self.get_entry_path(entry_key), manifest_file_name), 'w') as outfile:
+            outfile.write(json.dumps(manifest, indent=4))
+        self.evict(keep=entry_key)
+
+    def touch(self, entry_key):
+        # the manifest mtime is the entry's last use
+        os.utime(os.path.join(self.get_entry_path(entry_key), manifest_file_name))
+
+    def get_entries(self):
+        if not os.path.exists(self.cache_directory):
+            return []
+        entries = []
+        for entry_key in os.listdir(self.cache_directory):
+            entry_path = self.get_entry_path(entry_key)
+            if not os.path.isdir(entry_path):
+                continue
+            manifest_path = os.path.join(entry_path, manifest_file_name)
+            if os.path.exists(manifest_path):
+                with open(manifest_path) as json_file:
+                    size = json.load(json_file).get('size', 0)
+                entries.append((os.path.getmtime(manifest_path), entry_key, size))
+            else:
+                last_written = max([os.path.getmtime(entry_path)] + [os.path.getmtime(os.path.join(entry_path, table)) for table in os.listdir(entry_path)])
+                entries.append((last_written, entry_key, None))
+        return sorted(entries)
+
+    def evict(self, keep=None):
+        entries = [entry for entry in self.get_entries() if entry[1] != keep]
+        # entries without a manifest are still being written or come from runs that died, those are never replayed
+        for last_used, entry_key, size in [entry for entry in entries if entry[2] is None]:
+            if time.time() - last_used > abandoned_entry_age:
+                self.clear(entry_key)
+        entries = [entry for entry in entries if entry[2] is not None]
+        total_size = sum(size for last_used, entry_key, size in entries)
+        if keep and self.is_complete(keep):
+            total_size += get_directory_size(self.get_entry_path(keep))
+        for last_used, entry_key, size in entries:
+            if total_size <= self.max_bytes:
+                break
+            print("- Evicting dataset cache entry {entry} ({size:.1f} MB)".format(entry=entry_key, size=size / 1e6))
+            self.clear(entry_key)
+            total_size -= size
@@ -0,0 +1,153 @@
+import logging
+import threading
+from contextlib import nullcontext
+from multiprocessing import Manager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from progress.bar import Bar
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+
+def get_insertion_levels(analyzed_schema):
+    """Groups the analyzed schema tables by their insertion level, in level order.
+
+    Analyzer files built before levels were recorded have no ``insertion_level``, every
+    table of those gets a level of its own so they are still filled one at a time.
+    """
+    levels = dict()
+    for key, value in analyzed_schema.items():
+        table = list(value.keys())[0]
+        level = value[table]['@table_metadata'].get('insertion_level')
+        if level is None:
+            level = "order_{key}".format(key=key)
+        levels.setdefault(level, []).append(table)
+    return list(levels.items())
+
+
+def get_shards(how_many, shards, chunk_size=1):
+    """Splits ``how_many`` rows into at most ``shards`` (shard_index, rows) parts of near equal size.
+
+    Shards hold whole ``chunk_size`` chunks (the last one may be short), every chunk has its
+    own random stream, so the rows don't change with the number of shards.
+    """
+    chunks = -(-how_many // chunk_size)
+    shards = max(1, min(shards, chunks))
+    base, remainder = divmod(chunks, shards)
+    shard_rows = []
+    rows_left = how_many
+    for shard_index in range(shards):
+        rows = min(rows_left, (base + (1 if shard_index < remainder else 0)) * chunk_size)
+        shard_rows.append((shard_index, rows))
+        rows_left -= rows
+    return shard_rows
+
+
+def get_shard_offsets(shards):
+    """Adds the row offset of every shard, ``[(shard_index, row_offset, rows)]``."""
+    row_offset = 0
+    shard_offsets = []
+    for shard_index, rows in shards:
+        shard_offsets.append((shard_index, row_offset, rows))
+        row_offset += rows
+    return shard_offsets
+
+
+def populate_table_worker(analyzed_schema, connection_manager, options, table_name, shard_index, row_offset, how_many, parent_keys, progress_queue):
+    # imported here, the bloater module imports this one
+    from bloat_my_db.data_bloaters.pg_data_bloater import PgDataBloater
+
+    bloater = PgDataBloater(analyzed_schema, connection_manager, show_progress=False, **options)
+    try:
+        for (parent_table, parent_column), segments in parent_keys.items():
+            bloater.key_registry.import_segments(parent_table, parent_column, segments)
+        with bloater.profiler.profile() if bloater.profiler else nullcontext():
+            rows_landed = bloater.populate_table(how_many, table_name, bloater.get_table_columns(table_name),
+                                                 on_chunk=progress_queue.put, row_offset=row_offset, shard_index=shard_index)
+        landed_keys = dict()
+        for column in bloater.referenced_columns.get(table_name, set()):
+            landed_keys[(table_name, column)] = bloater.key_registry.export_segments(table_name, column)
+        profile_parts = bloater.profiler.part_paths if bloater.profiler else []
+        return table_name, shard_index, rows_landed, landed_keys, bloater.metrics.tables, profile_parts
+    finally:
+        bloater.key_registry.close()
+        bloater.close()
+
+
+class LevelScheduler:
+    """Fills the tables of one insertion level concurrently, each in its own worker process and connection.
+
+    A level is only started once every table of the levels before it is committed, and
+    the keys each worker generated are handed on to the workers of later levels. With
+    ``shards`` > 1 the rows of every table are split further, each shard is generated
+    from its own sub-seed and streamed by a separate worker.
+    """
+
+    def __init__(self, bloater, workers, shards=1):
+        self.bloater = bloater
+        self.workers = workers
+        self.shards = shards
+
+    def get_parent_keys(self, table_name):
+        parent_keys = dict()
+        for column in self.bloater.get_table_columns(table_name):
+            for constraint in column.get('constraint', {}).values():
+                if constraint['type'] != 'FOREIGN KEY':
+                    continue
+                registry_key = (constraint['referenced_table'], constraint['referenced_column'])
+                if self.bloater.key_registry.has(*registry_key):
+                    parent_keys[registry_key] = self.bloater.key_registry.export_segments(*registry_key)
+        return parent_keys
+
+    @staticmethod
+    def report_progress(progress_queue, progress_bar):
+        while True:
+            rows = progress_queue.get()
+            if rows is None:
+                break
+            progress_bar.next(rows)
+
+    def run(self, how_many):
+        options = dict(self.bloater.options, key_spill_directory=self.bloater.key_registry.get_spill_directory(),
+                       key_starts=self.bloater.key_starts, dataset_entry=self.bloater.dataset_entry, dataset_replay=self.bloater.dataset_replay,
+                       size_budgets=self.bloater.size_budgets)
+        levels = get_insertion_levels(self.bloater.analyzed_schema)
+        with Manager() as manager, ProcessPoolExecutor(max_workers=self.workers) as executor:
+            progress_queue = manager.Queue()
+            for level_index, (level, tables) in enumerate(levels):
+                tasks = [(table, shard_index, row_offset, rows) for table in tables
+                         for shard_index, row_offset, rows in get_shard_offsets(get_shards(self.bloater.get_table_rows(table, how_many), self.shards, self.bloater.chunk_size))]
+                progress_bar = Bar('- Populating level {level} ({count} tables, {tasks} shards) '.format(
+                    level=level, count=len(tables), tasks=len(tasks)), max=sum(self.bloater.get_table_rows(table, how_many) for table in tables))
+                reporter = threading.Thread(target=self.report_progress, args=(progress_queue, progress_bar))
+                reporter.start()
+
+                rows_landed = dict()
+                shard_keys = dict()
+                try:
+                    futures = [executor.submit(populate_table_worker, self.bloater.analyzed_schema, self.bloater.connection_manager, options,
+                                               table, shard_index, row_offset, rows, self.get_parent_keys(table), progress_queue)
+                               for table, shard_index, row_offset, rows in tasks]
+                    for future in as_completed(futures):
+                        table_name, shard_index, shard_rows_landed, landed_keys, table_metrics, profile_parts = future.result()
+                        rows_landed[table_name] = rows_landed.get(table_name, 0) + shard_rows_landed
+                        shard_keys[(table_name, shard_index)] = landed_keys
+                        self.bloater.metrics.merge(table_metrics)
+                        if self.bloater.profiler:
+                            self.bloater.profiler.add_parts(profile_parts)
+                finally:
+                    progress_queue.put(None)
+                    reporter.join()
+                    progress_bar.finish()
+
+                # keys are registered in shard order, the order a single process would have written them in
+                for table_shard in sorted(shard_keys):
+                    for (parent_table, parent_column), segments in shard_keys[table_shard].items():
+                        self.bloater.key_registry.import_segments(parent_table, parent_column, segments)
+                for table_name in tables:
+                    self.bloater.display_table_result(table_name, rows_landed.get(table_name, 0))
+                if self.bloater.target_size is not None:
+                    self.bloater.plan_target_rows([table for next_level, next_tables in levels[level_index + 1:] for table in next_tables])
@@ -1,18 +1,22 @@
-import argparse
+from contextlib import nullcontext
 import logging
 import sys
-import os
-import uuid
-import random
-import psycopg2
-from psycopg2 import sql
-import psycopg2.extras as psql_extras
-from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+import time
+import numpy as np
+from psycopg2 import OperationalError, InterfaceError
 from progress.bar import Bar
-import pandas as pd
-from bloat_my_db.randoms import Randoms
-
-from bloat_my_db import __version__
+from bloat_my_db.randoms.value_pools import ValuePools, default_pool_size
+from bloat_my_db.randoms.seeding import new_entropy, derive_rng
+from bloat_my_db.data_bloaters.row_batch import RowBatch
+from bloat_my_db.data_bloaters.column_plan import compile_table_plan
+from bloat_my_db.data_bloaters.target_size import get_target_rows, format_size, default_sample_rows
+from bloat_my_db.loaders.pg_copy_loader import PgCopyLoader
+from bloat_my_db.utilities.key_pool import KeyPool
+from bloat_my_db.utilities.key_registry import KeyRegistry
+from bloat_my_db.utilities.file import FileUtility
+from bloat_my_db.utilities.run_metrics import RunMetrics
+from bloat_my_db.utilities.profiler import Profiler
+from bloat_my_db.data_bloaters.level_scheduler import LevelScheduler
 
 __author__ = "Jason R Alexander"
 __copyright__ = "Jason R Alexander"
@@ -23,105 +27,421 @@ _logger = logging.getLogger(__name__)
 
 class PgDataBloater:
 
-    def __init__(self, analyzed_schema, conn_info):
-        self.connection = psycopg2.connect(**conn_info)
-        self.database = conn_info['database']
+    def __init__(self, analyzed_schema, connection_manager, chunk_size=10000, commit_every='table', conflict_mode='merge',
+                 key_memory_budget=256 * 1024 * 1024, key_spill_directory=None, workers=1, shards=1, entropy=None,
+                 value_pool_size=default_pool_size, copy_format='binary', freeze=False, key_starts=None, show_progress=True,
+                 dataset_cache=None, schema_fingerprint=None, dataset_entry=None, dataset_replay=False, profile_path=None,
+                 checkpoint=None, resuming=False, retries=3, target_size=None, size_budgets=None,
+                 table_rows=None):
+        self.connection_manager = connection_manager
+        self.connection = connection_manager.get_connection()
+        self.database = connection_manager.database
         self.cursor = self.connection.cursor()
         self.analyzed_schema = analyzed_schema
+        self.chunk_size = chunk_size
+        self.commit_every = commit_every
+        self.workers = workers
+        self.shards = shards
+        # every table (and shard) draws from its own stream derived from this run entropy
+        self.entropy = entropy if entropy is not None else new_entropy()
+        self.show_progress = show_progress
+        # what a worker process needs to build its own bloater
+        self.options = {
+            "chunk_size": chunk_size,
+            "commit_every": commit_every,
+            "conflict_mode": conflict_mode,
+            "key_memory_budget": key_memory_budget // max(workers, 1),
+            "entropy": self.entropy,
+            "value_pool_size": value_pool_size,
+            "copy_format": copy_format,
+            "freeze": freeze,
+            "dataset_cache": dataset_cache,
+            "profile_path": profile_path,
+            "checkpoint": checkpoint,
+            "resuming": resuming,
+            "retries": retries
+        }
+        # timings and row counts of the tables this process loads, workers send theirs back to the parent
+        self.metrics = RunMetrics(self.database)
+        self.profiler = Profiler(profile_path) if profile_path else None
+        self.loader = PgCopyLoader(self.connection, conflict_mode=conflict_mode, commit_every=commit_every, copy_format=copy_format, freeze=freeze,
+                                   metrics=self.metrics)
+        self.key_pool = KeyPool(self.connection)
+        self.key_registry = KeyRegistry(memory_budget=key_memory_budget, spill_directory=key_spill_directory)
+        self.referenced_columns = self.get_referenced_columns()
+        self.value_pools = ValuePools(pool_size=value_pool_size)
+        self.table_plans = dict()
+        # integer keys count up from the max found before loading, workers get the starts the parent read
+        self.key_starts = key_starts if key_starts is not None else dict()
+        # seeded chunks are replayed from (or saved to) the dataset cache entry of this run, workers get the entry the parent chose
+        self.dataset_cache = dataset_cache
+        self.schema_fingerprint = schema_fingerprint
+        self.dataset_entry = dataset_entry
+        self.dataset_replay = dataset_replay
+        self.value_pool_size = value_pool_size
+        # committed chunks are checkpointed, a resumed run skips them and looks up the chunk that was in flight
+        self.checkpoint = checkpoint
+        self.resuming = resuming
+        self.retries = retries
+        # rows per table from the row_counts config, with a target size they are the proportions the target is split in
+        self.configured_rows = table_rows if table_rows else dict()
+        self.table_rows = dict(self.configured_rows)
+        # with a target size every table gets its own row count, and stops loading once it reached its size budget
+        self.target_size = target_size
+        self.bytes_per_row = dict()
+        self.table_sizes = dict()
+        self.measured_sizes = dict()
+        self.size_budgets = size_budgets if size_budgets is not None else dict()
 
-    def feed_db(self, how_many):
+    def get_referenced_columns(self):
+        referenced_columns = dict()
         for key, value in self.analyzed_schema.items():
             table = list(value.keys())[0]
-            self.populate_table(how_many, table, value[table]['columns'])
+            for column in value[table]['columns']:
+                for constraint in column.get('constraint', {}).values():
+                    if constraint['type'] == 'FOREIGN KEY':
+                        referenced_columns.setdefault(constraint['referenced_table'], set()).add(constraint['referenced_column'])
+        return referenced_columns
+
+    def get_table_columns(self, table_name):
+        for key, value in self.analyzed_schema.items():
+            if table_name in value:
+                return value[table_name]['columns']
+        raise Exception("table {table} not found in the analyzed schema!".format(table=table_name))
+
+    def feed_db(self, how_many):
+        self.compile_plans()
+        if self.target_size is not None:
+            self.sample_bytes_per_row()
+            self.plan_target_rows(self.get_table_names())
+        self.start_checkpoint(how_many)
+        self.open_dataset_cache(how_many)
+        try:
+            with self.profiler.profile() if self.profiler else nullcontext():
+                if self.workers > 1:
+                    LevelScheduler(self, self.workers, shards=self.shards).run(how_many)
+                else:
+                    table_names = self.get_table_names()
+                    for index, table in enumerate(table_names):
+                        rows_landed = self.populate_table(self.get_table_rows(table, how_many), table, self.get_table_columns(table))
+                        self.display_table_result(table, rows_landed)
+                        if self.target_size is not None:
+                            self.plan_target_rows(table_names[index + 1:])
+        finally:
+            self.key_registry.close()
+            self.metrics.finish()
+        self.close_dataset_cache(how_many)
+        if self.checkpoint is not None:
+            self.checkpoint.clear()
+        if self.profiler:
+            self.profiler.save()
+
+    def get_table_names(self):
+        # in insertion order
+        return [list(value.keys())[0] for key, value in self.analyzed_schema.items()]
+
+    def get_table_rows(self, table_name, how_many):
+        return self.table_rows.get(table_name, how_many)
+
+    def get_database_size(self):
+        self.cursor.execute(FileUtility.read_sql_file('get_database_size.sql'))
+        return self.cursor.fetchone()[0]
+
+    def get_table_size(self, table_name):
+        self.cursor.execute(FileUtility.read_sql_file('get_table_total_size.sql'), {"table_name": '"{table}"'.format(table=table_name)})
+        return self.cursor.fetchone()[0]
+
+    def sample_bytes_per_row(self, sample_rows=default_sample_rows):
+        """Measures the size of a row of every table on a sample chunk copied into a temp copy of the table."""
+        # the sample keys of a parent feed the samples of its children, they never reach the registry of the run
+        key_registry = self.key_registry
+        self.key_registry = KeyRegistry()
+        try:
+            for table in self.get_table_names():
+                plan = self.get_table_plan(table, self.get_table_columns(table))
+                batch = plan.build_batch(sample_rows, derive_rng(self.entropy, "{table}.sample".format(table=table)))
+                for column in sorted(self.referenced_columns.get(table, set()) & set(batch.columns)):
+                    self.key_registry.record(table, column, batch.get_column(column))
+                self.bytes_per_row[table] = self.loader.measure_sample(table, batch) / sample_rows
+                print("- Sampled [{table}] table, {size:.0f} bytes per row with indexes and TOAST".format(table=table, size=self.bytes_per_row[table]))
+        finally:
+            self.key_registry.close()
+            self.key_registry = key_registry
+
+    def plan_target_rows(self, table_names):
+        """Splits what is left of the target size over the tables still to load.
+
+        Called again after every table (or level), so the sizes measured so far correct
+        the row counts of the tables that follow.
+        """
+        if not table_names:
+            return
+        correction = self.get_size_correction(table_names)
+        database_size = self.get_database_size()
+        target_rows = get_target_rows(self.target_size - database_size, {table: self.bytes_per_row[table] * correction for table in table_names},
+                                      weights={table: self.configured_rows[table] for table in table_names} if self.configured_rows else None)
+        for table in table_names:
+            self.table_sizes[table] = self.get_table_size(table)
+            self.table_rows[table] = target_rows[table]
+            self.size_budgets[table] = self.table_sizes[table] + target_rows[table] * self.bytes_per_row[table] * correction
+        self.connection.commit()
+        print("- {database} is {size} of the {target} target, {rows} rows planned for the {count} tables left".format(
+            database=self.database, size=format_size(database_size), target=format_size(self.target_size),
+            rows=sum(target_rows.values()), count=len(table_names)))
+
+    def get_size_correction(self, table_names):
+        # how far the loaded tables grew from what their samples predicted, the samples of the tables left are scaled by it
+        for table in self.table_sizes:
+            if table not in table_names and table not in self.measured_sizes:
+                rows_landed = self.metrics.get_table(table)['rows_landed']
+                self.measured_sizes[table] = (self.get_table_size(table) - self.table_sizes[table], rows_landed * self.bytes_per_row[table])
+        estimated_size = sum(estimated for grown, estimated in self.measured_sizes.values())
+        return sum(grown for grown, estimated in self.measured_sizes.values()) / estimated_size if estimated_size else 1.0
+
+    def is_over_size_budget(self, table_name):
+        return table_name in self.size_budgets and self.get_table_size(table_name) >= self.size_budgets[table_name]
+
+    def start_checkpoint(self, how_many):
+        if self.checkpoint is None or self.resuming:
+            return
+        if self.checkpoint.exists():
+            print("- Discarding the checkpoints of the interrupted run from {started}, rerun with -resume to continue a run instead".format(
+                started=self.checkpoint.load_run().get('started')))
+        self.checkpoint.start({
+            'database': self.database, 'fingerprint': self.schema_fingerprint, 'seed': str(self.entropy), 'rows': how_many,
+            'chunk_size': self.chunk_size, 'workers': self.workers, 'shards': self.shards, 'commit_every': self.commit_every,
+            'conflict_mode': self.options['conflict_mode'], 'value_pool_size': self.value_pool_size, 'target_size': self.target_size,
+            'table_rows': self.configured_rows,
+            'key_starts': [[table, column, start] for (table, column), start in sorted(self.key_starts.items())]})
+
+    def display_table_result(self, table_name, rows_landed):
+        table = self.metrics.get_table(table_name)
+        print(" - built [{table}] table, {rows} rows landed, {rate:.0f} rows/s, {size:.1f} MB sent".format(
+            table=table_name, rows=rows_landed, rate=table['rows_landed'] / max(table['seconds'], 1e-6), size=table['bytes_sent'] / 1e6))
+
+    def open_dataset_cache(self, how_many):
+        if self.dataset_cache is None:
+            return
+        self.dataset_entry = self.dataset_cache.get_entry_key(self.schema_fingerprint, self.entropy, how_many, self.chunk_size,
+                                                              self.key_starts, self.value_pool_size, table_rows=self.configured_rows)
+        self.dataset_replay = self.dataset_cache.is_complete(self.dataset_entry)
+        if self.dataset_replay:
+            print("- Replaying dataset cache entry {entry} instead of generating".format(entry=self.dataset_entry))
+        else:
+            print("- Saving generated chunks to dataset cache entry {entry}".format(entry=self.dataset_entry))
+
+    def close_dataset_cache(self, how_many):
+        if self.dataset_cache is None:
+            return
+        if self.dataset_replay:
+            self.dataset_cache.touch(self.dataset_entry)
+        else:
+            self.dataset_cache.complete(self.dataset_entry, {
+                'database': self.database, 'fingerprint': self.schema_fingerprint, 'seed': str(self.entropy),
+                'rows': how_many, 'chunk_size': self.chunk_size})
+
+    def get_chunk(self, plan, table_name, chunk_rows, row_offset):
+        chunk_index = row_offset // self.chunk_size
+        if self.dataset_replay:
+            with self.metrics.phase(table_name, 'generate'):
+                batch = self.dataset_cache.read_chunk(self.dataset_entry, plan, chunk_index, chunk_rows)
+            if batch is not None:
+                return batch
+        # every chunk has its own stream, a chunk comes out the same whichever shard or worker builds it
+        with self.metrics.phase(table_name, 'generate'):
+            batch = plan.build_batch(chunk_rows, derive_rng(self.entropy, table_name, chunk_index), row_offset=row_offset)
+        if self.dataset_cache is not None and not self.dataset_replay:
+            self.dataset_cache.write_chunk(self.dataset_entry, table_name, chunk_index, batch)
+        return batch
+
+    def close(self):
+        if not self.connection.closed:
+            self.cursor.close()
+        self.connection_manager.put_connection(self.connection)
+
+    def reconnect(self):
+        # a dropped connection isn't always flagged closed yet, closing it keeps it out of the pool
+        self.connection.close()
+        self.connection_manager.put_connection(self.connection)
+        self.connection = self.connection_manager.get_connection()
+        self.cursor = self.connection.cursor()
+        self.loader.reconnect(self.connection)
+        self.key_pool = KeyPool(self.connection)
+
+    def get_permutation_rng(self, table_name, column_name):
+        # only depends on the run entropy, so every shard of a table walks the same permutation
+        return derive_rng(self.entropy, "{table}.{column}".format(table=table_name, column=column_name))
 
-    def build_dataframe(self, columns):
-        dataframe = {}
+    def get_key_start(self, table_name, column_name):
+        if (table_name, column_name) not in self.key_starts:
+            self.key_starts[(table_name, column_name)] = self.key_pool.get_next_key(table_name, column_name)
+        return self.key_starts[(table_name, column_name)]
+
+    def get_table_plan(self, table_name, columns):
+        if table_name not in self.table_plans:
+            self.table_plans[table_name] = compile_table_plan(table_name, columns, self.sample_foreign_keys, self.value_pools,
+                                                              self.get_permutation_rng, self.get_key_start)
+        return self.table_plans[table_name]
+
+    def sync_sequences(self, table_name, columns):
+        # serial columns got explicit values, their sequences have to move past them
         for column in columns:
-            value = self.get_random_data_by_type(column)
-            dataframe[column['name']] = [value]
-        return pd.DataFrame(dataframe)
+            if str(column.get('column_default')).startswith('nextval('):
+                self.cursor.execute(FileUtility.read_sql_file('sync_serial_sequence.sql').format(table_name=table_name, column_name=column['name']),
+                                    {"table_name": '"{table_name}"'.format(table_name=table_name), "column_name": column['name']})
+        self.connection.commit()
+
+    def compile_plans(self):
+        unsupported_columns = []
+        for key, value in self.analyzed_schema.items():
+            table = list(value.keys())[0]
+            plan = self.get_table_plan(table, value[table]['columns'])
+            unsupported_columns += [(table, column, data_type) for column, data_type in plan.unsupported_columns]
+        if unsupported_columns:
+            print("- FAILED compiling the column generators, these NOT NULL columns have unsupported data types:")
+            for table, column, data_type in unsupported_columns:
+                print("   - {table}.{column} ({data_type})".format(table=table, column=column, data_type=data_type))
+            sys.exit()
 
     def get_csv_data_by_type(self, column):
         return "TODO"
 
-    def get_random_data_by_type(self, column):
-        value = None
-        # check if is_nullable is True (if False we need a value)
-        if not column['is_nullable']:
-            if 'constraint' in column:
-                constraint_list = list(column['constraint'])
-                constraint_values = list(column['constraint'].values())
-                types = [const_dict['type'] for const_dict in constraint_values]
-                if 'FOREIGN KEY' in types:
-                    index = types.index('FOREIGN KEY')
-                    constraint_name = constraint_list[index]
-                    constraint = column['constraint'][constraint_name]
-                    constraint_table = constraint['referenced_table']
-                    constraint_column = constraint['referenced_column']
-                    value = str(self.get_random_row(constraint_column, constraint_table)[0])
-                elif 'PRIMARY KEY' in types and column['data_type'] == 'uuid':
-                    value = str(uuid.uuid4())
-                elif 'PRIMARY KEY' in types:
-                    value = Randoms.get_hash(25)
-                else:
-                    value = 'TODO'
-            else:
-                if column['data_type'] == 'character varying':
-                    value = Randoms.get_custom_text(column['name'])
-                elif column['data_type'] == 'timestamp without time zone':
-                    value = Randoms.get_datetime(min_year=2000)
-                elif column['data_type'] == 'text':
-                    value = Randoms.get_custom_text(column['name'])
-                elif column['data_type'] == 'boolean':
-                    value = Randoms.get_boolean()
-                elif column['data_type'] == 'USER-DEFINED':
-                    user_defined_values = column['user_defined_type']['values']
-                    value = Randoms.get_value_from_list(user_defined_values)
-                elif column['data_type'] == 'integer':
-                    value = Randoms.get_number()
-                else:
-                    print(column['data_type'])
-
-        return value
-
-    def populate_table(self, how_many, table_name, columns_data):
-        progress_bar = Bar(' - building [{}] table '.format(table_name), max=how_many)
-        for index in range(how_many):
-            dataframe = self.build_dataframe(columns_data)
-            columns = ', '.join(dataframe.columns.tolist())
-            query = """INSERT INTO "{table_name}"({columns} ) VALUES %s ON CONFLICT DO NOTHING""".format(table_name=table_name, columns=columns)
-            self.insert_table_data(index + 1, query, self.connection, self.cursor, dataframe, how_many)
-            progress_bar.next()
-        progress_bar.finish()
-
-    def insert_table_data(
-            self,
-            index: int,
-            query: str,
-            conn: psycopg2.extensions.connection,
-            cur: psycopg2.extensions.cursor,
-            df: pd.DataFrame,
-            page_size: int
-    ) -> None:
-        data_tuples = [tuple(row.to_numpy()) for index, row in df.iterrows()]
+    def sample_foreign_keys(self, table_name, column_name, size, rng=None):
+        # keys written during this run are sampled in-process, only parents we didn't fill are read from the database
+        if self.key_registry.has(table_name, column_name):
+            return self.key_registry.sample(table_name, column_name, size, rng=rng)
+        return self.key_pool.sample(table_name, column_name, size, rng=rng)
 
-        try:
-            psql_extras.execute_values(cur, query, data_tuples, page_size=page_size)
-        except Exception as error:
-            print("- {index}) FAILED query execution for:: \"{query}\" ".format(index=index, query=cur.query.decode("utf-8")))
-            print("\n")
-            print("ERROR: {error}".format(error=error))
-            conn.rollback()
-            cur.close()
+    @staticmethod
+    def get_probe_column(columns_data):
+        # a generated primary key or unique column tells whether a chunk landed, values sampled from a parent don't
+        for column in columns_data:
+            constraint_types = {constraint['type'] for constraint in column.get('constraint', {}).values()}
+            if constraint_types & {'PRIMARY KEY', 'UNIQUE'} and 'FOREIGN KEY' not in constraint_types:
+                return column['name']
+        return None
+
+    def start_task(self, table_name, shard_index, probe_column, row_offset, how_many):
+        """Returns the chunks and rows of a table shard the interrupted run committed, and whether the chunk after them is probed.
+
+        A task is checkpointed before its first chunk, so one without a checkpoint never
+        committed anything. An unfinished task may have committed a chunk after its last
+        checkpoint, without a probe column that can't be told and the resume is refused.
+        """
+        task = self.checkpoint.load(table_name, shard_index) if self.checkpoint is not None and self.resuming else None
+        if task is None:
+            self.save_checkpoint(table_name, shard_index, row_offset, how_many, 0, 0)
+            return 0, 0, False
+        if not task['finished'] and probe_column is None:
+            print("Error: [{table}] has no generated primary key or unique column to tell whether the chunk copying when the run stopped "
+                  "was committed, it can't be resumed without duplicating rows".format(table=table_name))
             sys.exit()
+        return task['chunks_committed'], task['rows_landed'], not task['finished']
+
+    def recover_chunk(self, batch, table_name, probe_column, committed=False):
+        """Registers the keys of a chunk the interrupted run committed, returns the rows of it that landed.
+
+        Chunks past the last checkpoint are looked up by ``probe_column`` and ``None`` is
+        returned when none of their rows are in the table, tables without one are never
+        retried or resumed past their checkpoint.
+        """
+        key_columns = sorted(self.referenced_columns.get(table_name, set()) & set(batch.columns))
+        if probe_column is None:
+            landed = np.ones(batch.size, dtype=bool)
         else:
-            conn.commit()
+            landed = self.loader.find_landed_rows(table_name, batch, probe_column)
+            if not committed and not landed.any():
+                return None
+        with self.metrics.phase(table_name, 'keys'):
+            for column in key_columns:
+                self.key_registry.record(table_name, column, batch.get_column(column)[landed])
+        return int(landed.sum())
+
+    def populate_table(self, how_many, table_name, columns_data, on_chunk=None, row_offset=0, shard_index=0):
+        progress_bar = Bar(' - building [{}] table '.format(table_name), max=how_many) if self.show_progress else None
+        plan = self.get_table_plan(table_name, columns_data)
+        probe_column = self.get_probe_column(columns_data)
+        # only a resumed run looks for chunks that were committed after the last checkpoint was written
+        chunks_committed, rows_committed, probing = self.start_task(table_name, shard_index, probe_column, row_offset, how_many)
+        rows_landed = 0
+        with self.metrics.table(table_name):
+            for chunk_index, chunk_start in enumerate(range(0, how_many, self.chunk_size)):
+                chunk_rows = min(self.chunk_size, how_many - chunk_start)
+                if chunk_index < chunks_committed:
+                    # children sample the keys of the skipped chunks, so they're regenerated and registered again
+                    if self.referenced_columns.get(table_name):
+                        self.recover_chunk(self.get_chunk(plan, table_name, chunk_rows, row_offset + chunk_start), table_name, probe_column, committed=True)
+                else:
+                    batch = self.get_chunk(plan, table_name, chunk_rows, row_offset + chunk_start)
+                    recovered_rows = self.recover_chunk(batch, table_name, probe_column) if probing else None
+                    if recovered_rows is None:
+                        probing = False
+                        rows_landed += self.insert_table_data(chunk_start + 1, table_name, batch, probe_column)
+                    else:
+                        rows_committed += recovered_rows
+                    chunks_committed += 1
+                    if self.commit_every == 'chunk':
+                        self.save_checkpoint(table_name, shard_index, row_offset, how_many, chunks_committed, rows_committed + rows_landed)
+                if progress_bar:
+                    progress_bar.next(chunk_rows)
+                if on_chunk:
+                    on_chunk(chunk_rows)
+                # rows that came out bigger than sampled don't overshoot the target
+                if self.is_over_size_budget(table_name):
+                    break
+            with self.metrics.phase(table_name, 'commit'):
+                self.loader.finish_table()
+            with self.metrics.phase(table_name, 'sync'):
+                self.sync_sequences(table_name, columns_data)
+            self.save_checkpoint(table_name, shard_index, row_offset, how_many, chunks_committed, rows_committed + rows_landed, finished=True)
+        self.key_pool.invalidate(table_name)
+        if progress_bar:
+            progress_bar.finish()
+        return rows_landed
+
+    def save_checkpoint(self, table_name, shard_index, row_offset, how_many, chunks_committed, rows_landed, finished=False):
+        if self.checkpoint is not None:
+            self.checkpoint.save(table_name, shard_index, row_offset, how_many, self.chunk_size, chunks_committed, rows_landed, finished=finished)
+
+    def insert_table_data(self, index: int, table_name: str, batch: RowBatch, probe_column=None) -> int:
+        key_columns = sorted(self.referenced_columns.get(table_name, set()) & set(batch.columns))
+        attempt = 0
+        while True:
+            try:
+                rows_landed, landed_keys = self.loader.load_chunk(table_name, batch, returning=key_columns)
+                break
+            except (OperationalError, InterfaceError) as error:
+                # a chunk is only retried on its own when it is its own transaction, and when a probe column
+                # tells whether its commit went through before the connection dropped
+                if self.commit_every != 'chunk' or probe_column is None or attempt >= self.retries:
+                    self.fail_chunk(index, table_name, batch, error)
+                attempt += 1
+                print("- {index}) lost the connection while copying into \"{table_name}\", reconnecting in {delay}s ({attempt}/{retries})...".format(
+                    index=index, table_name=table_name, delay=2 ** attempt, attempt=attempt, retries=self.retries))
+                time.sleep(2 ** attempt)
+                try:
+                    self.reconnect()
+                    # the commit may have gone through before the connection dropped
+                    recovered_rows = self.recover_chunk(batch, table_name, probe_column)
+                except (OperationalError, InterfaceError):
+                    continue
+                if recovered_rows is not None:
+                    return recovered_rows
+            except Exception as error:
+                self.fail_chunk(index, table_name, batch, error)
 
-    # TODO: Move this out
-    def get_random_row(self, columns, table):
-        self.cursor.execute("SELECT {columns} FROM {table} ORDER BY random() LIMIT 1".format(columns=columns, table=table))
-        return self.cursor.fetchone()
+        with self.metrics.phase(table_name, 'keys'):
+            for column, values in landed_keys.items():
+                self.key_registry.record(table_name, column, values)
+        return rows_landed
 
-    def get_random_row_where(self, columns, table, query):
-        self.cursor.execute("SELECT {columns} FROM {table} {query} ORDER BY random() LIMIT 1".format(columns=columns, table=table, query=query))
-        return self.cursor.fetchone()
+    def fail_chunk(self, index, table_name, batch, error):
+        print("- {index}) FAILED copying chunk of {count} rows into \"{table_name}\" ".format(index=index, count=batch.size, table_name=table_name))
+        print("\n")
+        print("ERROR: {error}".format(error=error))
+        if not self.connection.closed:
+            self.loader.rollback()
+            self.cursor.close()
+        if self.checkpoint is not None:
+            print("- Committed chunks are checkpointed, rerun with -resume to continue from them")
+        sys.exit()
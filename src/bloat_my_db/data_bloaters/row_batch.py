@@ -0,0 +1,53 @@
+import logging
+import numpy as np
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+
+class ArrayColumn:
+    """The one-dimensional array values of a column, the elements of every row are stored back to back in ``values``."""
+
+    def __init__(self, values, lengths):
+        self.values = values
+        self.lengths = np.asarray(lengths)
+        self.offsets = np.concatenate(([0], np.cumsum(self.lengths)))
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def tolist(self):
+        values = self.values.tolist()
+        return [values[self.offsets[index]:self.offsets[index + 1]] for index in range(len(self))]
+
+
+class RowBatch:
+    """A batch of generated rows stored column by column.
+
+    ``values`` holds one array per column in ``columns`` order, a column whose array is
+    ``None`` is NULL for every row of the batch. ``column_types`` holds the schema column
+    of every column when it is known, the loader needs it to encode binary COPY.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.columns = []
+        self.values = []
+        self.column_types = []
+
+    def add_column(self, name, values, column_type=None):
+        if values is not None and len(values) != self.size:
+            raise Exception("column {name} has {count} values, expected {size}!".format(name=name, count=len(values), size=self.size))
+        self.columns.append(name)
+        self.values.append(values)
+        self.column_types.append(column_type)
+
+    def get_column(self, name):
+        return self.values[self.columns.index(name)]
+
+    def rows(self):
+        columns = [values.tolist() if values is not None else [None] * self.size for values in self.values]
+        return zip(*columns)
@@ -0,0 +1,50 @@
+import logging
+import json
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+
+def load_row_count_snapshot(snapshot_path):
+    with open(snapshot_path) as json_file:
+        return json.load(json_file)
+
+
+def get_table_row_counts(analyzed_schema, how_many, row_counts):
+    """Resolves the rows of every table from the ``row_counts`` config section, in insertion order.
+
+    A table takes its rows from ``tables``, else from ``fan_out`` (rows per row of one of
+    the parents in its ``foreign_constraint_tables``), else from the ``snapshot`` row count
+    times ``scale``, else ``how_many``. Parents are resolved before their children.
+    """
+    tables = row_counts.get('tables', {})
+    fan_outs = row_counts.get('fan_out', {})
+    snapshot = load_row_count_snapshot(row_counts['snapshot']) if row_counts.get('snapshot') else dict()
+    scale = row_counts.get('scale', 1)
+    unknown_tables = [table for table in list(tables) + list(fan_outs) if not any(table in value for value in analyzed_schema.values())]
+    if unknown_tables:
+        raise ValueError("row_counts names tables that aren't in the schema: {tables}".format(tables=", ".join(sorted(set(unknown_tables)))))
+
+    table_rows = dict()
+    for key, value in analyzed_schema.items():
+        table = list(value.keys())[0]
+        fan_out = fan_outs.get(table, {})
+        if table in tables:
+            table_rows[table] = int(tables[table])
+        elif fan_out:
+            if len(fan_out) > 1:
+                raise ValueError("fan_out of {table} names more than one parent, its rows can only follow one".format(table=table))
+            parent, ratio = next(iter(fan_out.items()))
+            if parent not in value[table]['@table_metadata'].get('foreign_constraint_tables', []):
+                raise ValueError("fan_out of {table} names {parent}, {table} has no foreign key to it".format(table=table, parent=parent))
+            if parent not in table_rows:
+                raise ValueError("fan_out of {table} names {parent}, which is filled after it".format(table=table, parent=parent))
+            table_rows[table] = int(round(table_rows[parent] * ratio))
+        elif table in snapshot:
+            table_rows[table] = int(round(snapshot[table] * scale))
+        else:
+            table_rows[table] = how_many
+    return table_rows
@@ -0,0 +1,81 @@
+import logging
+import json
+import os
+import shutil
+import time
+from bloat_my_db.utilities.file import FileUtility
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+run_file_name = 'run.json'
+
+
+def write_json_atomically(path, data):
+    # a run killed halfway through a write leaves the previous checkpoint in place, never half of one
+    temporary_path = "{path}.{pid}.tmp".format(path=path, pid=os.getpid())
+    with open(temporary_path, 'w') as outfile:
+        outfile.write(json.dumps(data, indent=4))
+    os.replace(temporary_path, path)
+
+
+class RunCheckpoint:
+    """Records which chunks of a ``-populateRandomData`` run are committed, so ``-resume`` continues an interrupted run.
+
+    ``run.json`` keeps the settings the rows depend on (seed, rows, chunk size, shards,
+    integer key starts, ...), every (table, shard) task writes its own file after each
+    commit, so worker processes never write to the same file. The directory is removed
+    once the run finished.
+    """
+
+    def __init__(self, database, checkpoint_directory=None):
+        self.database = database
+        self.checkpoint_directory = checkpoint_directory if checkpoint_directory else FileUtility.get_checkpoint_directory_path(database)
+
+    def get_run_path(self):
+        return os.path.join(self.checkpoint_directory, run_file_name)
+
+    def get_task_path(self, table_name, shard_index):
+        return os.path.join(self.checkpoint_directory, "{table}.{shard}.json".format(table=table_name, shard=shard_index))
+
+    def exists(self):
+        return os.path.exists(self.get_run_path())
+
+    def start(self, settings):
+        self.clear()
+        os.makedirs(self.checkpoint_directory)
+        write_json_atomically(self.get_run_path(), dict(settings, started=time.strftime("%Y-%m-%dT%H:%M:%S")))
+
+    def load_run(self):
+        with open(self.get_run_path()) as json_file:
+            return json.load(json_file)
+
+    def save(self, table_name, shard_index, row_offset, rows, chunk_size, chunks_committed, rows_landed, finished=False):
+        write_json_atomically(self.get_task_path(table_name, shard_index), {
+            'table': table_name, 'shard': shard_index, 'row_offset': row_offset, 'rows': rows,
+            'chunks_committed': chunks_committed,
+            # chunk streams are derived from the run seed and the chunk index, this is the index the next chunk is generated from
+            'next_chunk': row_offset // chunk_size + chunks_committed,
+            'rows_landed': rows_landed, 'finished': finished
+        })
+
+    def load(self, table_name, shard_index):
+        task_path = self.get_task_path(table_name, shard_index)
+        if not os.path.exists(task_path):
+            return None
+        with open(task_path) as json_file:
+            return json.load(json_file)
+
+    def get_tasks(self):
+        tasks = []
+        for file_name in sorted(os.listdir(self.checkpoint_directory)):
+            if file_name != run_file_name and file_name.endswith('.json'):
+                with open(os.path.join(self.checkpoint_directory, file_name)) as json_file:
+                    tasks.append(json.load(json_file))
+        return tasks
+
+    def clear(self):
+        if os.path.exists(self.checkpoint_directory):
+            shutil.rmtree(self.checkpoint_directory)
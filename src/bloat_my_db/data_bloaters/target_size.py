@@ -0,0 +1,40 @@
+import logging
+import re
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+# 1024 based like pg_size_pretty, so targets read the same as the sizes PostgreSQL reports
+size_units = {'': 1, 'B': 1, 'K': 1024, 'KB': 1024, 'M': 1024 ** 2, 'MB': 1024 ** 2, 'G': 1024 ** 3, 'GB': 1024 ** 3, 'T': 1024 ** 4, 'TB': 1024 ** 4}
+default_sample_rows = 10000
+
+
+def parse_size(size):
+    """Turns a size like ``200GB``, ``1.5TB`` or ``500M`` into bytes."""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([A-Za-z]*)\s*', str(size))
+    if not match or match.group(2).upper() not in size_units:
+        raise ValueError("size {size} not understood, use a number followed by B, KB, MB, GB or TB!".format(size=size))
+    return int(float(match.group(1)) * size_units[match.group(2).upper()])
+
+
+def format_size(size):
+    for unit in ['TB', 'GB', 'MB', 'KB']:
+        if abs(size) >= size_units[unit]:
+            return "{size:.1f} {unit}".format(size=size / size_units[unit], unit=unit)
+    return "{size:.0f} B".format(size=size)
+
+
+def get_target_rows(remaining_bytes, bytes_per_row, weights=None):
+    """Returns the rows per table that fill ``remaining_bytes``, the rows of each table are in proportion to its weight.
+
+    ``bytes_per_row`` holds the measured size of a row of every table still to be loaded,
+    indexes and TOAST included. Without ``weights`` every table gets the same rows.
+    """
+    weights = weights if weights else {table_name: 1 for table_name in bytes_per_row}
+    weighted_bytes = sum(bytes_per_row[table_name] * weights[table_name] for table_name in bytes_per_row)
+    if remaining_bytes <= 0 or weighted_bytes <= 0:
+        return {table_name: 0 for table_name in bytes_per_row}
+    units = remaining_bytes / weighted_bytes
+    return {table_name: int(units * weights[table_name]) for table_name in bytes_per_row}
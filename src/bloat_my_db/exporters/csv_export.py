@@ -1,91 +1,129 @@
-import argparse
 import logging
 import sys
 import os
-import uuid
-import random
-import psycopg2
 import csv
-from psycopg2 import sql
-import psycopg2.extras as psql_extras
-from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+import gzip
+import io
+from zipfile import ZipFile, ZIP_DEFLATED
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from progress.bar import Bar
-import pandas as pd
-from bloat_my_db.randoms import Randoms
+from bloat_my_db.randoms.seeding import new_entropy, derive_rng
+from bloat_my_db.data_bloaters.column_plan import compile_csv_template_plan
+from bloat_my_db.utilities.key_pool import KeyPool
 from bloat_my_db.utilities.file import FileUtility
 
-from bloat_my_db import __version__
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 __author__ = "Jason R Alexander"
 __copyright__ = "Jason R Alexander"
 __license__ = "MIT"
 
 _logger = logging.getLogger(__name__)
+export_file_extensions = {'gzip': '.gz', 'zstd': '.zst'}
+default_export_chunk_size = 10000
+
+
+def check_export_format(export_format):
+    if export_format == 'zstd' and zstandard is None:
+        print("Error: -exportFormat zstd needs the zstandard package (pip install zstandard)")
+        sys.exit()
+
+
+def open_compressed_csv(file_path, export_format):
+    if export_format == 'gzip':
+        return gzip.open(file_path, 'wt', compresslevel=6, newline='')
+    return zstandard.open(file_path, 'wt', newline='')
+
+
+def export_table_worker(analyzed_schema, connection_manager, key, table, how_many, export_path, export_format, chunk_size, entropy):
+    exporter = CsvExporter(analyzed_schema, connection_manager, chunk_size=chunk_size, entropy=entropy)
+    try:
+        file_path = os.path.join(export_path, exporter.get_csv_file_name(key, table) + export_file_extensions[export_format])
+        with open_compressed_csv(file_path, export_format) as outfile:
+            exporter.write_table(outfile, key, table, how_many)
+        return table, file_path
+    finally:
+        exporter.close()
 
 
 class CsvExporter:
+    """Writes the ``-buildCSVSchema`` template CSVs in one pass, ``chunk_size`` rows at a time.
+
+    ``zip`` streams every table into a member of ``<workspace>/<database>.zip``, ``gzip``
+    and ``zstd`` write one compressed CSV per table into ``<workspace>/<database>/``,
+    with up to ``workers`` tables compressed at once in separate processes.
+    """
 
-    def __init__(self, analyzed_schema, conn_info):
-        self.connection = psycopg2.connect(**conn_info)
-        self.database = conn_info['database']
+    def __init__(self, analyzed_schema, connection_manager, chunk_size=default_export_chunk_size, workers=1, entropy=None):
+        self.connection_manager = connection_manager
+        self.connection = connection_manager.get_connection()
+        self.database = connection_manager.database
         self.cursor = self.connection.cursor()
         self.analyzed_schema = analyzed_schema
+        self.key_pool = KeyPool(self.connection)
+        self.chunk_size = max(1, chunk_size)
+        self.workers = max(1, workers)
+        self.entropy = entropy if entropy is not None else new_entropy()
 
-    def export_db(self, how_many):
-        for key, value in self.analyzed_schema.items():
-            table = list(value.keys())[0]
-            table_file = FileUtility.get_csv_file_path("{key}_{table}".format(key=key, table=table), self.database)
-
-            csv_header = self.get_csv_header_from_schema(key, table)
-            columns = self.analyzed_schema[key][table]['columns']
-            csv_rows = []
-            for index in range(how_many):
-                sub_csv_rows = self.set_constraint_keys(columns)
-                csv_rows.append(sub_csv_rows)
-
-            with open(table_file, 'w') as f:
-                writer = csv.writer(f)
-                writer.writerow(csv_header)
-                writer.writerows(csv_rows)
-
-    def set_constraint_keys(self, columns):
-        csv_columns = []
-        for column in columns:
-            if 'constraint' in column:
-                constraint_list = list(column['constraint'])
-                constraint_values = list(column['constraint'].values())
-                types = [const_dict['type'] for const_dict in constraint_values]
-                if 'FOREIGN KEY' in types:
-                    index = types.index('FOREIGN KEY')
-                    constraint_name = constraint_list[index]
-                    constraint = column['constraint'][constraint_name]
-                    constraint_table = constraint['referenced_table']
-                    constraint_column = constraint['referenced_column']
-
-                    random_row = self.get_random_row(constraint_column, constraint_table)
-                    if not random_row:
-                        print(random_row)
-
-                    value = str(self.get_random_row(constraint_column, constraint_table)[0])
-                    csv_columns.append(value)
-                elif 'PRIMARY KEY' in types and column['data_type'] == 'uuid':
-                    value = str(uuid.uuid4())
-                    csv_columns.append(value)
-                else:
-                    csv_columns.append("")
-            else:
-                if column['is_nullable']:
-                    csv_columns.append("NOT NULL")
-                else:
-                    csv_columns.append("")
-
-        return csv_columns
+    def close(self):
+        self.cursor.close()
+        self.connection_manager.put_connection(self.connection)
+
+    def get_tables(self):
+        return [(key, list(value.keys())[0]) for key, value in self.analyzed_schema.items()]
+
+    def get_csv_file_name(self, key, table):
+        return "{file_name}.csv".format(file_name=FileUtility.get_filename("{key}_{table}".format(key=key, table=table)))
+
+    def export_db(self, how_many, workspace_path, export_format='zip'):
+        check_export_format(export_format)
+        if export_format == 'zip':
+            return self.export_zip(how_many, workspace_path)
+        return self.export_compressed(how_many, workspace_path, export_format)
+
+    def export_zip(self, how_many, workspace_path):
+        # zip members can only be written one after the other
+        zip_path = "{path}{database}.zip".format(path=workspace_path, database=self.database)
+        progress_bar = Bar('- Exporting CSVs to {path}'.format(path=zip_path), max=len(self.analyzed_schema))
+        with ZipFile(zip_path, 'w', compression=ZIP_DEFLATED) as zf:
+            for key, table in self.get_tables():
+                member_name = "{database}/{file_name}".format(database=self.database, file_name=self.get_csv_file_name(key, table))
+                with zf.open(member_name, 'w', force_zip64=True) as member:
+                    with io.TextIOWrapper(member, encoding='utf-8', newline='') as outfile:
+                        self.write_table(outfile, key, table, how_many)
+                progress_bar.next()
+        progress_bar.finish()
+        return zip_path
+
+    def export_compressed(self, how_many, workspace_path, export_format):
+        export_path = "{path}{database}".format(path=workspace_path, database=self.database)
+        if not os.path.exists(export_path):
+            os.makedirs(export_path)
+        progress_bar = Bar('- Exporting CSVs to {path}'.format(path=export_path), max=len(self.analyzed_schema))
+        # the template only reads parent keys, so every table can be written at once regardless of its insertion level
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(export_table_worker, self.analyzed_schema, self.connection_manager, key, table, how_many,
+                                       export_path, export_format, self.chunk_size, self.entropy)
+                       for key, table in self.get_tables()]
+            for future in as_completed(futures):
+                future.result()
+                progress_bar.next()
+        progress_bar.finish()
+        return export_path
+
+    def write_table(self, outfile, key, table, how_many):
+        columns = self.analyzed_schema[key][table]['columns']
+        plan = compile_csv_template_plan(table, columns, self.key_pool.sample)
+        writer = csv.writer(outfile)
+        writer.writerow(self.get_csv_header_from_schema(key, table))
+        for row_offset in range(0, how_many, self.chunk_size):
+            chunk_rng = derive_rng(self.entropy, table, row_offset // self.chunk_size)
+            batch = plan.build_batch(min(self.chunk_size, how_many - row_offset), chunk_rng, row_offset)
+            writer.writerows(zip(*[values.tolist() for values in batch.values]))
 
     def get_csv_header_from_schema(self, key,  table):
         column_data = self.analyzed_schema[key][table]['columns']
         return [d['name'] for d in column_data]
-
-    # TODO: Move this out
-    def get_random_row(self, columns, table):
-        self.cursor.execute("SELECT {columns} FROM {table} ORDER BY random() LIMIT 1".format(columns=columns, table=table))
-        return self.cursor.fetchone()
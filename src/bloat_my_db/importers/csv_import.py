@@ -1,35 +1,188 @@
 import logging
+import csv
+import gzip
+import os
+import re
+import sys
 import time
-import psycopg2
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from zipfile import ZipFile
 from progress.bar import Bar
+from bloat_my_db.data_bloaters.level_scheduler import get_insertion_levels
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 __author__ = "Jason R Alexander"
 __copyright__ = "Jason R Alexander"
 __license__ = "MIT"
 
 _logger = logging.getLogger(__name__)
+csv_file_extensions = ('.csv', '.csv.gz', '.csv.zst')
+copy_read_size = 1024 * 1024
+
+
+def get_csv_sources(selected_file):
+    """Lists the ``(path, zip member)`` of every CSV in a directory, a zip or a single (compressed) CSV file."""
+    if os.path.isdir(selected_file):
+        return [(os.path.join(selected_file, file), None) for file in sorted(os.listdir(selected_file))
+                if file.lower().endswith(csv_file_extensions)]
+    if selected_file.lower().endswith('.zip'):
+        with ZipFile(selected_file) as zf:
+            return [(selected_file, member) for member in zf.namelist() if member.lower().endswith(csv_file_extensions)]
+    return [(selected_file, None)]
+
+
+def get_source_name(source):
+    path, member = source
+    file_name = os.path.basename(member if member else path)
+    for extension in sorted(csv_file_extensions, key=len, reverse=True):
+        if file_name.lower().endswith(extension):
+            return file_name[:-len(extension)]
+    return file_name
+
+
+def get_source_table(source_name, tables):
+    # exported files are named <key>_<table>_<date>, a plain <table> name works too
+    matches = [table for table in tables if re.fullmatch(r'(\d+_)?{table}(_\d{{8}})?'.format(table=re.escape(table)), source_name)]
+    return max(matches, key=len) if matches else None
+
+
+@contextmanager
+def open_csv_source(source):
+    path, member = source
+    if member:
+        with ZipFile(path) as zf, zf.open(member) as stream:
+            yield stream
+    elif path.lower().endswith('.gz'):
+        with gzip.open(path, 'rb') as stream:
+            yield stream
+    elif path.lower().endswith('.zst'):
+        with zstandard.open(path, 'rb') as stream:
+            yield stream
+    else:
+        with open(path, 'rb') as stream:
+            yield stream
+
+
+class CountingReader:
+    """Counts the (decompressed) bytes ``copy_expert`` reads from a stream."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def readline(self, size=-1):
+        line = self.stream.readline(size)
+        self.bytes_read += len(line)
+        return line
 
 
 class CsvImporter:
+    """COPYs CSV files into their tables, the tables of one insertion level concurrently.
 
-    def __init__(self, analyzed_schema, conn_info):
-        self.connection = psycopg2.connect(**conn_info)
-        self.database = conn_info['database']
+    Every table is streamed (and decompressed on the fly) on a connection of its own and
+    committed on its own, a level only starts once every table before it is in. With
+    ``freeze`` the table is truncated in the same transaction and copied ``FREEZE``.
+    """
+
+    def __init__(self, analyzed_schema, connection_manager, workers=1, freeze=False):
+        self.connection_manager = connection_manager
+        self.connection = connection_manager.get_connection()
+        self.database = connection_manager.database
         self.cursor = self.connection.cursor()
         self.analyzed_schema = analyzed_schema
+        self.workers = max(1, workers)
+        self.freeze = freeze
+
+    def close(self):
+        self.cursor.close()
+        self.connection_manager.put_connection(self.connection)
+
+    def get_table_sources(self, selected_file, analyzed_schema):
+        tables = [list(value.keys())[0] for value in analyzed_schema.values()]
+        table_sources = dict()
+        for source in get_csv_sources(selected_file):
+            table = get_source_table(get_source_name(source), tables)
+            if table is None:
+                print("- Skipping {file}, it doesn't match any table of the schema".format(file=source[1] if source[1] else source[0]))
+                continue
+            # the newest export of a table wins
+            if table not in table_sources or get_source_name(source) > get_source_name(table_sources[table]):
+                table_sources[table] = source
+        return table_sources
+
+    def import_table(self, table, source):
+        start = time.time()
+        with self.connection_manager.connection() as connection, connection.cursor() as cursor, open_csv_source(source) as stream:
+            reader = CountingReader(stream)
+            header = next(csv.reader([reader.readline().decode('utf-8-sig')]))
+            copy_sql = """COPY "{table_name}" ({columns}) FROM stdin WITH (FORMAT csv{freeze})""".format(
+                table_name=table, columns=", ".join('"{column}"'.format(column=column) for column in header),
+                freeze=", FREEZE" if self.freeze else "")
+            try:
+                if self.freeze:
+                    # no CASCADE, referencing tables outside the import are never emptied
+                    cursor.execute('TRUNCATE "{table_name}"'.format(table_name=table))
+                cursor.copy_expert(sql=copy_sql, file=reader, size=copy_read_size)
+            except Exception:
+                # the connection goes back to the pool, don't leave it in a failed transaction
+                connection.rollback()
+                raise
+            rows = cursor.rowcount
+            connection.commit()
+        return rows, reader.bytes_read, time.time() - start
 
     def import_db(self, selected_file, analyzed_schema, database):
-        file_date = time.strftime("%Y%m%d")
-        if selected_file.lower().endswith(('.zip')):
-            with ZipFile(selected_file) as zf:
-                progress_bar = Bar('- Importing CSVs to {database}...'.format(database=self.database), max=len(analyzed_schema.items()))
-                for key, value in analyzed_schema.items():
-                    table = list(value.keys())[0]
-                    file_name = "{database}/{key}_{table}_{date}.csv".format(key=key, table=table, date=file_date, database=database)
-                    with zf.open(file_name, 'r') as infile:
-                        copy_sql = """COPY "{table_name}" FROM stdin WITH CSV HEADER DELIMITER as ','""".format(table_name=table)
-                        self.cursor.copy_expert(sql=copy_sql, file=infile)
-                        self.connection.commit()
+        table_sources = self.get_table_sources(selected_file, analyzed_schema)
+        if not table_sources:
+            print("Error: no CSV in {file} matches a table of {database}".format(file=selected_file, database=database))
+            sys.exit()
+        if zstandard is None and any(path.lower().endswith('.zst') for path, member in table_sources.values()):
+            print("Error: importing .zst files needs the zstandard package (pip install zstandard)")
+            sys.exit()
+
+        start = time.time()
+        total_rows, total_bytes = 0, 0
+        for level, tables in get_insertion_levels(analyzed_schema):
+            tables = [table for table in tables if table in table_sources]
+            if not tables:
+                continue
+            progress_bar = Bar('- Importing level {level} ({count} tables) '.format(level=level, count=len(tables)), max=len(tables))
+            results, failures = dict(), []
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = {executor.submit(self.import_table, table, table_sources[table]): table for table in tables}
+                for future in as_completed(futures):
+                    try:
+                        results[futures[future]] = future.result()
+                    except Exception as error:
+                        failures.append((futures[future], error))
                     progress_bar.next()
-        progress_bar.finish()
+            progress_bar.finish()
+
+            for table in tables:
+                if table in results:
+                    rows, bytes_read, seconds = results[table]
+                    total_rows += rows
+                    total_bytes += bytes_read
+                    print(" - imported [{table}] table, {rows} rows, {size:.1f} MB at {rate:.1f} MB/s".format(
+                        table=table, rows=rows, size=bytes_read / 1e6, rate=bytes_read / 1e6 / max(seconds, 1e-6)))
+            if failures:
+                for table, error in failures:
+                    print("- FAILED importing [{table}] table".format(table=table))
+                    print("\n")
+                    print("ERROR: {error}".format(error=error))
+                sys.exit()
+
+        seconds = time.time() - start
+        print("- Imported {rows} rows ({size:.1f} MB) in {seconds:.1f}s, {rate:.1f} MB/s".format(
+            rows=total_rows, size=total_bytes / 1e6, seconds=seconds, rate=total_bytes / 1e6 / max(seconds, 1e-6)))
+        return table_sources
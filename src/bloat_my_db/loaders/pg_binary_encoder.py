@@ -0,0 +1,243 @@
+import io
+import ipaddress
+import logging
+import struct
+from itertools import chain
+import numpy as np
+from bloat_my_db.data_bloaters.row_batch import ArrayColumn
+from bloat_my_db.randoms.batch_randoms import float64_digits
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+# binary COPY layout (https://www.postgresql.org/docs/current/sql-copy.html#id-1.9.3.55.10)
+copy_binary_header = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+copy_binary_trailer = struct.pack('>h', -1)
+postgres_epoch = np.datetime64('2000-01-01T00:00:00', 'us')
+postgres_epoch_date = np.datetime64('2000-01-01', 'D')
+text_type_names = {'text', 'varchar', 'bpchar', 'name', 'json', 'xml', 'enum'}
+# data_type names of schema files built before udt_name was recorded
+data_type_names = {
+    'character varying': 'varchar', 'text': 'text', 'uuid': 'uuid', 'boolean': 'bool', 'integer': 'int4',
+    'timestamp without time zone': 'timestamp', 'USER-DEFINED': 'enum'
+}
+numeric_groups = 5
+
+
+def get_type_name(column_type):
+    """The type the binary encoder works with, enums and other user defined labels are sent as text."""
+    if column_type is None:
+        return None
+    if column_type.get('data_type') == 'USER-DEFINED':
+        return 'enum'
+    if column_type.get('udt_name'):
+        return column_type['udt_name']
+    return data_type_names.get(column_type.get('data_type'))
+
+
+def get_numeric_scale(column_type):
+    scale = column_type.get('numeric_scale') if column_type else None
+    return scale if scale is not None else 2
+
+
+def to_big_endian_bytes(values, dtype):
+    values = np.ascontiguousarray(np.asarray(values).astype(dtype))
+    return values.view(np.uint8).reshape(len(values), -1)
+
+
+def with_length_prefix(field_bytes):
+    size, width = field_bytes.shape
+    return np.hstack([to_big_endian_bytes(np.full(size, width), '>i4'), field_bytes])
+
+
+def encode_uuids(values):
+    characters = np.ascontiguousarray(np.asarray(values).astype('S36')).view(np.uint8).reshape(len(values), 36)
+    characters = np.delete(characters, [8, 13, 18, 23], axis=1).astype(np.int16)
+    nibbles = np.where(characters >= 97, characters - 87, np.where(characters >= 65, characters - 55, characters - 48)).astype(np.uint8)
+    return (nibbles[:, 0::2] << 4) | nibbles[:, 1::2]
+
+
+def encode_numerics(values, scale):
+    """Fixed width numeric fields, always ``numeric_groups`` base 10000 digits, the server strips the zeros.
+
+    Only the digits a float64 holds are sent, the rest of a high ``scale`` is padded with zeros by the server.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    largest = np.abs(values).max() if len(values) else 0
+    whole_digits = int(np.log10(largest)) + 1 if largest >= 1 else 0
+    value_scale = min(scale, max(float64_digits - whole_digits, 0))
+    scaled = np.rint(values * 10 ** value_scale).astype(np.int64)
+    fraction_groups = -(-value_scale // 4)
+    magnitudes = np.abs(scaled).astype(np.uint64) * np.uint64(10 ** (fraction_groups * 4 - value_scale))
+    digits = np.empty((len(scaled), numeric_groups), dtype=np.int64)
+    for group in range(numeric_groups - 1, -1, -1):
+        digits[:, group] = magnitudes % np.uint64(10000)
+        magnitudes //= np.uint64(10000)
+    header = np.empty((len(scaled), 4), dtype=np.int64)
+    header[:, 0] = numeric_groups
+    header[:, 1] = numeric_groups - fraction_groups - 1
+    header[:, 2] = np.where(scaled < 0, 0x4000, 0)
+    header[:, 3] = scale
+    return to_big_endian_bytes(np.hstack([header, digits]).ravel(), '>i2').reshape(len(scaled), -1)
+
+
+def encode_ipv4s(values):
+    header = np.tile(np.array([2, 32, 0, 4], dtype=np.uint8), (len(values), 1))
+    return np.hstack([header, to_big_endian_bytes(values, '>u4')])
+
+
+def coerce_object_values(values, type_name):
+    """Converts values read back from the database (ints, Decimals, dates, ...) to the arrays the fixed width encoders take."""
+    if any(value is None for value in values):
+        return None
+    if type_name in ('int2', 'int4', 'int8'):
+        return values.astype(np.int64)
+    elif type_name in ('float4', 'float8', 'numeric'):
+        return values.astype(np.float64)
+    elif type_name == 'date':
+        return values.astype('datetime64[D]')
+    elif type_name in ('timestamp', 'timestamptz'):
+        return np.array([value.replace(tzinfo=None) - value.utcoffset() if getattr(value, 'tzinfo', None) else value for value in values],
+                        dtype='datetime64[us]')
+    elif type_name == 'uuid':
+        return values.astype(str)
+    elif type_name == 'bool':
+        return values.astype(bool)
+    return None
+
+
+def encode_fixed_column(values, column_type, size):
+    """Returns the fields (length prefix included) of a column as a ``size`` x width byte matrix.
+
+    ``None`` means the column has no fixed width encoding, it is sent through ``encode_variable_values``.
+    """
+    type_name = get_type_name(column_type)
+    if values is None:
+        return to_big_endian_bytes(np.full(size, -1), '>i4')
+    if isinstance(values, ArrayColumn):
+        return None
+    if values.dtype == object:
+        values = coerce_object_values(values, type_name)
+        if values is None:
+            return None
+    if type_name == 'bool':
+        field_bytes = values.astype(np.uint8).reshape(size, 1)
+    elif type_name in ('int2', 'int4', 'int8', 'float4', 'float8'):
+        dtype = {'int2': '>i2', 'int4': '>i4', 'int8': '>i8', 'float4': '>f4', 'float8': '>f8'}[type_name]
+        field_bytes = to_big_endian_bytes(values, dtype)
+    elif type_name == 'date':
+        field_bytes = to_big_endian_bytes((values.astype('datetime64[D]') - postgres_epoch_date).astype(np.int64), '>i4')
+    elif type_name in ('timestamp', 'timestamptz'):
+        field_bytes = to_big_endian_bytes((values.astype('datetime64[us]') - postgres_epoch).astype(np.int64), '>i8')
+    elif type_name == 'uuid':
+        field_bytes = encode_uuids(values)
+    elif type_name == 'numeric':
+        field_bytes = encode_numerics(values, get_numeric_scale(column_type))
+    elif type_name == 'inet' and np.issubdtype(values.dtype, np.integer):
+        field_bytes = encode_ipv4s(values)
+    elif type_name == 'bytea' and values.ndim == 2:
+        field_bytes = values.astype(np.uint8)
+    else:
+        return None
+    return with_length_prefix(field_bytes)
+
+
+def encode_variable_values(values, column_type):
+    """Returns the field of every value (length prefix included) as a list of ``bytes``."""
+    type_name = get_type_name(column_type)
+    if isinstance(values, ArrayColumn):
+        return encode_arrays(values, column_type)
+    fixed = encode_fixed_column(values, column_type, len(values))
+    if fixed is not None:
+        return fixed.view('V{width}'.format(width=fixed.shape[1])).ravel().tolist()
+
+    fields = []
+    for value in values.tolist():
+        if value is None:
+            fields.append(b'\xff\xff\xff\xff')
+            continue
+        if type_name == 'bytea':
+            payload = bytes(value)
+        elif type_name == 'jsonb':
+            payload = b'\x01' + str(value).encode('utf-8')
+        elif type_name == 'inet':
+            payload = encode_inet(value)
+        elif type_name in text_type_names:
+            payload = str(value).encode('utf-8')
+        else:
+            # values read back from the database (dates, decimals, ...) go through the fixed width encoders one by one
+            single = encode_fixed_column(np.array([value]), column_type, 1)
+            if single is None:
+                raise Exception("binary COPY can't encode {type} value {value!r}!".format(type=type_name, value=value))
+            fields.append(single.tobytes())
+            continue
+        fields.append(struct.pack('>i', len(payload)) + payload)
+    return fields
+
+
+def encode_inet(value):
+    address = ipaddress.ip_interface(str(value))
+    family = 2 if address.version == 4 else 3
+    packed = address.ip.packed
+    return struct.pack('>BBBB', family, address.network.prefixlen, 0, len(packed)) + packed
+
+
+def encode_arrays(values, column_type):
+    element_type = column_type.get('element_type', {}) if column_type else {}
+    element_column = {'udt_name': element_type.get('name'), 'numeric_scale': column_type.get('numeric_scale')}
+    if element_type.get('values') is not None:
+        element_column['data_type'] = 'USER-DEFINED'
+    element_fields = encode_variable_values(values.values, element_column) if len(values.values) else []
+    element_oid = element_type.get('oid', 0)
+
+    fields = []
+    for index in range(len(values)):
+        start, end = values.offsets[index], values.offsets[index + 1]
+        if start == end:
+            payload = struct.pack('>iii', 0, 0, element_oid)
+        else:
+            payload = struct.pack('>iiiii', 1, 0, element_oid, end - start, 1) + b''.join(element_fields[start:end])
+        fields.append(struct.pack('>i', len(payload)) + payload)
+    return fields
+
+
+def encode_binary_batch(batch):
+    """Encodes a ``RowBatch`` as a complete binary COPY stream.
+
+    Runs of fixed width columns are encoded as one byte matrix, so a row is only split
+    into separate ``bytes`` objects around its variable width fields.
+    """
+    field_count = to_big_endian_bytes(np.full(batch.size, len(batch.columns)), '>i2')
+    segments = []
+    fixed_run = [field_count]
+    for values, column_type in zip(batch.values, batch.column_types):
+        fixed = encode_fixed_column(values, column_type, batch.size)
+        if fixed is not None:
+            fixed_run.append(fixed)
+            continue
+        if fixed_run:
+            segments.append(np.hstack(fixed_run))
+        segments.append(encode_variable_values(values, column_type))
+        fixed_run = []
+    if fixed_run:
+        segments.append(np.hstack(fixed_run))
+
+    buffer = io.BytesIO()
+    buffer.write(copy_binary_header)
+    if len(segments) == 1:
+        buffer.write(segments[0].tobytes())
+    else:
+        rows = [segment.view('V{width}'.format(width=segment.shape[1])).ravel().tolist() if isinstance(segment, np.ndarray) else segment
+                for segment in segments]
+        buffer.write(b''.join(chain.from_iterable(zip(*rows))))
+    buffer.write(copy_binary_trailer)
+    buffer.seek(0)
+    return buffer
+
+
+def can_encode_binary(batch):
+    # batches built without schema types (or from old schema files) fall back to text COPY
+    return all(get_type_name(column_type) is not None for column_type in batch.column_types)
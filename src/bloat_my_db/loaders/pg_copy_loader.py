@@ -0,0 +1,233 @@
+import hashlib
+import io
+import logging
+from datetime import datetime, date
+import numpy as np
+from bloat_my_db.data_bloaters.row_batch import ArrayColumn
+from bloat_my_db.loaders.pg_binary_encoder import encode_binary_batch, can_encode_binary, get_type_name, get_numeric_scale
+from bloat_my_db.utilities.run_metrics import RunMetrics
+from bloat_my_db.utilities.file import FileUtility
+from bloat_my_db.options import conflict_modes, commit_modes, copy_formats
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+# COPY text format escapes (https://www.postgresql.org/docs/current/sql-copy.html#id-1.9.3.55.9.2)
+_copy_text_escapes = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def encode_copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value).translate(_copy_text_escapes)
+
+
+def encode_array_literal(values):
+    elements = ['NULL' if value is None else '"{value}"'.format(value=str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                for value in values]
+    return '{' + ','.join(elements) + '}'
+
+
+def encode_copy_column(values, size, column_type=None):
+    type_name = get_type_name(column_type)
+    if values is None:
+        return ['\\N'] * size
+    if isinstance(values, ArrayColumn):
+        return [encode_array_literal(row).translate(_copy_text_escapes) for row in values.tolist()]
+    if values.dtype == np.bool_:
+        return np.where(values, 't', 'f').tolist()
+    if type_name == 'bytea' and values.ndim == 2:
+        # bytea hex format, the backslash itself has to be escaped for COPY
+        return ['\\\\x' + row.hex() for row in np.ascontiguousarray(values, dtype=np.uint8).view('V{width}'.format(width=values.shape[1])).ravel().tolist()]
+    if type_name == 'inet' and np.issubdtype(values.dtype, np.integer):
+        addresses = ((values >> 24) & 0xff).astype(str)
+        for shift in (16, 8, 0):
+            addresses = np.char.add(np.char.add(addresses, '.'), ((values >> shift) & 0xff).astype(str))
+        return addresses.tolist()
+    if type_name == 'numeric' and np.issubdtype(values.dtype, np.floating):
+        return np.char.mod('%.{scale}f'.format(scale=get_numeric_scale(column_type)), values).tolist()
+    if np.issubdtype(values.dtype, np.datetime64):
+        # timestamptz values are generated in UTC, same as the binary encoder sends them
+        suffix = '+00' if type_name == 'timestamptz' else ''
+        return [value + suffix for value in np.datetime_as_string(values, unit='D' if type_name == 'date' else 'us').tolist()]
+    if np.issubdtype(values.dtype, np.number):
+        return values.astype(str).tolist()
+    if values.dtype.kind == 'U':
+        return [value.translate(_copy_text_escapes) for value in values.tolist()]
+    return [encode_copy_value(value) for value in values.tolist()]
+
+
+def encode_copy_batch(batch):
+    columns = [encode_copy_column(values, batch.size, column_type) for values, column_type in zip(batch.values, batch.column_types)]
+    buffer = io.StringIO()
+    buffer.writelines('\t'.join(row) + '\n' for row in zip(*columns))
+    buffer.seek(0)
+    return buffer
+
+
+class PgCopyLoader:
+    """Streams chunks of rows into a table with ``COPY ... FROM STDIN``.
+
+    In ``merge`` mode every chunk is copied into a temporary staging table first and
+    then merged with ``INSERT ... ON CONFLICT DO NOTHING``, so duplicate keys are
+    dropped instead of aborting the load. ``direct`` mode copies straight into the
+    target table. Chunks are sent in binary COPY format when every column type is
+    known, otherwise (and with ``copy_format='text'``) as text. With ``freeze`` the
+    table is truncated in the transaction of its first chunk and every chunk is
+    copied ``FREEZE``, its rows are written frozen and never need a freeze vacuum.
+    Encoding, COPY, merge and per chunk commit times are recorded in ``metrics``.
+    """
+
+    def __init__(self, connection, conflict_mode='merge', commit_every='table', copy_format='binary', freeze=False, metrics=None):
+        if conflict_mode not in conflict_modes:
+            raise Exception("conflict_mode {mode} not found!".format(mode=conflict_mode))
+        if commit_every not in commit_modes:
+            raise Exception("commit_every {mode} not found!".format(mode=commit_every))
+        if copy_format not in copy_formats:
+            raise Exception("copy_format {format} not found!".format(format=copy_format))
+        if freeze and (conflict_mode != 'direct' or commit_every != 'table'):
+            raise Exception("freeze needs conflict_mode direct and commit_every table!")
+
+        self.connection = connection
+        self.cursor = self.connection.cursor()
+        self.conflict_mode = conflict_mode
+        self.commit_every = commit_every
+        self.copy_format = copy_format
+        self.freeze = freeze
+        self.staging_tables = set()
+        self.truncated_tables = set()
+        self.metrics = metrics if metrics is not None else RunMetrics()
+
+    @staticmethod
+    def get_staging_table_name(table_name):
+        # temp table names are limited to 63 bytes like any other identifier, the hash of the full
+        # name comes first so long names sharing a prefix still get their own staging table
+        staging_table = "bloat_stage_{hash}_{table_name}".format(
+            hash=hashlib.md5(table_name.encode('utf-8')).hexdigest()[:8], table_name=table_name)
+        return staging_table.encode('utf-8')[:63].decode('utf-8', 'ignore')
+
+    def create_staging_table(self, table_name):
+        staging_table = self.get_staging_table_name(table_name)
+        if staging_table not in self.staging_tables:
+            self.cursor.execute("""CREATE TEMP TABLE IF NOT EXISTS "{staging_table}" (LIKE "{table_name}" INCLUDING DEFAULTS)""".format(
+                staging_table=staging_table, table_name=table_name))
+            self.staging_tables.add(staging_table)
+        return staging_table
+
+    def truncate_for_freeze(self, table_name):
+        # COPY FREEZE only works on a table truncated (or created) in the same transaction, no CASCADE,
+        # it would empty referencing tables outside the load, a foreign key error is raised instead
+        if table_name not in self.truncated_tables:
+            self.cursor.execute('TRUNCATE "{table_name}"'.format(table_name=table_name))
+            self.truncated_tables.add(table_name)
+
+    def encode_chunk(self, table_name, batch):
+        with self.metrics.phase(table_name, 'encode'):
+            if self.copy_format == 'binary' and can_encode_binary(batch):
+                return encode_binary_batch(batch), ["FORMAT binary"]
+            return encode_copy_batch(batch), []
+
+    def load_chunk(self, table_name, batch, returning=()):
+        """Loads one ``RowBatch`` and returns the number of rows that landed.
+
+        The values of the ``returning`` columns of the rows that actually landed are
+        returned alongside the count, keyed by column name.
+        """
+        column_list = ', '.join('"{column}"'.format(column=column) for column in batch.columns)
+        payload, copy_options = self.encode_chunk(table_name, batch)
+        if self.freeze:
+            self.truncate_for_freeze(table_name)
+            copy_options.append("FREEZE")
+        copy_options = " WITH ({options})".format(options=", ".join(copy_options)) if copy_options else ""
+        landed_keys = dict()
+
+        if self.conflict_mode == 'direct':
+            copy_sql = """COPY "{table_name}" ({columns}) FROM STDIN{options}""".format(table_name=table_name, columns=column_list, options=copy_options)
+            with self.metrics.phase(table_name, 'copy'):
+                self.cursor.copy_expert(sql=copy_sql, file=payload)
+            rows_landed = self.cursor.rowcount
+            for column in returning:
+                landed_keys[column] = batch.get_column(column)
+        else:
+            staging_table = self.create_staging_table(table_name)
+            copy_sql = """COPY "{staging_table}" ({columns}) FROM STDIN{options}""".format(staging_table=staging_table, columns=column_list, options=copy_options)
+            with self.metrics.phase(table_name, 'copy'):
+                self.cursor.copy_expert(sql=copy_sql, file=payload)
+            merge_sql = """INSERT INTO "{table_name}" ({columns}) SELECT {columns} FROM "{staging_table}" ON CONFLICT DO NOTHING""".format(
+                table_name=table_name, columns=column_list, staging_table=staging_table)
+            if returning:
+                merge_sql += " RETURNING {returning}".format(returning=', '.join('"{column}"'.format(column=column) for column in returning))
+            with self.metrics.phase(table_name, 'merge'):
+                self.cursor.execute(merge_sql)
+                rows_landed = self.cursor.rowcount
+                if returning:
+                    returned_rows = self.cursor.fetchall()
+                    for index, column in enumerate(returning):
+                        landed_keys[column] = np.array([row[index] for row in returned_rows])
+                self.cursor.execute("""TRUNCATE "{staging_table}" """.format(staging_table=staging_table))
+
+        if self.commit_every == 'chunk':
+            with self.metrics.phase(table_name, 'commit'):
+                self.connection.commit()
+        self.metrics.count(table_name, chunks=1, rows_generated=batch.size, rows_landed=rows_landed, bytes_sent=payload.tell())
+        return rows_landed, landed_keys
+
+    def find_landed_rows(self, table_name, batch, key_column):
+        """Returns a mask of the ``batch`` rows whose ``key_column`` value is already in the table.
+
+        Used on resume to tell whether a chunk of the interrupted run was committed, the
+        chunk is copied into the staging table and looked up by its generated key.
+        """
+        column_list = ', '.join('"{column}"'.format(column=column) for column in batch.columns)
+        payload, copy_options = self.encode_chunk(table_name, batch)
+        copy_options = " WITH ({options})".format(options=", ".join(copy_options)) if copy_options else ""
+        staging_table = self.create_staging_table(table_name)
+        self.cursor.copy_expert(sql="""COPY "{staging_table}" ({columns}) FROM STDIN{options}""".format(
+            staging_table=staging_table, columns=column_list, options=copy_options), file=payload)
+        self.cursor.execute("""SELECT EXISTS (SELECT 1 FROM "{table_name}" WHERE "{table_name}"."{column}" = "{staging_table}"."{column}") FROM "{staging_table}" """.format(
+            table_name=table_name, column=key_column, staging_table=staging_table))
+        landed = np.array([row[0] for row in self.cursor.fetchall()], dtype=bool)
+        self.cursor.execute("""TRUNCATE "{staging_table}" """.format(staging_table=staging_table))
+        return landed
+
+    def measure_sample(self, table_name, batch):
+        """Copies ``batch`` into a temp copy of the table and returns its size in bytes, indexes and TOAST included.
+
+        The copy is rolled back, the table itself is never written to.
+        """
+        sample_table = "bloat_sample_{table_name}".format(table_name=table_name)[:63]
+        self.cursor.execute("""CREATE TEMP TABLE "{sample_table}" (LIKE "{table_name}" INCLUDING ALL)""".format(
+            sample_table=sample_table, table_name=table_name))
+        column_list = ', '.join('"{column}"'.format(column=column) for column in batch.columns)
+        payload, copy_options = self.encode_chunk(table_name, batch)
+        copy_options = " WITH ({options})".format(options=", ".join(copy_options)) if copy_options else ""
+        self.cursor.copy_expert(sql="""COPY "{sample_table}" ({columns}) FROM STDIN{options}""".format(
+            sample_table=sample_table, columns=column_list, options=copy_options), file=payload)
+        self.cursor.execute(FileUtility.read_sql_file('get_table_total_size.sql'), {"table_name": '"{table}"'.format(table=sample_table)})
+        size = self.cursor.fetchone()[0]
+        self.rollback()
+        return size
+
+    def reconnect(self, connection):
+        # temp tables lived in the session of the lost connection
+        self.connection = connection
+        self.cursor = self.connection.cursor()
+        self.staging_tables = set()
+        self.truncated_tables = set()
+
+    def finish_table(self):
+        self.connection.commit()
+        self.truncated_tables = set()
+
+    def rollback(self):
+        self.connection.rollback()
+        self.truncated_tables = set()
+        # temp tables created in the rolled back transaction are gone
+        self.staging_tables = set()
@@ -3,13 +3,10 @@ import json
 import argparse
 import logging
 import sys
-from bloat_my_db.schema_builders.pg_schema_builder import PgSchemaBuilder
-from bloat_my_db.schema_analyzers.pg_schema_analyzer import PgSchemaAnalyzer
-from bloat_my_db.data_bloaters.pg_data_bloater import PgDataBloater
-from bloat_my_db.importers.csv_import import CsvImporter
-from bloat_my_db.exporters.csv_export import CsvExporter
+# the modules behind each command (NumPy, psycopg2, Faker, ...) are imported by the command that uses them, so -h or -purge start fast
+from bloat_my_db.options import (conflict_modes, commit_modes, copy_formats, export_formats, metrics_formats, default_pool_size,
+                                 default_dataset_cache_size, default_maintenance_database)
 from bloat_my_db.utilities.file import FileUtility
-from bloat_my_db.utilities.db import DatabaseUtility
 from bloat_my_db.utilities import open_file_in_browser, script_intro_title
 
 from bloat_my_db import __version__
@@ -30,14 +27,40 @@ def parse_args(args):
     parser.add_argument('-populateCSVData', help="Takes the analyzed schema and bloats the database with specified CSV data", action='store_true')
     parser.add_argument('-config', help="configuration file or set BLOAT_CONFIG=<path> env variable", type=str)
     parser.add_argument('-workSpacePath', help="The path on were to import/export files (zips, csv), can also set it in the bloat_config.json", type=str)
-    parser.add_argument('-importCSVFile', help="The CSV or zip file (of CSV's) you want to import into the database", type=str)
+    parser.add_argument('-importCSVFile', help="The CSV (.csv, .csv.gz, .csv.zst), zip or directory of CSV's you want to import into the database", type=str)
     parser.add_argument('-rows', help="How may rows do you want to bloat the database, default is 25", type=int)
+    parser.add_argument('-targetSize', help="Fills the database up to this size (e.g. 200GB) instead of -rows per table, row counts come from the measured size of a row of every table, indexes and TOAST included (used with -populateRandomData)", type=str)
+    parser.add_argument('-saveRowCounts', help="Saves the pg_class.reltuples row count of every table to this JSON file, to use as the snapshot of the row_counts config section", type=str)
     parser.add_argument('-purge', help="purges all generated files (both the schema, analyzed schema and CSV export files)", action='store_true')
     parser.add_argument('-force', help="force rebuilds both schemas (used with -populateRandomData flag)", action='store_true')
     parser.add_argument('-disablePrompt', help="Disables the user CLI input prompt", action='store_true')
     parser.add_argument('-openSchema', help="Opens the built schema in Chrome browser", action='store_true')
     parser.add_argument('-openAnalyzedSchema', help="Opens the built analyzed schema in Chrome browser", action='store_true')
     parser.add_argument('-truncateDb', help="Truncates all the values in the database", action='store_true')
+    parser.add_argument('-chunkSize', help="How many rows are streamed per COPY or CSV chunk (used with -populateRandomData or -buildCSVSchema), default is 10000", type=int)
+    parser.add_argument('-commitEvery', help="Commit once per table or after every chunk (used with -populateRandomData), default is table", choices=commit_modes)
+    parser.add_argument('-keyMemoryBudget', help="How many MB of generated keys are kept in memory before spilling them to disk (used with -populateRandomData), default is 256", type=int)
+    parser.add_argument('-workers', help="How many tables of the same insertion level are populated in parallel (used with -populateRandomData), tables compressed in parallel (used with -buildCSVSchema -exportFormat gzip|zstd) or imported in parallel (used with -populateCSVData), default is 1", type=int)
+    parser.add_argument('-shards', help="Splits the rows of every table into N shards loaded by separate workers (used with -workers), default is 1", type=int)
+    parser.add_argument('-copyFormat', help="binary sends chunks in binary COPY format (falls back to text for schema files without column types), default is binary", choices=copy_formats)
+    parser.add_argument('-seed', help="Seeds the random data, the same seed, -rows and -chunkSize load the same rows whatever -workers and -shards are (used with -populateRandomData or -buildCSVSchema), default is a new seed per run", type=int)
+    parser.add_argument('-datasetCache', help="Saves the generated chunks of a seeded run on disk and replays them when the same seed, schema, -rows and -chunkSize run again (used with -populateRandomData -seed)", action='store_true')
+    parser.add_argument('-datasetCacheSize', help="How many MB the dataset cache keeps before evicting the least recently used runs (used with -datasetCache), default is 10240", type=int)
+    parser.add_argument('-valuePoolSize', help="How many distinct values are pre-generated per Faker type (first_name, phone_number, ...) and cached on disk, default is 100000", type=int)
+    parser.add_argument('-fastLoad', help="Drops secondary indexes and foreign keys and disables triggers while loading, then rebuilds them in parallel (used with -populateRandomData or -populateCSVData)", action='store_true')
+    parser.add_argument('-freeze', help="Truncates every table and loads it with COPY FREEZE in one transaction per table, so no freeze vacuum is needed afterwards (used with -populateRandomData or -populateCSVData, implies -conflictMode direct, needs -fastLoad on a schema with foreign keys)", action='store_true')
+    parser.add_argument('-createSnapshot', help="Saves the database as the template database <database>__snap_<name> once every other command finished", type=str)
+    parser.add_argument('-restoreSnapshot', help="Recreates the database from the named snapshot before running the other commands", type=str)
+    parser.add_argument('-listSnapshots', help="Lists the snapshots of the database", action='store_true')
+    parser.add_argument('-dropSnapshot', help="Drops the named snapshot", type=str)
+    parser.add_argument('-pruneSnapshots', help="Drops all but the N newest snapshots", type=int)
+    parser.add_argument('-exportFormat', help="zip streams every table CSV into <workspace>/<database>.zip, gzip and zstd write one compressed CSV per table into <workspace>/<database>/ (used with -buildCSVSchema), default is zip", choices=export_formats)
+    parser.add_argument('-metricsFile', help="Writes the per table rows landed, bytes sent and generate/encode/copy/merge/commit timings of the run to this file (used with -populateRandomData)", type=str)
+    parser.add_argument('-metricsFormat', help="json or Prometheus text exposition format for -metricsFile, default is json", choices=metrics_formats)
+    parser.add_argument('-profile', help="Profiles the load loop (worker processes included) with cProfile and saves the stats to this file (used with -populateRandomData)", type=str)
+    parser.add_argument('-resume', help="Continues the interrupted -populateRandomData run of the database from its last committed chunks, with the seed, -rows, -chunkSize, -workers and -shards it was started with", action='store_true')
+    parser.add_argument('-retries', help="How many times a chunk is retried after reconnecting when the connection drops (used with -commitEvery chunk), default is 3", type=int)
+    parser.add_argument('-conflictMode', help="merge loads through a staging table and skips conflicting rows, direct copies straight into the table, default is merge", choices=conflict_modes)
     return parser.parse_args(args)
 
 
@@ -49,9 +72,9 @@ def setup_logging():
 
 
 def main(args):
+    args = parse_args(args)
     print("--------------------------------------------------------------------------------------------------------")
     script_intro_title()
-    args = parse_args(args)
 
     configuration = os.getenv('BLOAT_CONFIG')
     if not args.config and not configuration:
@@ -63,100 +86,345 @@ def main(args):
 
     setup_logging()
     configuration_values = json.loads(FileUtility.read_file(configuration))
-    db_utility = DatabaseUtility(configuration_values['db'])
+    from bloat_my_db.utilities.connection import ConnectionManager
+    # every component borrows its connection from this pool, session settings are applied once per connection
+    # fast load rebuilds indexes on -workers connections next to the ones the components hold
+    connection_manager = ConnectionManager(configuration_values['db'], configuration_values.get('session'),
+                                           max_connections=max(10, (args.workers if args.workers else 1) + 2))
+    try:
+        run_commands(args, configuration_values, connection_manager)
+    finally:
+        connection_manager.close_all()
+
+    print("--------------------------------------------------------------------------------------------------------")
+
+
+def run_commands(args, configuration_values, connection_manager):
     database = configuration_values['db']['database']
     force_rebuild = args.force if args.force else False
     default_rows_to_generate = 25
+    default_chunk_size = 10000
+    default_key_memory_budget = 256
+    default_retries = 3
 
     workspace_path = args.workSpacePath if args.workSpacePath else configuration_values['paths']['workspace_path']
     if not workspace_path:
         print("Error: required set your -workSpacePath flag or set it in your configuration file")
         sys.exit()
 
+    # a frozen table is truncated and loaded in one transaction, by one COPY stream and without a staging table
+    if args.freeze and (args.conflictMode == 'merge' or args.commitEvery == 'chunk' or (args.shards and args.shards > 1)):
+        print("Error: -freeze can't be used with -conflictMode merge, -commitEvery chunk or -shards")
+        sys.exit()
+
+    # row counts of a target size run follow the measured sizes, they can't be replayed or resumed,
+    # and the sizes measured while fast load has the indexes dropped leave out what the rebuild adds
+    if args.targetSize and (args.rows or args.datasetCache or args.resume or args.fastLoad):
+        print("Error: -targetSize can't be used with -rows, -datasetCache, -resume or -fastLoad")
+        sys.exit()
+
     if args.purge:
         FileUtility.purge_generated_files()
         logging.info("Completed generated file purge!")
         sys.exit()
 
+    # a fast load that never finished has to be put back before the schema is read again
+    if os.path.exists(FileUtility.get_recovery_file_path(database)):
+        print("- Found an unfinished fast load for {database}, restoring it first...".format(database=database))
+        from bloat_my_db.utilities.fast_load import FastLoadUtility
+        finish_fast_load(FastLoadUtility(connection_manager, workers=args.workers if args.workers else 1))
+
+    if args.listSnapshots or args.dropSnapshot or args.pruneSnapshots is not None:
+        snapshot_utility = get_snapshot_utility(configuration_values, connection_manager)
+        if args.dropSnapshot:
+            snapshot_utility.drop(args.dropSnapshot)
+        if args.pruneSnapshots is not None:
+            snapshot_utility.prune(args.pruneSnapshots)
+        snapshot_utility.list()
+        snapshot_utility.close()
+        sys.exit()
+
+    if args.restoreSnapshot:
+        snapshot_utility = get_snapshot_utility(configuration_values, connection_manager)
+        snapshot_utility.restore(args.restoreSnapshot)
+        snapshot_utility.close()
+
     if args.truncateDb:
+        from bloat_my_db.utilities.db import DatabaseUtility
+        db_utility = DatabaseUtility(connection_manager)
         db_utility.truncate_db()
+        db_utility.close()
         print("- Completed truncating table for {database}!".format(database=database))
 
+    if args.saveRowCounts:
+        from bloat_my_db.utilities.db import DatabaseUtility
+        db_utility = DatabaseUtility(connection_manager)
+        db_utility.save_row_counts(args.saveRowCounts)
+        db_utility.close()
+
     if args.buildSchema:
+        from bloat_my_db.schema_builders.pg_schema_builder import PgSchemaBuilder
         FileUtility.purge_schema_files()
-        builder = PgSchemaBuilder(configuration_values['db'])
+        builder = PgSchemaBuilder(connection_manager)
         builder.build_schema(force_rebuild=True)
+        builder.close()
         print("- Completed building schema for {database}!".format(database=database))
 
     if args.buildAnalyzedSchema:
+        from bloat_my_db.schema_builders.pg_schema_builder import PgSchemaBuilder
+        from bloat_my_db.schema_analyzers.pg_schema_analyzer import PgSchemaAnalyzer
         FileUtility.purge_analyzer_files()
-        builder = PgSchemaBuilder(configuration_values['db'])
+        builder = PgSchemaBuilder(connection_manager)
         schema = builder.build_schema(force_rebuild=False)
-        analyzer = PgSchemaAnalyzer(schema, configuration_values['db'])
+        builder.close()
+        analyzer = PgSchemaAnalyzer(schema, connection_manager)
         analyzer.build_analyzer_schema(force_rebuild=True)
+        analyzer.close()
         print("- Completed building analyzed schema for {database}!".format(database=database))
 
     if args.openSchema:
-        schema_path = FileUtility.get_generated_file_path(database, 'schemas')
+        schema_path = FileUtility.get_latest_generated_file_path(database, 'schemas')
         open_file_in_browser(schema_path)
         print("- Opened schema for {database} in browser!".format(database=database))
         sys.exit()
 
     if args.openAnalyzedSchema:
-        analyzer_path = FileUtility.get_generated_file_path(database, 'analyzers')
+        analyzer_path = FileUtility.get_latest_generated_file_path(database, 'analyzers')
         open_file_in_browser(analyzer_path)
         print("- Opened analyzed schema for {database} in browser!".format(database=database))
         sys.exit()
 
     if args.buildCSVSchema:
-        FileUtility.purge_csv_files(database)
-        builder = PgSchemaBuilder(configuration_values['db'])
+        from bloat_my_db.schema_builders.pg_schema_builder import PgSchemaBuilder
+        from bloat_my_db.schema_analyzers.pg_schema_analyzer import PgSchemaAnalyzer
+        from bloat_my_db.exporters.csv_export import CsvExporter
+        builder = PgSchemaBuilder(connection_manager)
         schema = builder.build_schema(force_rebuild=False)
-        analyzer = PgSchemaAnalyzer(schema, configuration_values['db'])
+        builder.close()
+        analyzer = PgSchemaAnalyzer(schema, connection_manager)
         analyzed_schema = analyzer.build_analyzer_schema(force_rebuild=force_rebuild)
+        analyzer.close()
         if analyzed_schema:
-            exporter = CsvExporter(analyzed_schema, configuration_values['db'])
+            exporter = CsvExporter(analyzed_schema, connection_manager,
+                                   chunk_size=args.chunkSize if args.chunkSize else default_chunk_size,
+                                   workers=args.workers if args.workers else 1,
+                                   entropy=get_seed(args))
             rows_to_create = args.rows if args.rows else default_rows_to_generate
-            exporter.export_db(rows_to_create)
-            csv_file_path = FileUtility.get_csv_file_directory_path(database)
-            workspace_path = "{export_path}{database}".format(export_path=workspace_path, database=database)
-            FileUtility.zip_and_save_folder(csv_file_path, workspace_path)
-            print("- Completed building CSV export files for {database} database!".format(database=database))
+            try:
+                export_path = exporter.export_db(rows_to_create, workspace_path, export_format=args.exportFormat if args.exportFormat else 'zip')
+            finally:
+                exporter.close()
+            print("- Completed building CSV export files for {database} database in {path}!".format(database=database, path=export_path))
         sys.exit()
 
     if args.populateCSVData:
-        builder = PgSchemaBuilder(configuration_values['db'])
+        from bloat_my_db.schema_builders.pg_schema_builder import PgSchemaBuilder
+        from bloat_my_db.schema_analyzers.pg_schema_analyzer import PgSchemaAnalyzer
+        from bloat_my_db.importers.csv_import import CsvImporter
+        from bloat_my_db.utilities.db import DatabaseUtility
+        builder = PgSchemaBuilder(connection_manager)
         schema = builder.build_schema(force_rebuild=False)
-        analyzer = PgSchemaAnalyzer(schema, configuration_values['db'])
+        builder.close()
+        analyzer = PgSchemaAnalyzer(schema, connection_manager)
         analyzed_schema = analyzer.build_analyzer_schema(force_rebuild=False)
-        acceptable_files = FileUtility.get_files_in_workspace(workspace_path, args)
-        # if user prompt is disabled get first matching user option file.
-        user_option = 1
-        if not args.disablePrompt:
-            user_option = int(input('Please choose a (csv or zip) file to import:'))
-
-        selected_file = acceptable_files[user_option]
-        importer = CsvImporter(analyzed_schema, configuration_values['db'])
+        analyzer.close()
+        if args.importCSVFile:
+            selected_file = args.importCSVFile
+        else:
+            acceptable_files = FileUtility.get_files_in_workspace(workspace_path, args)
+            if not acceptable_files:
+                print("Error: no CSV, zip or CSV directory found in {path}".format(path=workspace_path))
+                sys.exit()
+            # if user prompt is disabled get first matching user option file.
+            user_option = 1
+            if not args.disablePrompt:
+                user_option = int(input('Please choose a (csv, zip or directory) file to import:'))
+            selected_file = acceptable_files[user_option]
+
+        check_freeze(args, analyzed_schema)
+        importer = CsvImporter(analyzed_schema, connection_manager, workers=args.workers if args.workers else 1, freeze=args.freeze)
+        db_utility = DatabaseUtility(connection_manager)
         db_utility.truncate_db()
-        csv_files = importer.import_db(selected_file, analyzed_schema, database)
+        db_utility.close()
+        fast_loader = start_fast_load(args, connection_manager)
+        try:
+            importer.import_db(selected_file, analyzed_schema, database)
+        finally:
+            importer.close()
+            finish_fast_load(fast_loader)
 
-        print(csv_files)
+        print("- Completed importing {file} into {database}!".format(file=selected_file, database=database))
+        save_snapshot(args, configuration_values, connection_manager)
         sys.exit()
 
     if args.populateRandomData:
-        builder = PgSchemaBuilder(configuration_values['db'])
+        from bloat_my_db.schema_builders.pg_schema_builder import PgSchemaBuilder
+        from bloat_my_db.schema_analyzers.pg_schema_analyzer import PgSchemaAnalyzer
+        from bloat_my_db.data_bloaters.pg_data_bloater import PgDataBloater
+        from bloat_my_db.data_bloaters.run_checkpoint import RunCheckpoint
+        builder = PgSchemaBuilder(connection_manager)
         schema = builder.build_schema(force_rebuild=force_rebuild)
-        analyzer = PgSchemaAnalyzer(schema, configuration_values['db'])
+        # not held over the load, a connection idling for hours is the first to be dropped
+        builder.close()
+        analyzer = PgSchemaAnalyzer(schema, connection_manager)
         analyzed_schema = analyzer.build_analyzer_schema(force_rebuild=force_rebuild)
+        analyzer.close()
         if analyzed_schema:
             print("- Completed building & analyzing {database} database!".format(database=database))
-            bloater = PgDataBloater(analyzed_schema, configuration_values['db'])
+            check_freeze(args, analyzed_schema)
+            checkpoint = RunCheckpoint(database)
+            resumed_run = get_resumed_run(args, checkpoint, schema.get('@database_metadata', {}).get('fingerprint'))
             rows_to_create = args.rows if args.rows else default_rows_to_generate
-            bloater.feed_db(rows_to_create)
+            bloater = PgDataBloater(analyzed_schema, connection_manager,
+                                    chunk_size=args.chunkSize if args.chunkSize else default_chunk_size,
+                                    commit_every=args.commitEvery if args.commitEvery else 'table',
+                                    conflict_mode=args.conflictMode if args.conflictMode else ('direct' if args.freeze else 'merge'),
+                                    key_memory_budget=(args.keyMemoryBudget if args.keyMemoryBudget else default_key_memory_budget) * 1024 * 1024,
+                                    workers=args.workers if args.workers else 1,
+                                    shards=args.shards if args.shards else 1,
+                                    value_pool_size=args.valuePoolSize if args.valuePoolSize else default_pool_size,
+                                    copy_format=args.copyFormat if args.copyFormat else 'binary',
+                                    freeze=args.freeze,
+                                    dataset_cache=get_dataset_cache(args),
+                                    schema_fingerprint=schema.get('@database_metadata', {}).get('fingerprint'),
+                                    profile_path=args.profile,
+                                    checkpoint=checkpoint,
+                                    resuming=resumed_run is not None,
+                                    key_starts=get_resumed_key_starts(resumed_run),
+                                    retries=args.retries if args.retries is not None else default_retries,
+                                    target_size=get_target_size(args),
+                                    table_rows=resumed_run.get('table_rows') if resumed_run else get_table_rows(configuration_values, analyzed_schema, rows_to_create),
+                                    entropy=get_seed(args))
+            fast_loader = start_fast_load(args, connection_manager)
+            try:
+                bloater.feed_db(rows_to_create)
+            finally:
+                bloater.close()
+                finish_fast_load(fast_loader)
             print("- Completed bloating {database} database!".format(database=database, rows=rows_to_create))
-            builder.display_stat_results(rows_to_create)
+            bloater.metrics.display()
+            if args.metricsFile:
+                bloater.metrics.save(args.metricsFile, args.metricsFormat if args.metricsFormat else 'json')
+            builder = PgSchemaBuilder(connection_manager)
+            builder.display_stat_results(rows_to_create if not bloater.table_rows else "varies, see the table above", bloater.metrics)
+            builder.close()
 
-    print("--------------------------------------------------------------------------------------------------------")
+    save_snapshot(args, configuration_values, connection_manager)
+
+
+def check_freeze(args, analyzed_schema):
+    # a table referenced by a foreign key can't be truncated on its own, even with its child tables empty,
+    # and -freeze truncates every table by itself, so the foreign keys have to be out of the way
+    if not args.freeze or args.fastLoad:
+        return
+    if any(table['@table_metadata'].get('has_foreign_keys') for value in analyzed_schema.values() for table in value.values()):
+        print("Error: -freeze needs -fastLoad on a schema with foreign keys, Postgres won't truncate a referenced table on its own")
+        sys.exit()
+
+
+def get_resumed_run(args, checkpoint, schema_fingerprint):
+    if not args.resume:
+        return None
+    if not checkpoint.exists():
+        print("Error: no interrupted run of {database} found to resume".format(database=checkpoint.database))
+        sys.exit()
+    run = checkpoint.load_run()
+    if run.get('target_size') is not None:
+        print("Error: the interrupted run of {database} filled up to a -targetSize, it can't be resumed".format(database=checkpoint.database))
+        sys.exit()
+    if run['fingerprint'] != schema_fingerprint:
+        print("Error: the schema of {database} changed since the interrupted run, it can't be resumed".format(database=checkpoint.database))
+        sys.exit()
+    # the rows only come out the same with the settings the run was started with
+    args.seed = int(run['seed'])
+    args.rows = run['rows']
+    args.chunkSize = run['chunk_size']
+    args.workers = run['workers']
+    args.shards = run['shards']
+    args.commitEvery = run['commit_every']
+    args.conflictMode = run['conflict_mode']
+    args.valuePoolSize = run['value_pool_size']
+    tasks = checkpoint.get_tasks()
+    print("- Resuming the run started {started}, {finished} table shards finished and {rows} rows committed so far".format(
+        started=run['started'], finished=sum(1 for task in tasks if task['finished']), rows=sum(task['rows_landed'] for task in tasks)))
+    return run
+
+
+def get_table_rows(configuration_values, analyzed_schema, rows_to_create):
+    if not configuration_values.get('row_counts'):
+        return None
+    from bloat_my_db.data_bloaters.row_counts import get_table_row_counts
+    try:
+        return get_table_row_counts(analyzed_schema, rows_to_create, configuration_values['row_counts'])
+    except ValueError as error:
+        print("Error: {error}".format(error=error))
+        sys.exit()
+
+
+def get_target_size(args):
+    if not args.targetSize:
+        return None
+    from bloat_my_db.data_bloaters.target_size import parse_size
+    try:
+        return parse_size(args.targetSize)
+    except ValueError as error:
+        print("Error: {error}".format(error=error))
+        sys.exit()
+
+
+def get_resumed_key_starts(resumed_run):
+    if resumed_run is None:
+        return None
+    return {(table, column): start for table, column, start in resumed_run['key_starts']}
+
+
+def get_dataset_cache(args):
+    if not args.datasetCache:
+        return None
+    if args.seed is None:
+        print("Error: -datasetCache needs -seed, unseeded runs never generate the same rows twice")
+        sys.exit()
+    from bloat_my_db.data_bloaters.dataset_cache import DatasetCache
+    return DatasetCache(max_bytes=(args.datasetCacheSize if args.datasetCacheSize else default_dataset_cache_size) * 1024 * 1024)
+
+
+def get_seed(args):
+    from bloat_my_db.randoms.seeding import new_entropy
+    seed = args.seed if args.seed is not None else new_entropy()
+    print("- Random data seed is {seed}, rerun with -seed {seed} to get the same rows".format(seed=seed))
+    return seed
+
+
+def get_snapshot_utility(configuration_values, connection_manager):
+    from bloat_my_db.utilities.snapshot import SnapshotUtility
+    maintenance_database = configuration_values.get('snapshots', {}).get('maintenance_database', default_maintenance_database)
+    return SnapshotUtility(connection_manager, maintenance_database=maintenance_database)
+
+
+def save_snapshot(args, configuration_values, connection_manager):
+    if not args.createSnapshot:
+        return
+    snapshot_utility = get_snapshot_utility(configuration_values, connection_manager)
+    snapshot_utility.create(args.createSnapshot)
+    snapshot_utility.close()
+
+
+def start_fast_load(args, connection_manager):
+    if not args.fastLoad:
+        return None
+    from bloat_my_db.utilities.fast_load import FastLoadUtility
+    fast_loader = FastLoadUtility(connection_manager, workers=args.workers if args.workers else 1)
+    fast_loader.defer()
+    return fast_loader
+
+
+def finish_fast_load(fast_loader):
+    if fast_loader is None:
+        return
+    try:
+        fast_loader.restore()
+    finally:
+        fast_loader.close()
 
 
 def run():
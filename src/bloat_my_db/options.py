@@ -0,0 +1,13 @@
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+# choices and defaults of the command line flags, kept free of heavy imports so parsing the arguments stays fast
+conflict_modes = ['merge', 'direct']
+commit_modes = ['table', 'chunk']
+copy_formats = ['binary', 'text']
+export_formats = ['zip', 'gzip', 'zstd']
+metrics_formats = ['json', 'prometheus']
+default_pool_size = 100000
+default_dataset_cache_size = 10240
+default_maintenance_database = 'postgres'
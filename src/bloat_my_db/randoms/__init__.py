@@ -1,20 +1,42 @@
 import random
+import numpy as np
 from datetime import datetime, timedelta
-from faker import Faker
-from faker.providers import person, file, internet, phone_number
+from functools import lru_cache
 
-fake = Faker()
-fake.add_provider(person)
-fake.add_provider(file)
-fake.add_provider(internet)
-fake.add_provider(phone_number)
+default_rng = np.random.default_rng()
+faker_locale = 'en_US'
+
+
+@lru_cache(maxsize=None)
+def get_fake():
+    # Faker and its providers take a while to set up, only generating text values needs them
+    from faker import Faker
+    from faker.providers import person, file, internet, phone_number
+
+    fake = Faker(faker_locale)
+    fake.add_provider(person)
+    fake.add_provider(file)
+    fake.add_provider(internet)
+    fake.add_provider(phone_number)
+    return fake
+
+
+@lru_cache(maxsize=None)
+def get_faker_version():
+    # the installed version is known without importing Faker
+    try:
+        from importlib.metadata import version
+        return version('Faker')
+    except Exception:
+        import faker
+        return faker.VERSION
 
 
 class Randoms:
     @staticmethod
     def get_hash(length):
         choices = '0123456789abcdefghijklmnopqrstuvwxyz'
-        results = ''.join(random.choice(choices) for i in range(length))
+        results = ''.join(random.choices(choices, k=length))
         return results
 
     @staticmethod
@@ -37,21 +59,27 @@ class Randoms:
     def get_value_from_list(selected_list):
         return random.choice(selected_list)
 
+    @staticmethod
+    def get_faker_value(semantic_type, generator=None):
+        generator = generator if generator is not None else get_fake()
+        if semantic_type == 'first_name':
+            return generator.first_name()
+        elif semantic_type == 'last_name':
+            return generator.last_name()
+        elif semantic_type == 'phone_number':
+            return generator.phone_number()
+        elif semantic_type == 'file_name':
+            return generator.file_path(depth=5, extension=generator.random_element(['csv', 'txt', 'bat']))
+        elif semantic_type == 'uri':
+            return generator.uri()
+        raise Exception("no Faker provider for {type}!".format(type=semantic_type))
+
     @staticmethod
     def get_custom_text(column_name):
-        column_name = str(column_name).lower()
-        if column_name == 'first_name' or column_name == 'firstname':
-            return fake.first_name()
-        elif column_name == 'last_name' or column_name == 'lastname':
-            return fake.last_name()
-        elif column_name == 'phone_number' or column_name == 'phonenumber':
-            return fake.phone_number()
-        elif column_name == 'file_name' or column_name == 'filename':
-            fake_files = [fake.file_path(depth=5, extension='csv'),
-                          fake.file_path(depth=5, extension='txt'),
-                          fake.file_path(depth=5, extension='bat')]
-            return Randoms.get_value_from_list(fake_files)
-        elif column_name == 'uri':
-            return fake.uri()
-        else:
-            return Randoms.get_hash(25)
+        # imported here, the value pools module imports this one
+        from bloat_my_db.randoms.value_pools import get_semantic_type, shared_value_pools
+
+        semantic_type = get_semantic_type(column_name)
+        if semantic_type:
+            return str(shared_value_pools.sample(semantic_type, 1, default_rng)[0])
+        return Randoms.get_hash(25)
@@ -0,0 +1,109 @@
+from datetime import datetime
+import numpy as np
+from bloat_my_db.data_bloaters.row_batch import ArrayColumn
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+default_rng = np.random.default_rng()
+hash_alphabet = np.frombuffer(b'0123456789abcdefghijklmnopqrstuvwxyz', dtype=np.uint8)
+hex_alphabet = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+# significant decimal digits a float64 always holds
+float64_digits = 15
+
+
+class BatchRandoms:
+    """Column-at-a-time counterparts of ``Randoms``, every method returns a NumPy array of ``size`` values."""
+
+    @staticmethod
+    def get_hashes(size, length, rng=None):
+        rng = rng if rng is not None else default_rng
+        characters = hash_alphabet[rng.integers(0, len(hash_alphabet), size=(size, length))]
+        return characters.view('S{length}'.format(length=length)).ravel().astype('U{length}'.format(length=length))
+
+    @staticmethod
+    def get_uuids(size, rng=None):
+        rng = rng if rng is not None else default_rng
+        raw = rng.integers(0, 256, size=(size, 16), dtype=np.uint8)
+        # version 4 / RFC 4122 variant bits, same as uuid.uuid4()
+        raw[:, 6] = (raw[:, 6] & 0x0f) | 0x40
+        raw[:, 8] = (raw[:, 8] & 0x3f) | 0x80
+        nibbles = np.empty((size, 32), dtype=np.uint8)
+        nibbles[:, 0::2] = hex_alphabet[raw >> 4]
+        nibbles[:, 1::2] = hex_alphabet[raw & 0x0f]
+        characters = np.full((size, 36), ord('-'), dtype=np.uint8)
+        characters[:, 0:8] = nibbles[:, 0:8]
+        characters[:, 9:13] = nibbles[:, 8:12]
+        characters[:, 14:18] = nibbles[:, 12:16]
+        characters[:, 19:23] = nibbles[:, 16:20]
+        characters[:, 24:36] = nibbles[:, 20:32]
+        return characters.view('S36').ravel().astype('U36')
+
+    @staticmethod
+    def get_datetimes(size, min_year=1900, max_year=datetime.now().year, rng=None):
+        rng = rng if rng is not None else default_rng
+        start = np.datetime64('{year:04d}-01-01T00:00:00'.format(year=min_year), 'us')
+        years = max_year - min_year + 1
+        span = np.timedelta64(365 * years, 'D').astype('timedelta64[us]').astype(np.int64)
+        return start + rng.integers(0, span, size=size).astype('timedelta64[us]')
+
+    @staticmethod
+    def get_numbers(size, rng=None):
+        rng = rng if rng is not None else default_rng
+        return rng.integers(1, 1000, size=size)
+
+    @staticmethod
+    def get_booleans(size, rng=None):
+        rng = rng if rng is not None else default_rng
+        return rng.integers(0, 2, size=size).astype(bool)
+
+    @staticmethod
+    def get_integers(size, low, high, rng=None):
+        rng = rng if rng is not None else default_rng
+        return rng.integers(low, high, size=size, dtype=np.int64)
+
+    @staticmethod
+    def get_floats(size, rng=None):
+        rng = rng if rng is not None else default_rng
+        return rng.random(size) * 1000
+
+    @staticmethod
+    def get_decimals(size, precision, scale, rng=None):
+        # at most float64_digits digits, whole ones first, so every value round trips through a float64,
+        # the fraction digits past them are left as zeros on high scale columns
+        rng = rng if rng is not None else default_rng
+        whole_digits = min(precision - scale, 9)
+        digits = min(whole_digits + scale, float64_digits)
+        fraction_digits = digits - whole_digits
+        return np.round(rng.integers(0, 10 ** digits, size=size) / 10 ** fraction_digits, fraction_digits)
+
+    @staticmethod
+    def get_dates(size, min_year=1900, max_year=datetime.now().year, rng=None):
+        return BatchRandoms.get_datetimes(size, min_year=min_year, max_year=max_year, rng=rng).astype('datetime64[D]')
+
+    @staticmethod
+    def get_json_documents(size, rng=None):
+        rng = rng if rng is not None else default_rng
+        documents = np.char.add('{"id": ', BatchRandoms.get_numbers(size, rng=rng).astype(str))
+        documents = np.char.add(documents, ', "code": "')
+        documents = np.char.add(documents, BatchRandoms.get_hashes(size, 10, rng=rng))
+        return np.char.add(documents, '"}')
+
+    @staticmethod
+    def get_bytes(size, length, rng=None):
+        # one row of raw bytes per value, byte strings can't live in a fixed width numpy string (trailing NULs are dropped)
+        rng = rng if rng is not None else default_rng
+        return rng.integers(0, 256, size=(size, length), dtype=np.uint8)
+
+    @staticmethod
+    def get_ipv4s(size, rng=None):
+        # 1.0.0.0 - 223.255.255.255, the unicast range
+        rng = rng if rng is not None else default_rng
+        return rng.integers(0x01000000, 0xE0000000, size=size, dtype=np.int64).astype(np.uint32)
+
+    @staticmethod
+    def get_arrays(size, get_elements, max_length=3, rng=None):
+        rng = rng if rng is not None else default_rng
+        lengths = rng.integers(0, max_length + 1, size=size)
+        return ArrayColumn(get_elements(int(lengths.sum())), lengths)
@@ -0,0 +1,20 @@
+import zlib
+import numpy as np
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+
+def new_entropy():
+    return np.random.SeedSequence().entropy
+
+
+def get_stable_key(name):
+    # crc32 instead of hash(), str hashes are salted per process and workers must agree on the stream
+    return zlib.crc32(str(name).encode('utf-8'))
+
+
+def derive_rng(entropy, table_name, stream_index=0):
+    """The random stream of one chunk (``stream_index``) of a table, the same in whichever process generates it."""
+    return np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(get_stable_key(table_name), stream_index)))
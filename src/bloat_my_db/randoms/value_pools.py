@@ -0,0 +1,110 @@
+import logging
+import os
+import numpy as np
+from bloat_my_db.randoms import Randoms, faker_locale, get_faker_version
+from bloat_my_db.randoms.seeding import get_stable_key
+from bloat_my_db.options import default_pool_size
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+# bumped when the way pools are generated changes, so cache files of older versions aren't reused
+pool_format_version = 2
+semantic_types = {
+    'first_name': 'first_name', 'firstname': 'first_name',
+    'last_name': 'last_name', 'lastname': 'last_name',
+    'phone_number': 'phone_number', 'phonenumber': 'phone_number',
+    'file_name': 'file_name', 'filename': 'file_name',
+    'uri': 'uri'
+}
+
+
+def get_semantic_type(column_name):
+    return semantic_types.get(str(column_name).lower())
+
+
+class ValuePools:
+    """Pools of distinct Faker values, one per semantic type, generated once and sampled by index.
+
+    Pools are cached as ``.npy`` files under ``generated/pools`` so later runs (and every
+    worker process) only pay for Faker once. Every pool comes from a Faker instance seeded
+    by its type, so a pool is the same on every machine with the same Faker version and
+    locale, cached or not. Some types have fewer distinct values than
+    ``pool_size`` (Faker knows a few thousand first names), their pool stops growing when
+    new values stop turning up.
+    """
+
+    def __init__(self, pool_size=default_pool_size, cache_directory=None):
+        self.pool_size = pool_size
+        self.cache_directory = cache_directory if cache_directory else os.path.join(
+            os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)), 'generated', 'pools')
+        self.pools = dict()
+
+    def get_cache_file_path(self, semantic_type):
+        return os.path.join(self.cache_directory, "{type}_{size}_{locale}_{version}_v{format}.npy".format(
+            type=semantic_type, size=self.pool_size, locale=faker_locale, version=get_faker_version(), format=pool_format_version))
+
+    def generate_pool(self, semantic_type):
+        # imported here, Faker is only needed when a pool isn't cached yet
+        import faker
+        generator = faker.Faker(faker_locale)
+        generator.seed_instance(get_stable_key(semantic_type))
+        values = dict()
+        while len(values) < self.pool_size:
+            missing = self.pool_size - len(values)
+            for index in range(missing):
+                values.setdefault(Randoms.get_faker_value(semantic_type, generator))
+            # less than 1% new values means the provider is close to exhausted
+            if self.pool_size - len(values) > missing * 0.99:
+                break
+        return np.array(list(values))
+
+    def get_pool(self, semantic_type):
+        if semantic_type not in self.pools:
+            cache_file_path = self.get_cache_file_path(semantic_type)
+            if os.path.exists(cache_file_path):
+                self.pools[semantic_type] = np.load(cache_file_path)
+            else:
+                print("- Generating {size} {type} values, cached for later runs...".format(size=self.pool_size, type=semantic_type))
+                pool = self.generate_pool(semantic_type)
+                if not os.path.exists(self.cache_directory):
+                    os.makedirs(self.cache_directory)
+                # written under a unique name first, worker processes may build the same pool at once
+                temporary_path = "{path}.{pid}.npy".format(path=cache_file_path[:-len('.npy')], pid=os.getpid())
+                np.save(temporary_path, pool)
+                os.replace(temporary_path, cache_file_path)
+                self.pools[semantic_type] = pool
+        return self.pools[semantic_type]
+
+    def sample(self, semantic_type, size, rng):
+        pool = self.get_pool(semantic_type)
+        return pool[rng.integers(0, len(pool), size=size)]
+
+    def get_permutation(self, semantic_type, rng):
+        return rng.permutation(len(self.get_pool(semantic_type)))
+
+    def take_unique(self, semantic_type, permutation, start, size, max_length=None):
+        """Returns the values at positions ``start`` .. ``start + size`` of ``permutation``.
+
+        Positions never repeat a value, once the pool is used up every further pass over
+        it gets the pass number appended. With ``max_length`` a value is shortened to
+        leave room for its pass number.
+        """
+        pool = self.get_pool(semantic_type)
+        positions = np.arange(start, start + size)
+        passes = positions // len(pool)
+        values = pool[permutation[positions % len(pool)]]
+        suffixes = np.where(passes > 0, passes.astype(str), '')
+        if max_length:
+            widths = np.char.str_len(suffixes)
+            for width in np.unique(widths):
+                rows = widths == width
+                values[rows] = values[rows].astype('U{length}'.format(length=max(max_length - width, 0)))
+        if passes.max(initial=0) > 0:
+            values = np.char.add(values, suffixes)
+        return values
+
+
+shared_value_pools = ValuePools()
@@ -1,6 +1,4 @@
 import logging
-import os
-import psycopg2
 from progress.bar import Bar
 from bloat_my_db.utilities.file import FileUtility
 from bloat_my_db.utilities import display_in_table
@@ -14,31 +12,39 @@ _logger = logging.getLogger(__name__)
 
 class PgSchemaAnalyzer:
 
-    def __init__(self, schema, conn_info):
-        self.connection = psycopg2.connect(**conn_info)
-        self.database = conn_info['database']
+    def __init__(self, schema, connection_manager):
+        self.connection_manager = connection_manager
+        self.connection = connection_manager.get_connection()
+        self.database = connection_manager.database
         self.cursor = self.connection.cursor()
         self.schema = schema
         self.analyzed_schema = dict()
         self.insert_order = 1
+        # the analyzed schema is derived from the schema, so it is cached under the same catalog fingerprint
+        self.fingerprint = schema.get('@database_metadata', {}).get('fingerprint')
+
+    def close(self):
+        self.cursor.close()
+        self.connection_manager.put_connection(self.connection)
 
     def build_analyzer_schema(self, force_rebuild=False):
-        if FileUtility.is_generated_file_exist(self.database, 'analyzers') and not force_rebuild:
-            print("- {schema_file}.json already exists, using this generated analyzer schema...".format(schema_file=FileUtility.get_filename(self.database)))
-            self.analyzed_schema = FileUtility.load_generated_file(self.database, 'analyzers')
+        if FileUtility.is_generated_file_exist(self.database, 'analyzers', self.fingerprint) and not force_rebuild:
+            print("- {schema_file}.json already exists, using this generated analyzer schema...".format(schema_file=FileUtility.get_filename(self.database, self.fingerprint)))
+            self.analyzed_schema = FileUtility.load_generated_file(self.database, 'analyzers', self.fingerprint)
         else:
             insertion_table_order = self.get_insertion_table_order()
             progress_bar = Bar('- Analyzing schema for {database}, determining insertion order...'.format(database=self.database),
                                max=len(insertion_table_order))
-            for table in insertion_table_order:
+            for table, level in insertion_table_order:
                 table = table.replace("\"", "")
+                table_metadata = dict(self.schema[table]['@table_metadata'], insertion_level=level)
                 self.analyzed_schema[self.insert_order] = {
-                    table: self.schema[table]
+                    table: dict(self.schema[table], **{'@table_metadata': table_metadata})
                 }
                 self.insert_order += 1
                 progress_bar.next()
             progress_bar.finish()
-            FileUtility.generate_json_file(self.database, self.analyzed_schema, 'analyzers')
+            FileUtility.generate_json_file(self.database, self.analyzed_schema, 'analyzers', self.fingerprint)
         return self.analyzed_schema
 
     def display_table_insertion_order(self):
@@ -46,15 +52,14 @@ class PgSchemaAnalyzer:
         for order in self.analyzed_schema:
             table = self.analyzed_schema[order]
             table_name = list(table.keys())[0]
-            display_list.append([order, table_name])
-        display_in_table("Insertion Table Order Results:", display_list, ["INSERT_ORDER", "TABLE_NAME"])
+            display_list.append([order, table[table_name]['@table_metadata'].get('insertion_level'), table_name])
+        display_in_table("Insertion Table Order Results:", display_list, ["INSERT_ORDER", "LEVEL", "TABLE_NAME"])
 
     def get_insertion_table_order(self):
-        sql_file = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)), 'sql/get_insertion_table_order.sql')
-        query = FileUtility.read_file(sql_file)
+        query = FileUtility.read_sql_file('get_insertion_table_order.sql')
         self.cursor.execute(query)
         insertion_data = self.cursor.fetchall()
         output = []
-        for insertion_name in insertion_data:
-            output.append(insertion_name[0])
+        for insertion_name, level in insertion_data:
+            output.append((insertion_name, level))
         return output
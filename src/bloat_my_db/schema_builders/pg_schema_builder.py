@@ -1,8 +1,7 @@
 import logging
+import hashlib
+import json
 from tabulate import tabulate
-import os
-import psycopg2
-from progress.bar import Bar
 from bloat_my_db.utilities.file import FileUtility
 from bloat_my_db.utilities import display_in_table
 
@@ -11,47 +10,84 @@ __copyright__ = "Jason R Alexander"
 __license__ = "MIT"
 
 _logger = logging.getLogger(__name__)
+# bumped whenever the generated schema gains fields, so files cached by an older version are rebuilt
+schema_format_version = 3
 
 
 class PgSchemaBuilder:
 
-    def __init__(self, conn_info):
-        self.connection = psycopg2.connect(**conn_info)
-        self.database = conn_info['database']
+    def __init__(self, connection_manager):
+        self.connection_manager = connection_manager
+        self.connection = connection_manager.get_connection()
+        self.database = connection_manager.database
         self.cursor = self.connection.cursor()
         self.schema = dict()
         self.table_count = 0
 
+    def close(self):
+        self.cursor.close()
+        self.connection_manager.put_connection(self.connection)
+
     def build_schema(self, table_schema_name='public', force_rebuild=False):
+        table_fingerprints = self.get_table_fingerprints(table_schema_name)
+        fingerprint = self.get_catalog_fingerprint(table_fingerprints)
 
-        if FileUtility.is_generated_file_exist(self.database, 'schemas') and not force_rebuild:
-            print("- {schema_file}.json already exists, using this generated schema...".format(schema_file=FileUtility.get_filename(self.database)))
-            self.schema = FileUtility.load_generated_file(self.database, 'schemas')
+        if FileUtility.is_generated_file_exist(self.database, 'schemas', fingerprint) and not force_rebuild:
+            print("- {schema_file}.json already exists, using this generated schema...".format(schema_file=FileUtility.get_filename(self.database, fingerprint)))
+            self.schema = FileUtility.load_generated_file(self.database, 'schemas', fingerprint)
         else:
             tables = self.build_tables(table_schema_name)
+            previous_schema = dict() if force_rebuild else self.load_previous_schema()
+            previous_fingerprints = previous_schema.get('@database_metadata', {}).get('table_fingerprints', {})
+            changed_tables = [table for table in tables
+                              if table not in previous_schema or previous_fingerprints.get(table) != table_fingerprints.get(table)]
+            print('- Building schema for {database}, {changed} of {count} tables changed...'.format(
+                database=self.database, changed=len(changed_tables), count=len(tables)))
+
+            table_columns = self.build_all_columns(changed_tables, table_schema_name) if changed_tables else dict()
             no_foreign_keys = []
             has_foreign_keys = []
-            progress_bar = Bar('- Building schema for {database}...'.format(database=self.database), max=len(tables))
             for table in tables:
-                columns = self.build_columns(table)
+                columns = table_columns[table] if table in table_columns else previous_schema[table]
                 self.schema[table] = columns
                 if columns['@table_metadata']['has_foreign_keys']:
                     has_foreign_keys.append(table)
                 else:
                     no_foreign_keys.append(table)
-                progress_bar.next()
-            progress_bar.finish()
             self.schema["@database_metadata"] = {
                 "no_foreign_key_tables": no_foreign_keys,
-                "foreign_key_tables": has_foreign_keys
+                "foreign_key_tables": has_foreign_keys,
+                "fingerprint": fingerprint,
+                "format_version": schema_format_version,
+                "table_fingerprints": {table: table_fingerprints.get(table) for table in tables}
             }
-            FileUtility.generate_json_file(self.database, self.schema, 'schemas')
+            FileUtility.generate_json_file(self.database, self.schema, 'schemas', fingerprint)
 
         return self.schema
 
+    def get_table_fingerprints(self, table_schema_name='public'):
+        self.cursor.execute(FileUtility.read_sql_file('get_table_fingerprints.sql'), {"schema_name": table_schema_name})
+        return {table[0]: table[1] for table in self.cursor.fetchall()}
+
+    @staticmethod
+    def get_catalog_fingerprint(table_fingerprints):
+        catalog = ','.join(["format:{version}".format(version=schema_format_version)] +
+                           ["{table}:{fingerprint}".format(table=table, fingerprint=fingerprint)
+                            for table, fingerprint in sorted(table_fingerprints.items())])
+        return hashlib.md5(catalog.encode('utf-8')).hexdigest()
+
+    def load_previous_schema(self):
+        previous_path = FileUtility.get_latest_generated_file_path(self.database, 'schemas')
+        if not previous_path:
+            return dict()
+        with open(previous_path) as json_file:
+            previous_schema = json.load(json_file)
+        if previous_schema.get('@database_metadata', {}).get('format_version') != schema_format_version:
+            return dict()
+        return previous_schema
+
     def build_tables(self, table_schema_name='public'):
-        sql_file = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)), 'sql/build_tables.sql')
-        query = FileUtility.read_file(sql_file).format(name=table_schema_name)
+        query = FileUtility.read_sql_file('build_tables.sql').format(name=table_schema_name)
 
         self.cursor.execute(query)
         table_data = self.cursor.fetchall()
@@ -62,30 +98,53 @@ class PgSchemaBuilder:
         return data
 
     def build_columns(self, table_name, table_schema_name='public'):
-        sql_file = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)), 'sql/build_columns.sql')
-        query = FileUtility.read_file(sql_file).format(schema_name=table_schema_name, table_name=table_name)
+        return self.build_all_columns([table_name], table_schema_name)[table_name]
 
-        self.cursor.execute(query)
+    def build_all_columns(self, table_names, table_schema_name='public'):
+        """Introspects the columns, constraints and enum values of all ``table_names`` with one query each."""
+        self.cursor.execute(FileUtility.read_sql_file('build_all_columns.sql'), {"schema_name": table_schema_name, "table_names": list(table_names)})
         column_data = self.cursor.fetchall()
-        column_data_list = []
+        constraints = self.get_all_column_constraints(table_names, table_schema_name)
+        enum_values = self.get_all_enum_values()
+
+        output = dict()
+        for table_name in table_names:
+            output[table_name] = {
+                "columns": [],
+                "@table_metadata": {
+                    "column_count": 0,
+                    "has_foreign_keys": False,
+                    "has_user_defined_keys": False,
+                    "foreign_constraint_tables": []
+                }
+            }
 
-        foreign_key_tables = []
-        has_foreign_keys = False
-        has_user_defined_keys = False
         for column in column_data:
-            constraint = self.get_column_constraint(table_name, column[2])
+            table_name = column[1]
+            table_metadata = output[table_name]['@table_metadata']
+            constraint = constraints.get((table_name, column[2]), {})
             insert_object = {
                 "name": column[2],
                 "data_type": column[5],
                 "column_default": column[3],
                 "is_nullable": column[4],
+                "udt_name": column[6],
             }
+            if column[8] is not None:
+                insert_object["character_maximum_length"] = column[8]
+            if column[6] == 'numeric' and column[9] is not None:
+                insert_object["numeric_precision"] = column[9]
+                insert_object["numeric_scale"] = column[10]
+            if column[5] == 'ARRAY':
+                insert_object["element_type"] = {"name": column[11], "oid": column[12]}
+                if column[13]:
+                    insert_object["element_type"]["values"] = enum_values.get(column[11], [])
 
             if column[5] == 'USER-DEFINED':
-                has_user_defined_keys = True
+                table_metadata['has_user_defined_keys'] = True
                 insert_object["user_defined_type"] = {
                     "name": column[6],
-                    "values": self.get_values_from_type(column[6])
+                    "values": enum_values.get(column[6], [])
                 }
 
             if constraint:
@@ -93,51 +152,34 @@ class PgSchemaBuilder:
 
                 for key, value in constraint.items():
                     if value['type'] == 'FOREIGN KEY':
-                        foreign_key_tables.append(value['referenced_table'])
-                        has_foreign_keys = True
-            column_data_list.append(insert_object)
-
-        output = {
-            "columns": column_data_list,
-            "@table_metadata": {
-                "column_count": len(column_data),
-                "has_foreign_keys": has_foreign_keys,
-                "has_user_defined_keys": has_user_defined_keys,
-                "foreign_constraint_tables": foreign_key_tables
-            }
-        }
-        return output
+                        table_metadata['foreign_constraint_tables'].append(value['referenced_table'])
+                        table_metadata['has_foreign_keys'] = True
+            output[table_name]['columns'].append(insert_object)
+            table_metadata['column_count'] += 1
 
-    def get_column_constraint(self, table_name, column_name, table_schema_name='public'):
-        sql_file = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)), 'sql/get_column_constraint.sql')
-        query = FileUtility.read_file(sql_file).format(schema_name=table_schema_name, table_name=table_name, column_name=column_name)
+        return output
 
-        self.cursor.execute(query)
-        constraint_data = self.cursor.fetchall()
+    def get_all_column_constraints(self, table_names, table_schema_name='public'):
+        self.cursor.execute(FileUtility.read_sql_file('get_all_column_constraints.sql'), {"schema_name": table_schema_name, "table_names": list(table_names)})
         data = dict()
-
-        for constraint in constraint_data:
-            data[constraint[4]] = {
-                "type": constraint[5],
-                "referenced_table": constraint[8],
-                "referenced_column": constraint[9]
+        for constraint in self.cursor.fetchall():
+            data.setdefault((constraint[0], constraint[1]), dict())[constraint[2]] = {
+                "type": constraint[3],
+                "referenced_table": constraint[4],
+                "referenced_column": constraint[5]
             }
         return data
 
-    def get_values_from_type(self, type):
-        sql_file = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)), 'sql/get_values_from_type.sql')
-        query = FileUtility.read_file(sql_file).format(type=type)
-        self.cursor.execute(query)
-        types = []
-        type_data = self.cursor.fetchall()
-        for tdata in type_data:
-            types.append(tdata[1])
+    def get_all_enum_values(self):
+        self.cursor.execute(FileUtility.read_sql_file('get_all_enum_values.sql'))
+        types = dict()
+        for tdata in self.cursor.fetchall():
+            types.setdefault(tdata[0], []).append(tdata[1])
         return types
 
-    def get_table_count(self):
-        sql_file = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)), 'sql/get_table_count.sql')
-        query = FileUtility.read_file(sql_file).format(type=type)
-        self.cursor.execute(query)
+    def get_table_count(self, table_schema_name='public'):
+        # temp staging tables live in pg_temp_* schemas and aren't counted
+        self.cursor.execute(FileUtility.read_sql_file('get_table_count.sql'), {"schema_name": table_schema_name})
         count = self.cursor.fetchone()
         self.table_count = count[0]
         return self.table_count
@@ -145,10 +187,8 @@ class PgSchemaBuilder:
     def display_table_count(self):
         display_in_table("Table Count Results:", [[self.get_table_count()]], ["TABLE_COUNT"])
 
-    def get_row_count_by_table(self):
-        sql_file = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)), 'sql/get_row_count_by_table.sql')
-        query = FileUtility.read_file(sql_file).format(type=type)
-        self.cursor.execute(query)
+    def get_row_count_by_table(self, table_schema_name='public'):
+        self.cursor.execute(FileUtility.read_sql_file('get_row_count_by_table.sql'), {"schema_name": table_schema_name})
         tables = []
         type_data = self.cursor.fetchall()
         for tdata in type_data:
@@ -158,8 +198,11 @@ class PgSchemaBuilder:
     def display_row_count_by_table(self):
         display_in_table("Row Count By Table Results:", self.get_row_count_by_table(), ["TABLE_NAME", "COUNT"])
 
-    def display_stat_results(self, rows_to_create):
+    def display_stat_results(self, rows_to_create, run_metrics):
+        # rows skipped on conflict never landed, only what the loader counted is reported
         print(tabulate( [["Total tables", self.get_table_count()],
-                         ["Rows added per table", rows_to_create],
-                         ["Total rows inserted", rows_to_create * self.get_table_count()]
+                         ["Tables loaded", len(run_metrics.tables)],
+                         ["Rows generated per table", rows_to_create],
+                         ["Total rows inserted", run_metrics.get_total('rows_landed')],
+                         ["Rows skipped on conflict", run_metrics.get_total('rows_generated') - run_metrics.get_total('rows_landed')]
                          ], headers=['Results:', ' '], tablefmt="fancy_grid"))
@@ -0,0 +1,33 @@
+select
+    namespace.nspname as table_schema,
+    class.relname as table_name,
+    attribute.attname as column_name,
+    pg_get_expr(attrdef.adbin, attrdef.adrelid) as column_default,
+    not (attribute.attnotnull or (type.typtype = 'd' and type.typnotnull)) as is_nullable,
+    -- same naming as information_schema.columns.data_type, domains report their base type
+    case
+        when coalesce(base_type.typelem, type.typelem) <> 0 and coalesce(base_type.typlen, type.typlen) = -1 then 'ARRAY'
+        when coalesce(base_type.typnamespace, type.typnamespace) = 'pg_catalog'::regnamespace then format_type(coalesce(base_type.oid, type.oid), null)
+        else 'USER-DEFINED'
+    end as data_type,
+    coalesce(base_type.typname, type.typname) as udt_name,
+    col_description(class.oid, attribute.attnum),
+    information_schema._pg_char_max_length(coalesce(base_type.oid, type.oid), coalesce(nullif(type.typtypmod, -1), attribute.atttypmod)) as character_maximum_length,
+    information_schema._pg_numeric_precision(coalesce(base_type.oid, type.oid), coalesce(nullif(type.typtypmod, -1), attribute.atttypmod)) as numeric_precision,
+    information_schema._pg_numeric_scale(coalesce(base_type.oid, type.oid), coalesce(nullif(type.typtypmod, -1), attribute.atttypmod)) as numeric_scale,
+    element_type.typname as element_udt_name,
+    element_type.oid::int as element_oid,
+    element_type.typtype = 'e' as element_is_enum
+from pg_attribute attribute
+         join pg_class class on class.oid = attribute.attrelid
+         join pg_namespace namespace on namespace.oid = class.relnamespace
+         join pg_type type on type.oid = attribute.atttypid
+         left join pg_type base_type on type.typtype = 'd' and base_type.oid = type.typbasetype
+         left join pg_type element_type on element_type.oid = coalesce(base_type.typelem, type.typelem)
+             and coalesce(base_type.typlen, type.typlen) = -1
+         left join pg_attrdef attrdef on attrdef.adrelid = attribute.attrelid and attrdef.adnum = attribute.attnum
+where namespace.nspname = %(schema_name)s
+  and class.relname = any(%(table_names)s)
+  and attribute.attnum > 0
+  and not attribute.attisdropped
+order by class.relname, attribute.attnum
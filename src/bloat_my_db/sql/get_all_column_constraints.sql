@@ -0,0 +1,24 @@
+select
+    class.relname as table_name,
+    attribute.attname as column_name,
+    con.conname as constraint_name,
+    case con.contype
+        when 'p' then 'PRIMARY KEY'
+        when 'f' then 'FOREIGN KEY'
+        when 'u' then 'UNIQUE'
+        when 'c' then 'CHECK'
+    end as constraint_type,
+    -- primary keys, unique keys and checks reference their own column
+    coalesce(referenced_class.relname, class.relname) as referenced_table,
+    coalesce(referenced_attribute.attname, attribute.attname) as referenced_column
+from pg_constraint con
+         join pg_class class on class.oid = con.conrelid
+         join pg_namespace namespace on namespace.oid = class.relnamespace
+         cross join lateral unnest(con.conkey, coalesce(con.confkey, con.conkey)) with ordinality as keys(attnum, referenced_attnum, position)
+         join pg_attribute attribute on attribute.attrelid = con.conrelid and attribute.attnum = keys.attnum
+         left join pg_class referenced_class on referenced_class.oid = con.confrelid
+         left join pg_attribute referenced_attribute on referenced_attribute.attrelid = con.confrelid and referenced_attribute.attnum = keys.referenced_attnum
+where namespace.nspname = %(schema_name)s
+  and class.relname = any(%(table_names)s)
+  and con.contype in ('p', 'f', 'u', 'c')
+order by class.relname, con.conname, keys.position
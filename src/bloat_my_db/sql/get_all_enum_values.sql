@@ -3,4 +3,4 @@ SELECT pg_type.typname AS enumtype,
 FROM pg_type
          JOIN pg_enum
               ON pg_enum.enumtypid = pg_type.oid
-WHERE pg_type.typname = '{type}'
+ORDER BY pg_type.typname, pg_enum.enumsortorder
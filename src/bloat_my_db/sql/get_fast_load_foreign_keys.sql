@@ -0,0 +1,13 @@
+select
+    table_class.relname as table_name,
+    con.conname as constraint_name,
+    pg_get_constraintdef(con.oid) as definition,
+    con.convalidated as validated
+from pg_constraint con
+         join pg_class table_class on table_class.oid = con.conrelid
+         join pg_namespace namespace on namespace.oid = table_class.relnamespace
+where namespace.nspname = %(schema_name)s
+  and con.contype = 'f'
+  and table_class.relkind = 'r'
+  and not table_class.relispartition
+order by table_class.relname, con.conname
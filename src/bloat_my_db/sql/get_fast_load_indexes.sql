@@ -0,0 +1,17 @@
+select
+    table_class.relname as table_name,
+    index_class.relname as index_name,
+    pg_get_indexdef(index.indexrelid) as definition,
+    index.indisunique as is_unique,
+    index.indisexclusion as is_exclusion
+from pg_index index
+         join pg_class index_class on index_class.oid = index.indexrelid
+         join pg_class table_class on table_class.oid = index.indrelid
+         join pg_namespace namespace on namespace.oid = table_class.relnamespace
+where namespace.nspname = %(schema_name)s
+  and table_class.relkind = 'r'
+  and not table_class.relispartition
+  and index.indisvalid
+  -- indexes backing a primary key, unique or exclusion constraint stay, ON CONFLICT and foreign keys need them
+  and not exists (select 1 from pg_constraint con where con.conindid = index.indexrelid)
+order by table_class.relname, index_class.relname
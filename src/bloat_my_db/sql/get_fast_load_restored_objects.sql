@@ -0,0 +1,13 @@
+select 'index' as object_type, table_class.relname as table_name, index_class.relname as object_name, index.indisvalid as is_ready
+from pg_index index
+         join pg_class index_class on index_class.oid = index.indexrelid
+         join pg_class table_class on table_class.oid = index.indrelid
+         join pg_namespace namespace on namespace.oid = table_class.relnamespace
+where namespace.nspname = %(schema_name)s
+union all
+select 'constraint', table_class.relname, con.conname, con.convalidated
+from pg_constraint con
+         join pg_class table_class on table_class.oid = con.conrelid
+         join pg_namespace namespace on namespace.oid = table_class.relnamespace
+where namespace.nspname = %(schema_name)s
+  and con.contype = 'f'
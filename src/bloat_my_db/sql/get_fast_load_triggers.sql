@@ -0,0 +1,12 @@
+select
+    table_class.relname as table_name,
+    trigger.tgname as trigger_name,
+    trigger.tgenabled as enabled
+from pg_trigger trigger
+         join pg_class table_class on table_class.oid = trigger.tgrelid
+         join pg_namespace namespace on namespace.oid = table_class.relnamespace
+where namespace.nspname = %(schema_name)s
+  and not trigger.tgisinternal
+  and trigger.tgenabled <> 'D'
+  and table_class.relkind = 'r'
+order by table_class.relname, trigger.tgname
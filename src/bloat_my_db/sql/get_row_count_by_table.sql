@@ -1,3 +1,4 @@
 SELECT relname,n_live_tup
 FROM pg_stat_user_tables
+WHERE schemaname = %(schema_name)s
 ORDER BY n_live_tup DESC
@@ -0,0 +1,6 @@
+select table_class.relname as table_name
+from pg_class table_class
+         join pg_namespace namespace on namespace.oid = table_class.relnamespace
+where namespace.nspname = %(schema_name)s
+  and table_class.relkind in ('r', 'p')
+order by table_class.relname
@@ -0,0 +1,9 @@
+select snapshot_database.datname as database_name,
+       pg_database_size(snapshot_database.oid) as size,
+       shared_description.description
+from pg_database snapshot_database
+         left join pg_shdescription shared_description
+                   on shared_description.objoid = snapshot_database.oid
+                       and shared_description.classoid = 'pg_database'::regclass
+where snapshot_database.datname like %(prefix)s
+order by snapshot_database.datname
@@ -0,0 +1,8 @@
+SELECT coalesce(stat.n_tup_ins, 0),
+       coalesce(stat.n_tup_upd, 0),
+       coalesce(stat.n_tup_del, 0),
+       pg_relation_size(class.oid)
+FROM pg_class class
+         LEFT JOIN pg_stat_user_tables stat
+                   ON stat.relid = class.oid
+WHERE class.oid = '"{table_name}"'::regclass
@@ -1,4 +1,3 @@
 SELECT count(*)
 FROM pg_catalog.pg_tables
-WHERE schemaname != 'pg_catalog' AND
-    schemaname != 'information_schema';
+WHERE schemaname = %(schema_name)s;
@@ -0,0 +1,26 @@
+select
+    class.relname as table_name,
+    md5(
+        class.relkind::text || '|' ||
+        coalesce((
+            select string_agg(attribute.attname || ':' || format_type(attribute.atttypid, attribute.atttypmod) || ':' ||
+                              attribute.attnotnull::text || ':' || coalesce(pg_get_expr(attrdef.adbin, attrdef.adrelid), '') || ':' ||
+                              coalesce((select string_agg(enum.enumlabel, ',' order by enum.enumsortorder)
+                                        from pg_enum enum
+                                        where enum.enumtypid = attribute.atttypid), ''),
+                              ',' order by attribute.attnum)
+            from pg_attribute attribute
+                     left join pg_attrdef attrdef on attrdef.adrelid = attribute.attrelid and attrdef.adnum = attribute.attnum
+            where attribute.attrelid = class.oid and attribute.attnum > 0 and not attribute.attisdropped
+        ), '') || '|' ||
+        coalesce((
+            select string_agg(con.conname || ':' || pg_get_constraintdef(con.oid), ',' order by con.conname)
+            from pg_constraint con
+            where con.conrelid = class.oid
+        ), '')
+    ) as fingerprint
+from pg_class class
+         join pg_namespace namespace on namespace.oid = class.relnamespace
+where namespace.nspname = %(schema_name)s
+  and class.relkind in ('r', 'p', 'v', 'f')
+order by class.relname
@@ -0,0 +1 @@
+SELECT pg_total_relation_size(%(table_name)s::regclass)
@@ -0,0 +1,3 @@
+select setval(pg_get_serial_sequence(%(table_name)s, %(column_name)s), max_value)
+from (select max("{column_name}") as max_value from "{table_name}") as table_max
+where max_value is not null
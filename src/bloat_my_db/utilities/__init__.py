@@ -1,11 +1,6 @@
-import time
-import json
 import logging
-import os
-import pyfiglet
-from os.path import exists
+import sys
 import webbrowser
-from tabulate import tabulate
 
 __author__ = "Jason R Alexander"
 __copyright__ = "Jason R Alexander"
@@ -28,12 +23,18 @@ def open_file_in_browser(path):
 
 
 def display_in_table(title, table, headers):
+    # imported here, main imports this module and -h or -purge never render a table
+    from tabulate import tabulate
     print("\n{title}".format(title=title))
     print(tabulate(table, headers=headers, tablefmt="fancy_grid"))
     print("\n")
 
 
 def script_intro_title():
+    # the banner is only for people watching, CI logs and pipes skip rendering it
+    if not sys.stdout.isatty():
+        return
+    import pyfiglet
     ascii_title = pyfiglet.figlet_format("B l o a t DB", font="3-d")
     print(ascii_title)
 
@@ -0,0 +1,86 @@
+import logging
+import os
+from contextlib import contextmanager
+from multiprocessing.util import Finalize
+from psycopg2.pool import ThreadedConnectionPool
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+# pools are per process, a manager handed to a worker process reuses that process' pool across tasks
+_process_pools = dict()
+
+
+def close_process_pools():
+    # forked children inherit the parent's pools, those sockets belong to the parent and must be left alone
+    for pool_key in [pool_key for pool_key in _process_pools if pool_key[0] == os.getpid()]:
+        _process_pools.pop(pool_key).closeall()
+
+
+class ConnectionManager:
+    """Hands out pooled connections to every component (builder, analyzer, bloater, importer, exporter, utilities).
+
+    ``session_settings`` (e.g. ``{"synchronous_commit": "off", "work_mem": "64MB"}``) are
+    sent as startup options, so they are applied once per physical connection without an
+    extra round trip. The manager can be passed to worker processes, which open their own
+    pool on first use and close it when the process exits.
+    """
+
+    def __init__(self, conn_info, session_settings=None, max_connections=10):
+        self.conn_info = conn_info
+        self.database = conn_info['database']
+        self.session_settings = session_settings if session_settings else dict()
+        self.max_connections = max_connections
+
+    def __getstate__(self):
+        return {"conn_info": self.conn_info, "session_settings": self.session_settings, "max_connections": self.max_connections}
+
+    def __setstate__(self, state):
+        self.__init__(state['conn_info'], state['session_settings'], state['max_connections'])
+
+    def get_pool_key(self):
+        return (os.getpid(), repr(sorted(self.conn_info.items())), repr(sorted(self.session_settings.items())))
+
+    def get_connect_kwargs(self):
+        connect_kwargs = dict(self.conn_info)
+        if self.session_settings:
+            options = ' '.join("-c {name}={value}".format(name=name, value=value) for name, value in self.session_settings.items())
+            connect_kwargs['options'] = ' '.join(filter(None, [connect_kwargs.get('options'), options]))
+        return connect_kwargs
+
+    @property
+    def pool(self):
+        pool_key = self.get_pool_key()
+        if pool_key not in _process_pools:
+            if not any(key[0] == pool_key[0] for key in _process_pools):
+                Finalize(None, close_process_pools, exitpriority=10)
+            _process_pools[pool_key] = ThreadedConnectionPool(0, self.max_connections, **self.get_connect_kwargs())
+        return _process_pools[pool_key]
+
+    def get_connection(self):
+        return self.pool.getconn()
+
+    def put_connection(self, connection):
+        if connection.closed:
+            self.pool.putconn(connection, close=True)
+        else:
+            # autocommit can only be switched outside a transaction, and is only ever on outside of one
+            if connection.autocommit:
+                connection.autocommit = False
+            self.pool.putconn(connection)
+
+    @contextmanager
+    def connection(self):
+        connection = self.get_connection()
+        try:
+            yield connection
+        finally:
+            self.put_connection(connection)
+
+    def close_all(self):
+        pool = _process_pools.pop(self.get_pool_key(), None)
+        if pool is not None:
+            pool.closeall()
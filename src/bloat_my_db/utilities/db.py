@@ -1,6 +1,7 @@
 import logging
+import json
 import sys
-import psycopg2
+from bloat_my_db.utilities.file import FileUtility
 
 __author__ = "Jason R Alexander"
 __copyright__ = "Jason R Alexander"
@@ -12,26 +13,24 @@ generation_types = ['schemas', 'analyzers']
 
 class DatabaseUtility:
 
-    def __init__(self, conn_info):
-        self.connection = psycopg2.connect(**conn_info)
-        self.database = conn_info['database']
+    def __init__(self, connection_manager):
+        self.connection_manager = connection_manager
+        self.connection = connection_manager.get_connection()
+        self.database = connection_manager.database
         self.cursor = self.connection.cursor()
 
-    def truncate_db(self):
+    def close(self):
+        self.cursor.close()
+        self.connection_manager.put_connection(self.connection)
+
+    def truncate_db(self, table_schema_name='public'):
         try:
-            self.cursor.execute("""
-            CREATE OR REPLACE FUNCTION truncate_tables(username IN VARCHAR) RETURNS void AS $$
-            DECLARE
-                statements CURSOR FOR
-                    SELECT tablename FROM pg_tables
-                    WHERE tableowner = username AND schemaname = 'public';
-            BEGIN
-                FOR stmt IN statements LOOP
-                    EXECUTE 'TRUNCATE TABLE ' || quote_ident(stmt.tablename) || ' CASCADE;';
-                END LOOP;
-            END;
-            $$ LANGUAGE plpgsql;""")
-            self.cursor.execute("""SELECT truncate_tables('postgres');""")
+            # one statement for every table of the schema whoever owns it, they are locked and emptied together
+            self.cursor.execute(FileUtility.read_sql_file('get_schema_tables.sql'), {'schema_name': table_schema_name})
+            tables = [row[0] for row in self.cursor.fetchall()]
+            if tables:
+                self.cursor.execute("""TRUNCATE TABLE {tables} CASCADE""".format(
+                    tables=", ".join('"{schema}"."{table}"'.format(schema=table_schema_name, table=table) for table in tables)))
         except Exception as error:
             print("- FAILED truncating db ")
             print("\n")
@@ -41,3 +40,13 @@ class DatabaseUtility:
             sys.exit()
         else:
             self.connection.commit()
+
+    def save_row_counts(self, snapshot_path, table_schema_name='public'):
+        # planner estimates, only as fresh as the last ANALYZE, tables never analyzed (-1) are left out
+        self.cursor.execute(FileUtility.read_sql_file('get_table_reltuples.sql'), {'schema_name': table_schema_name})
+        row_counts = {table: int(reltuples) for table, reltuples in self.cursor.fetchall() if reltuples >= 0}
+        self.connection.commit()
+        with open(snapshot_path, 'w') as outfile:
+            outfile.write(json.dumps(row_counts, indent=4))
+        print("- Saved the row counts of {count} tables of {database} to {path}".format(count=len(row_counts), database=self.database, path=snapshot_path))
+        return row_counts
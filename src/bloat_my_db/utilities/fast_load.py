@@ -0,0 +1,175 @@
+import logging
+import json
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from bloat_my_db.utilities.file import FileUtility
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+trigger_enable_clauses = {'O': 'ENABLE TRIGGER', 'R': 'ENABLE REPLICA TRIGGER', 'A': 'ENABLE ALWAYS TRIGGER'}
+
+
+def get_concurrent_index_definition(definition):
+    # pg_get_indexdef always starts with "CREATE [UNIQUE] INDEX name ON ..."
+    return re.sub(r'^CREATE (UNIQUE )?INDEX ', r'CREATE \1INDEX CONCURRENTLY ', definition, count=1)
+
+
+def get_deferrable_indexes(indexes):
+    # standalone unique and exclusion indexes enforce uniqueness too, dropping them would let duplicates
+    # in and leave an INVALID index behind once CREATE UNIQUE INDEX CONCURRENTLY fails on restore
+    return [index for index in indexes if not index['is_unique'] and not index['is_exclusion']]
+
+
+def get_not_valid_constraint_definition(definition):
+    return definition if definition.endswith(' NOT VALID') else "{definition} NOT VALID".format(definition=definition)
+
+
+class FastLoadUtility:
+    """Takes secondary indexes, foreign keys and triggers out of the way of a bulk load and puts them back afterwards.
+
+    The captured definitions are written to a recovery file before anything is dropped,
+    ``restore`` replays it and only removes it once every object is back, so a run that
+    died partway is repaired by the next one.
+    """
+
+    def __init__(self, connection_manager, workers=1, table_schema_name='public'):
+        self.connection_manager = connection_manager
+        self.connection = connection_manager.get_connection()
+        self.database = connection_manager.database
+        self.cursor = self.connection.cursor()
+        self.workers = max(1, workers)
+        self.table_schema_name = table_schema_name
+        self.recovery_file_path = FileUtility.get_recovery_file_path(self.database)
+
+    def close(self):
+        self.cursor.close()
+        self.connection_manager.put_connection(self.connection)
+
+    def has_pending_recovery(self):
+        return os.path.exists(self.recovery_file_path)
+
+    def fetch(self, sql_file):
+        self.cursor.execute(FileUtility.read_sql_file(sql_file), {'schema_name': self.table_schema_name})
+        columns = [description[0] for description in self.cursor.description]
+        return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
+
+    def capture(self):
+        return {
+            'tables': [row['table_name'] for row in self.fetch('get_schema_tables.sql')],
+            'indexes': get_deferrable_indexes(self.fetch('get_fast_load_indexes.sql')),
+            'foreign_keys': self.fetch('get_fast_load_foreign_keys.sql'),
+            'triggers': self.fetch('get_fast_load_triggers.sql'),
+        }
+
+    def defer(self):
+        if self.has_pending_recovery():
+            print("- Found an unfinished fast load for {database}, restoring it first...".format(database=self.database))
+            self.restore()
+
+        deferred = self.capture()
+        self.connection.commit()
+        with open(self.recovery_file_path, 'w') as outfile:
+            outfile.write(json.dumps(deferred, indent=4))
+
+        try:
+            for trigger in deferred['triggers']:
+                self.cursor.execute('ALTER TABLE "{table}" DISABLE TRIGGER "{trigger}"'.format(
+                    table=trigger['table_name'], trigger=trigger['trigger_name']))
+            for foreign_key in deferred['foreign_keys']:
+                self.cursor.execute('ALTER TABLE "{table}" DROP CONSTRAINT "{constraint}"'.format(
+                    table=foreign_key['table_name'], constraint=foreign_key['constraint_name']))
+            for index in deferred['indexes']:
+                self.cursor.execute('DROP INDEX "{schema}"."{index}"'.format(schema=self.table_schema_name, index=index['index_name']))
+        except Exception as error:
+            self.connection.rollback()
+            os.remove(self.recovery_file_path)
+            print("- FAILED deferring indexes, foreign keys and triggers")
+            print("\n")
+            print("ERROR: {error}".format(error=error))
+            sys.exit()
+        else:
+            self.connection.commit()
+
+        print("- Deferred {indexes} indexes, {foreign_keys} foreign keys and {triggers} triggers for fast load".format(
+            indexes=len(deferred['indexes']), foreign_keys=len(deferred['foreign_keys']), triggers=len(deferred['triggers'])))
+
+    def run_statements(self, statements):
+        # every statement list runs on its own autocommit connection, CREATE INDEX CONCURRENTLY can't run in a transaction
+        with self.connection_manager.connection() as connection:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    _logger.debug(statement)
+                    cursor.execute(statement)
+
+    def run_in_parallel(self, description, statements_by_table):
+        failures = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.run_statements, statements): table for table, statements in statements_by_table.items() if statements}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as error:
+                    failures.append(error)
+                    print("- FAILED {description} for [{table}] table: {error}".format(description=description, table=futures[future], error=error))
+        return failures
+
+    def get_restored_objects(self):
+        rows = self.fetch('get_fast_load_restored_objects.sql')
+        self.connection.commit()
+        return {(row['object_type'], row['table_name'], row['object_name']): row['is_ready'] for row in rows}
+
+    def restore(self):
+        if not self.has_pending_recovery():
+            return
+        with open(self.recovery_file_path) as json_file:
+            deferred = json.load(json_file)
+        # the run may have died at any step, so every object is checked before it is put back
+        restored_objects = self.get_restored_objects()
+
+        index_statements = dict()
+        for index in deferred['indexes']:
+            is_ready = restored_objects.get(('index', index['table_name'], index['index_name']))
+            statements = index_statements.setdefault(index['table_name'], [])
+            if is_ready:
+                continue
+            if is_ready is False:
+                # left invalid by an interrupted concurrent build
+                statements.append('DROP INDEX CONCURRENTLY "{schema}"."{index}"'.format(schema=self.table_schema_name, index=index['index_name']))
+            statements.append(get_concurrent_index_definition(index['definition']))
+        print("- Recreating {count} indexes concurrently...".format(count=len(deferred['indexes'])))
+        failures = self.run_in_parallel('recreating indexes', index_statements)
+
+        constraint_statements = dict()
+        for foreign_key in deferred['foreign_keys']:
+            is_validated = restored_objects.get(('constraint', foreign_key['table_name'], foreign_key['constraint_name']))
+            statements = constraint_statements.setdefault(foreign_key['table_name'], [])
+            if is_validated is None:
+                statements.append('ALTER TABLE "{table}" ADD CONSTRAINT "{constraint}" {definition}'.format(
+                    table=foreign_key['table_name'], constraint=foreign_key['constraint_name'],
+                    definition=get_not_valid_constraint_definition(foreign_key['definition'])))
+            if foreign_key['validated'] and not is_validated:
+                statements.append('ALTER TABLE "{table}" VALIDATE CONSTRAINT "{constraint}"'.format(
+                    table=foreign_key['table_name'], constraint=foreign_key['constraint_name']))
+        print("- Re-validating {count} foreign keys...".format(count=len(deferred['foreign_keys'])))
+        failures += self.run_in_parallel('re-validating foreign keys', constraint_statements)
+
+        trigger_statements = dict()
+        for trigger in deferred['triggers']:
+            trigger_statements.setdefault(trigger['table_name'], []).append('ALTER TABLE "{table}" {clause} "{trigger}"'.format(
+                table=trigger['table_name'], clause=trigger_enable_clauses[trigger['enabled']], trigger=trigger['trigger_name']))
+        failures += self.run_in_parallel('enabling triggers', trigger_statements)
+
+        if failures:
+            print("- Fast load restore is incomplete, it will be retried from {path} on the next -fastLoad run".format(path=self.recovery_file_path))
+            return
+
+        os.remove(self.recovery_file_path)
+        print("- Analyzing {count} tables...".format(count=len(deferred['tables'])))
+        self.run_in_parallel('analyzing', {table: ['ANALYZE "{table}"'.format(table=table)] for table in deferred['tables']})
+        print("- Restored indexes, foreign keys and triggers for {database}!".format(database=self.database))
@@ -4,6 +4,7 @@ import os
 from os.path import exists
 import time
 import shutil
+from functools import lru_cache
 
 __author__ = "Jason R Alexander"
 __copyright__ = "Jason R Alexander"
@@ -15,8 +16,8 @@ generation_types = ['schemas', 'analyzers']
 
 class FileUtility:
     @staticmethod
-    def generate_json_file(database_name, data, generation_type):
-        file_name = FileUtility.get_filename(database_name)
+    def generate_json_file(database_name, data, generation_type, fingerprint=None):
+        file_name = FileUtility.get_filename(database_name, fingerprint)
         json_schema = json.dumps(data, indent=4)
 
         if generation_type not in generation_types:
@@ -28,27 +29,53 @@ class FileUtility:
             outfile.write(json_schema)
 
     @staticmethod
-    def get_filename(database_name):
+    def get_filename(database_name, fingerprint=None):
+        # schema files are keyed by the catalog fingerprint, everything else by date
+        if fingerprint:
+            return "{database}_{fingerprint}".format(database=database_name, fingerprint=fingerprint[:16])
         file_date = time.strftime("%Y%m%d")
         return "{database}_{date}".format(database=database_name, date=file_date)
 
     @staticmethod
-    def is_generated_file_exist(database_name, generation_type):
-        full_path = FileUtility.get_generated_file_path(database_name, generation_type)
+    def is_generated_file_exist(database_name, generation_type, fingerprint=None):
+        full_path = FileUtility.get_generated_file_path(database_name, generation_type, fingerprint)
         return exists(full_path)
 
     @staticmethod
-    def load_generated_file(database_name, generation_type):
-        full_path = FileUtility.get_generated_file_path(database_name, generation_type)
+    def load_generated_file(database_name, generation_type, fingerprint=None):
+        full_path = FileUtility.get_generated_file_path(database_name, generation_type, fingerprint)
         with open(full_path) as json_file:
             return json.load(json_file)
 
     @staticmethod
-    def get_generated_file_path(database_name, generation_type):
-        file_name = FileUtility.get_filename(database_name)
+    def get_generated_file_path(database_name, generation_type, fingerprint=None):
+        file_name = FileUtility.get_filename(database_name, fingerprint)
         path = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)), 'generated')
         return '{path}/{type}/{file_name}.json'.format(path=path, file_name=file_name, type=generation_type)
 
+    @staticmethod
+    def get_latest_generated_file_path(database_name, generation_type):
+        path = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)), 'generated', generation_type)
+        prefix = "{database}_".format(database=database_name)
+        # the suffix is a date or fingerprint, never contains "_", so "db_x_..." files don't count as "db" files
+        candidates = [os.path.join(path, file) for file in os.listdir(path)
+                      if file.startswith(prefix) and file.endswith('.json') and '_' not in file[len(prefix):]]
+        if not candidates:
+            return None
+        return max(candidates, key=os.path.getmtime)
+
+    @staticmethod
+    def get_recovery_file_path(database_name):
+        path = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)), 'generated', 'recovery')
+        if not os.path.exists(path):
+            os.makedirs(path)
+        return '{path}/{database}_fast_load.json'.format(path=path, database=database_name)
+
+    @staticmethod
+    def get_checkpoint_directory_path(database_name):
+        path = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)), 'generated', 'recovery')
+        return '{path}/{database}_checkpoint'.format(path=path, database=database_name)
+
     @staticmethod
     def get_csv_file_directory_path(database_name):
         generated_path = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)), 'generated')
@@ -70,8 +97,18 @@ class FileUtility:
         file.close()
         return contents
 
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def read_sql_file(file_name):
+        # the packaged .sql files never change while running, read each of them once
+        sql_path = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)), 'sql', file_name)
+        return FileUtility.read_file(sql_path)
+
     @staticmethod
     def delete_files(folder_path):
+        # nothing was generated into it yet
+        if not os.path.exists(folder_path):
+            return
         for filename in os.listdir(folder_path):
             file_path = os.path.join(folder_path, filename)
             try:
@@ -80,14 +117,30 @@ class FileUtility:
             except Exception as e:
                 _logger.error('Failed to delete %s. Reason: %s' % (file_path, e))
 
+    @staticmethod
+    def delete_directories(folder_path):
+        if not os.path.exists(folder_path):
+            return
+        for filename in os.listdir(folder_path):
+            file_path = os.path.join(folder_path, filename)
+            try:
+                if os.path.isdir(file_path):
+                    shutil.rmtree(file_path)
+            except Exception as e:
+                _logger.error('Failed to delete %s. Reason: %s' % (file_path, e))
+
     @staticmethod
     def purge_generated_files():
         generated_schemas_path = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)), 'generated/schemas')
         generated_analyzers_path = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)), 'generated/analyzers')
         generated_csvs_path = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)), 'generated/csvs')
+        generated_pools_path = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)), 'generated/pools')
+        generated_datasets_path = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)), 'generated/datasets')
         FileUtility.delete_files(generated_schemas_path)
         FileUtility.delete_files(generated_analyzers_path)
         FileUtility.delete_files(generated_csvs_path)
+        FileUtility.delete_files(generated_pools_path)
+        FileUtility.delete_directories(generated_datasets_path)
 
     @staticmethod
     def purge_analyzer_files():
@@ -116,8 +169,9 @@ class FileUtility:
         workspace_files=os.listdir(workspace_path)
         acceptable_files = {}
         option = 1
-        for file in workspace_files:
-            if file.lower().endswith(('.csv', '.zip')):
+        for file in sorted(workspace_files):
+            # directories hold the per table files of -exportFormat gzip|zstd exports
+            if file.lower().endswith(('.csv', '.csv.gz', '.csv.zst', '.zip')) or os.path.isdir(os.path.join(workspace_path, file)):
                 acceptable_files[option] = "{workspace_path}{file}".format(workspace_path=workspace_path, file=file)
                 if not args.disablePrompt:
                     print("- Option {option}: {file_name}".format(option=option, file_name=file))
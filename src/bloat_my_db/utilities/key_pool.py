@@ -0,0 +1,72 @@
+import logging
+import numpy as np
+from bloat_my_db.utilities.file import FileUtility
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+
+class KeyPool:
+    """Caches the values of referenced (parent) columns so foreign key values can be sampled in bulk.
+
+    Each ``table.column`` is read once into an array and only re-read when the parent
+    table changed, either because ``invalidate`` was called after writing to it or
+    because its change signature (tuple counters + relation size) moved.
+    """
+
+    def __init__(self, connection, fetch_size=100000):
+        self.connection = connection
+        self.cursor = self.connection.cursor()
+        self.fetch_size = fetch_size
+        self.pools = dict()
+        self.signatures = dict()
+        self.rng = np.random.default_rng()
+
+    def get_table_signature(self, table_name):
+        query = FileUtility.read_sql_file('get_table_change_signature.sql').format(table_name=table_name)
+        self.cursor.execute(query)
+        return self.cursor.fetchone()
+
+    def load_keys(self, table_name, column_name):
+        # named (server side) cursor so a huge parent table is streamed in slices instead of one giant fetchall
+        cursor = self.connection.cursor(name="bloat_key_pool")
+        cursor.itersize = self.fetch_size
+        cursor.execute("""SELECT "{column_name}" FROM "{table_name}" WHERE "{column_name}" IS NOT NULL""".format(
+            column_name=column_name, table_name=table_name))
+        slices = []
+        while True:
+            rows = cursor.fetchmany(self.fetch_size)
+            if not rows:
+                break
+            slices.append(np.array([row[0] for row in rows]))
+        cursor.close()
+        # rows come back in no particular order, sorted keys make seeded samples reproducible
+        return np.sort(np.concatenate(slices)) if slices else np.array([])
+
+    def get_keys(self, table_name, column_name):
+        signature = self.get_table_signature(table_name)
+        pool_key = (table_name, column_name)
+        if pool_key not in self.pools or self.signatures.get(pool_key) != signature:
+            self.pools[pool_key] = self.load_keys(table_name, column_name)
+            self.signatures[pool_key] = signature
+        return self.pools[pool_key]
+
+    def invalidate(self, table_name):
+        for pool_key in [pool_key for pool_key in self.pools if pool_key[0] == table_name]:
+            del self.pools[pool_key]
+            del self.signatures[pool_key]
+
+    def get_next_key(self, table_name, column_name):
+        self.cursor.execute("""SELECT coalesce(max("{column_name}"), 0) + 1 FROM "{table_name}" """.format(
+            column_name=column_name, table_name=table_name))
+        return int(self.cursor.fetchone()[0])
+
+    def sample(self, table_name, column_name, size, rng=None):
+        rng = rng if rng is not None else self.rng
+        keys = self.get_keys(table_name, column_name)
+        if len(keys) == 0:
+            raise Exception("referenced table {table}.{column} has no rows to sample foreign keys from!".format(table=table_name, column=column_name))
+        return keys[rng.integers(0, len(keys), size=size)]
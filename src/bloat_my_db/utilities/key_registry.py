@@ -0,0 +1,148 @@
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+import numpy as np
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+
+class KeyRegistry:
+    """Keeps the key values the bloater wrote per ``table.column`` so child tables can sample them without reading the database.
+
+    Chunks are held in memory until ``memory_budget`` bytes are used, after that the
+    largest columns are spilled to ``.npy`` files and read back memory mapped. Spilled
+    chunks keep their place, so keys are always sampled from the order they were
+    recorded (or imported) in and a seeded run samples the same keys however it spilled.
+    """
+
+    def __init__(self, memory_budget=256 * 1024 * 1024, spill_directory=None):
+        self.memory_budget = memory_budget
+        self.spill_directory = spill_directory
+        self.memory_used = 0
+        self.segments = dict()
+        self.spill_count = 0
+        self.owns_spill_directory = False
+        self.rng = np.random.default_rng()
+
+    @staticmethod
+    def to_compact_array(values):
+        values = np.asarray(values)
+        if values.dtype == object:
+            # fixed width arrays can be memory mapped once spilled, object arrays can't
+            values = values.astype(str)
+        return values
+
+    @staticmethod
+    def is_spilled(segment):
+        return isinstance(segment, np.memmap)
+
+    def has(self, table_name, column_name):
+        return (table_name, column_name) in self.segments
+
+    def count(self, table_name, column_name):
+        return sum(len(segment) for segment in self.get_segments((table_name, column_name)))
+
+    def get_memory_used(self, registry_key):
+        return sum(segment.nbytes for segment in self.segments.get(registry_key, []) if not self.is_spilled(segment))
+
+    def record(self, table_name, column_name, values):
+        if values is None or len(values) == 0:
+            return
+        values = self.to_compact_array(values)
+        self.segments.setdefault((table_name, column_name), []).append(values)
+        self.memory_used += values.nbytes
+        while self.memory_used > self.memory_budget and self.spill_largest():
+            pass
+
+    def merge_in_memory_runs(self, registry_key, spill=False):
+        """Concatenates every run of consecutive in-memory chunks, and with ``spill`` saves each run to a ``.npy`` file."""
+        merged = []
+        run = []
+        for segment in self.segments.get(registry_key, []) + [None]:
+            if segment is not None and not self.is_spilled(segment):
+                run.append(segment)
+                continue
+            if run:
+                values = np.concatenate(run) if len(run) > 1 else run[0]
+                merged.append(self.spill(registry_key, values) if spill else values)
+                run = []
+            if segment is not None:
+                merged.append(segment)
+        self.segments[registry_key] = merged
+
+    def spill(self, registry_key, values):
+        # spill directories can be shared by worker processes, so file names have to be unique across them
+        spill_file = os.path.join(self.get_spill_directory(), "{name}.npy".format(name=uuid.uuid4().hex))
+        np.save(spill_file, values)
+        self.spill_count += 1
+        self.memory_used -= values.nbytes
+        _logger.info("spilled %s keys of %s.%s to %s", len(values), registry_key[0], registry_key[1], spill_file)
+        return np.load(spill_file, mmap_mode='r')
+
+    def spill_largest(self):
+        candidates = [(self.get_memory_used(registry_key), registry_key) for registry_key in self.segments]
+        candidates = [candidate for candidate in candidates if candidate[0]]
+        if not candidates:
+            return False
+        nbytes, registry_key = max(candidates)
+        self.merge_in_memory_runs(registry_key, spill=True)
+        return True
+
+    def export_segments(self, table_name, column_name):
+        """Returns the keys of ``table.column`` in a form that is cheap to hand to another process.
+
+        Spilled segments are passed as their file path, in-memory chunks as arrays, in recorded order.
+        """
+        return [segment.filename if self.is_spilled(segment) else segment for segment in self.get_segments((table_name, column_name))]
+
+    def import_segments(self, table_name, column_name, segments):
+        registry_key = (table_name, column_name)
+        for segment in segments:
+            if isinstance(segment, str):
+                self.segments.setdefault(registry_key, []).append(np.load(segment, mmap_mode='r'))
+            else:
+                self.record(table_name, column_name, segment)
+
+    def get_spill_directory(self):
+        if self.spill_directory is None:
+            self.spill_directory = tempfile.mkdtemp(prefix='bloat_keys_')
+            self.owns_spill_directory = True
+        return self.spill_directory
+
+    def get_segments(self, registry_key):
+        # merge the in-memory chunks once so sampling doesn't walk thousands of small arrays
+        self.merge_in_memory_runs(registry_key)
+        return self.segments.get(registry_key, [])
+
+    def sample(self, table_name, column_name, size, rng=None):
+        rng = rng if rng is not None else self.rng
+        segments = self.get_segments((table_name, column_name))
+        offsets = np.cumsum([0] + [len(segment) for segment in segments])
+        if offsets[-1] == 0:
+            raise Exception("no keys were registered for {table}.{column}!".format(table=table_name, column=column_name))
+
+        positions = rng.integers(0, offsets[-1], size=size)
+        if len(segments) == 1:
+            return np.asarray(segments[0][positions])
+
+        segment_indexes = np.searchsorted(offsets, positions, side='right') - 1
+        values = np.empty(size, dtype=np.result_type(*[segment.dtype for segment in segments]))
+        order = np.argsort(segment_indexes, kind='stable')
+        bounds = np.searchsorted(segment_indexes[order], np.arange(len(segments) + 1))
+        for segment_index, segment in enumerate(segments):
+            selected = order[bounds[segment_index]:bounds[segment_index + 1]]
+            if len(selected):
+                values[selected] = segment[positions[selected] - offsets[segment_index]]
+        return values
+
+    def close(self):
+        self.segments = dict()
+        self.memory_used = 0
+        if self.owns_spill_directory:
+            shutil.rmtree(self.spill_directory, ignore_errors=True)
@@ -0,0 +1,53 @@
+import logging
+import cProfile
+import os
+import pstats
+import uuid
+from contextlib import contextmanager
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+profile_summary_size = 15
+
+
+class Profiler:
+    """Profiles the load loop with cProfile and saves the combined stats of every process to ``profile_path``.
+
+    Each profiled block (one per worker task) is dumped to a part file next to
+    ``profile_path``, the parent collects the part paths of its workers and merges them
+    all into one file that ``pstats`` or snakeviz can open.
+    """
+
+    def __init__(self, profile_path):
+        self.profile_path = profile_path
+        self.part_paths = []
+
+    @contextmanager
+    def profile(self):
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            part_path = "{path}.{pid}_{name}.part".format(path=self.profile_path, pid=os.getpid(), name=uuid.uuid4().hex[:8])
+            profile.dump_stats(part_path)
+            self.part_paths.append(part_path)
+
+    def add_parts(self, part_paths):
+        self.part_paths += part_paths
+
+    def save(self):
+        if not self.part_paths:
+            return None
+        stats = pstats.Stats(*self.part_paths)
+        stats.dump_stats(self.profile_path)
+        for part_path in self.part_paths:
+            os.unlink(part_path)
+        self.part_paths = []
+        print("- Saved the profile of the load to {path}, the slowest calls:".format(path=self.profile_path))
+        stats.sort_stats('cumulative').print_stats(profile_summary_size)
+        return stats
@@ -0,0 +1,140 @@
+import logging
+import json
+import time
+from contextlib import contextmanager
+from tabulate import tabulate
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+# generate builds (or replays) the chunks, encode turns them into COPY payloads, keys records the landed keys,
+# copy / merge / commit / sync are spent waiting on the database
+metric_phases = ['generate', 'encode', 'keys', 'copy', 'merge', 'commit', 'sync']
+database_phases = ['copy', 'merge', 'commit', 'sync']
+metric_counters = ['chunks', 'rows_generated', 'rows_landed', 'bytes_sent']
+prometheus_counters = {
+    'chunks': "Chunks loaded",
+    'rows_generated': "Rows generated and sent to the database",
+    'rows_landed': "Rows that landed in the table, rows skipped on conflict aren't counted",
+    'bytes_sent': "Bytes of COPY payload sent to the database",
+}
+
+
+def get_empty_table_metrics():
+    metrics = {counter: 0 for counter in metric_counters}
+    metrics['seconds'] = 0.0
+    metrics['phases'] = {phase: 0.0 for phase in metric_phases}
+    return metrics
+
+
+class RunMetrics:
+    """Per table counters and per phase timings of a ``-populateRandomData`` run.
+
+    Worker processes keep their own ``RunMetrics`` and hand ``tables`` back to the parent,
+    which merges them in. Table ``seconds`` are summed over the shards of a table, so with
+    shards they are worker seconds rather than wall clock seconds.
+    """
+
+    def __init__(self, database=None):
+        self.database = database
+        self.started = time.time()
+        self.finished = None
+        self.tables = dict()
+
+    def get_table(self, table_name):
+        if table_name not in self.tables:
+            self.tables[table_name] = get_empty_table_metrics()
+        return self.tables[table_name]
+
+    @contextmanager
+    def phase(self, table_name, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.get_table(table_name)['phases'][phase] += time.perf_counter() - start
+
+    @contextmanager
+    def table(self, table_name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.get_table(table_name)['seconds'] += time.perf_counter() - start
+
+    def count(self, table_name, **counts):
+        table = self.get_table(table_name)
+        for counter, value in counts.items():
+            table[counter] += value
+
+    def merge(self, tables):
+        for table_name, metrics in tables.items():
+            table = self.get_table(table_name)
+            for counter in metric_counters:
+                table[counter] += metrics[counter]
+            table['seconds'] += metrics['seconds']
+            for phase in metric_phases:
+                table['phases'][phase] += metrics['phases'][phase]
+
+    def finish(self):
+        self.finished = time.time()
+
+    def get_elapsed(self):
+        return (self.finished if self.finished else time.time()) - self.started
+
+    def get_total(self, counter):
+        return sum(table[counter] for table in self.tables.values())
+
+    def get_phase_total(self, phase):
+        return sum(table['phases'][phase] for table in self.tables.values())
+
+    def to_dict(self):
+        elapsed = self.get_elapsed()
+        tables = dict()
+        for table_name, table in self.tables.items():
+            tables[table_name] = dict(table, rows_per_second=table['rows_landed'] / table['seconds'] if table['seconds'] else 0.0)
+        return {
+            "database": self.database,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "seconds": elapsed,
+            "totals": dict({counter: self.get_total(counter) for counter in metric_counters},
+                           rows_per_second=self.get_total('rows_landed') / elapsed if elapsed else 0.0,
+                           phases={phase: self.get_phase_total(phase) for phase in metric_phases}),
+            "tables": tables
+        }
+
+    def to_prometheus(self):
+        lines = ["# HELP bloat_run_seconds Wall clock seconds of the run", "# TYPE bloat_run_seconds gauge",
+                 'bloat_run_seconds{{database="{database}"}} {value}'.format(database=self.database, value=self.get_elapsed())]
+        for counter, description in prometheus_counters.items():
+            lines += ["# HELP bloat_{counter}_total {description}".format(counter=counter, description=description),
+                      "# TYPE bloat_{counter}_total counter".format(counter=counter)]
+            lines += ['bloat_{counter}_total{{database="{database}",table="{table}"}} {value}'.format(
+                counter=counter, database=self.database, table=table_name, value=table[counter]) for table_name, table in sorted(self.tables.items())]
+        lines += ["# HELP bloat_phase_seconds_total Seconds spent per phase of loading a table",
+                  "# TYPE bloat_phase_seconds_total counter"]
+        for table_name, table in sorted(self.tables.items()):
+            lines += ['bloat_phase_seconds_total{{database="{database}",table="{table}",phase="{phase}"}} {value}'.format(
+                database=self.database, table=table_name, phase=phase, value=table['phases'][phase]) for phase in metric_phases]
+        return '\n'.join(lines) + '\n'
+
+    def save(self, metrics_path, metrics_format='json'):
+        with open(metrics_path, 'w') as outfile:
+            outfile.write(self.to_prometheus() if metrics_format == 'prometheus' else json.dumps(self.to_dict(), indent=4))
+        print("- Saved run metrics to {path}".format(path=metrics_path))
+
+    def display(self):
+        rows = []
+        for table_name, table in self.tables.items():
+            rows.append([table_name, table['rows_landed'], table['rows_generated'] - table['rows_landed'],
+                         round(table['rows_landed'] / table['seconds']) if table['seconds'] else 0, round(table['bytes_sent'] / 1e6, 1)] +
+                        [round(table['phases'][phase], 2) for phase in metric_phases])
+        print(tabulate(rows, headers=['Table', 'Rows landed', 'Skipped', 'Rows/s', 'MB sent'] + ["{phase} s".format(phase=phase) for phase in metric_phases],
+                       tablefmt="fancy_grid"))
+        waiting = sum(self.get_phase_total(phase) for phase in database_phases)
+        busy = waiting + sum(self.get_phase_total(phase) for phase in metric_phases if phase not in database_phases)
+        print("- {rows} rows landed in {seconds:.1f}s, {rate:.0f} rows/s, {waiting:.0f}% of the load time waiting on the database".format(
+            rows=self.get_total('rows_landed'), seconds=self.get_elapsed(), rate=self.get_total('rows_landed') / max(self.get_elapsed(), 1e-6),
+            waiting=waiting / busy * 100 if busy else 0))
@@ -0,0 +1,167 @@
+import logging
+import json
+import re
+import sys
+import time
+from bloat_my_db.utilities.connection import ConnectionManager
+from bloat_my_db.utilities.file import FileUtility
+from bloat_my_db.options import default_maintenance_database
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+max_identifier_length = 63
+
+
+def get_snapshot_prefix(database_name):
+    return "{database}__snap_".format(database=database_name)
+
+
+def get_snapshot_database_name(database_name, snapshot_name):
+    if not re.fullmatch(r'[A-Za-z0-9_]+', snapshot_name):
+        raise Exception("snapshot name {name} can only contain letters, digits and _!".format(name=snapshot_name))
+    snapshot_database = get_snapshot_prefix(database_name) + snapshot_name
+    if len(snapshot_database.encode('utf-8')) > max_identifier_length:
+        raise Exception("snapshot database name {name} is longer than {length} bytes!".format(name=snapshot_database, length=max_identifier_length))
+    return snapshot_database
+
+
+def get_snapshots_to_prune(snapshots, keep):
+    """The snapshots beyond the ``keep`` newest ones."""
+    newest_first = sorted(snapshots, key=lambda snapshot: snapshot['created'], reverse=True)
+    return newest_first[max(keep, 0):]
+
+
+class SnapshotUtility:
+    """Saves the bloated database as a template database and recreates it from that template.
+
+    Snapshots are databases named ``<database>__snap_<name>``, marked as templates that
+    don't accept connections, with their source and creation time kept in the database
+    comment. Creating and restoring them goes through ``CREATE DATABASE ... TEMPLATE``
+    on a connection to the maintenance database, which copies the data files instead of
+    reloading rows.
+    """
+
+    def __init__(self, connection_manager, maintenance_database=default_maintenance_database):
+        self.connection_manager = connection_manager
+        self.database = connection_manager.database
+        self.maintenance_manager = ConnectionManager(dict(connection_manager.conn_info, database=maintenance_database),
+                                                     connection_manager.session_settings, max_connections=1)
+
+    def close(self):
+        self.maintenance_manager.close_all()
+
+    def run_statements(self, statements):
+        # CREATE / DROP DATABASE can't run inside a transaction block
+        with self.maintenance_manager.connection() as connection:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                for statement, parameters in statements:
+                    _logger.debug(statement)
+                    cursor.execute(statement, parameters)
+
+    def fetch(self, statement, parameters=None):
+        with self.maintenance_manager.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(statement, parameters)
+                rows = cursor.fetchall()
+            connection.rollback()
+            return rows, connection.server_version
+
+    def get_copy_strategy(self, server_version):
+        # FILE_COPY (15+) copies the data files without writing them all to WAL, the older servers always do that
+        return " STRATEGY = FILE_COPY" if server_version >= 150000 else ""
+
+    def get_snapshots(self):
+        prefix = get_snapshot_prefix(self.database)
+        rows, _ = self.fetch(FileUtility.read_sql_file('get_snapshots.sql'),
+                             {'prefix': prefix.replace('_', '\\_') + '%'})
+        snapshots = []
+        for database_name, size, description in rows:
+            details = json.loads(description) if description and description.startswith('{') else dict()
+            snapshots.append({'name': database_name[len(prefix):], 'database': database_name, 'size': size,
+                              'created': details.get('created', '')})
+        return snapshots
+
+    def create(self, snapshot_name):
+        snapshot_database = get_snapshot_database_name(self.database, snapshot_name)
+        # the template can't have other sessions while it is copied, ours included,
+        # autovacuum workers are told to stop by CREATE DATABASE itself
+        self.connection_manager.close_all()
+        rows, server_version = self.fetch("SELECT count(*) FROM pg_stat_activity WHERE datname = %(database)s AND backend_type = 'client backend'",
+                                          {'database': self.database})
+        if rows[0][0]:
+            print("Error: {count} other sessions are connected to {database}, it can't be saved as a snapshot".format(count=rows[0][0], database=self.database))
+            sys.exit()
+        if any(snapshot['database'] == snapshot_database for snapshot in self.get_snapshots()):
+            self.drop(snapshot_name)
+        print("- Saving {database} as snapshot {name}...".format(database=self.database, name=snapshot_name))
+        start = time.time()
+        comment = json.dumps({'source': self.database, 'created': time.strftime("%Y-%m-%dT%H:%M:%S")})
+        try:
+            self.run_statements([
+                ('CREATE DATABASE "{snapshot}" TEMPLATE "{database}"{strategy}'.format(
+                    snapshot=snapshot_database, database=self.database, strategy=self.get_copy_strategy(server_version)), None),
+                ('ALTER DATABASE "{snapshot}" WITH IS_TEMPLATE true ALLOW_CONNECTIONS false'.format(snapshot=snapshot_database), None),
+                ('COMMENT ON DATABASE "{snapshot}" IS %(comment)s'.format(snapshot=snapshot_database), {'comment': comment}),
+            ])
+        except Exception as error:
+            print("- FAILED saving snapshot {name}".format(name=snapshot_name))
+            print("\n")
+            print("ERROR: {error}".format(error=error))
+            sys.exit()
+        print("- Saved snapshot {name} in {seconds:.1f}s".format(name=snapshot_name, seconds=time.time() - start))
+
+    def restore(self, snapshot_name):
+        snapshot_database = get_snapshot_database_name(self.database, snapshot_name)
+        if not any(snapshot['database'] == snapshot_database for snapshot in self.get_snapshots()):
+            print("Error: snapshot {name} of {database} not found, see -listSnapshots".format(name=snapshot_name, database=self.database))
+            sys.exit()
+        self.connection_manager.close_all()
+        print("- Restoring {database} from snapshot {name}...".format(database=self.database, name=snapshot_name))
+        start = time.time()
+        rows, server_version = self.fetch("SELECT pg_get_userbyid(datdba) FROM pg_database WHERE datname = %(database)s", {'database': self.database})
+        owner = rows[0][0] if rows else None
+        statements = []
+        if rows:
+            # FORCE (13+) ends the sessions still connected to the database
+            force = " WITH (FORCE)" if server_version >= 130000 else ""
+            statements.append(('DROP DATABASE "{database}"{force}'.format(database=self.database, force=force), None))
+        statements.append(('CREATE DATABASE "{database}" TEMPLATE "{snapshot}"{owner}{strategy}'.format(
+            database=self.database, snapshot=snapshot_database, owner=' OWNER "{owner}"'.format(owner=owner) if owner else "",
+            strategy=self.get_copy_strategy(server_version)), None))
+        try:
+            self.run_statements(statements)
+        except Exception as error:
+            print("- FAILED restoring {database} from snapshot {name}".format(database=self.database, name=snapshot_name))
+            print("\n")
+            print("ERROR: {error}".format(error=error))
+            sys.exit()
+        print("- Restored {database} from snapshot {name} in {seconds:.1f}s".format(
+            database=self.database, name=snapshot_name, seconds=time.time() - start))
+
+    def drop(self, snapshot_name):
+        snapshot_database = get_snapshot_database_name(self.database, snapshot_name)
+        if not any(snapshot['database'] == snapshot_database for snapshot in self.get_snapshots()):
+            print("Error: snapshot {name} of {database} not found, see -listSnapshots".format(name=snapshot_name, database=self.database))
+            sys.exit()
+        self.run_statements([
+            ('ALTER DATABASE "{snapshot}" WITH IS_TEMPLATE false'.format(snapshot=snapshot_database), None),
+            ('DROP DATABASE "{snapshot}"'.format(snapshot=snapshot_database), None),
+        ])
+        print("- Dropped snapshot {name}".format(name=snapshot_name))
+
+    def prune(self, keep):
+        for snapshot in get_snapshots_to_prune(self.get_snapshots(), keep):
+            self.drop(snapshot['name'])
+
+    def list(self):
+        snapshots = self.get_snapshots()
+        if not snapshots:
+            print("- No snapshots of {database}".format(database=self.database))
+        for snapshot in snapshots:
+            print("- Snapshot {name}: {size:.1f} MB, created {created}".format(
+                name=snapshot['name'], size=snapshot['size'] / 1e6, created=snapshot['created'] if snapshot['created'] else 'unknown'))
+        return snapshots
@@ -0,0 +1,34 @@
+import uuid
+
+import numpy as np
+
+from bloat_my_db.randoms.batch_randoms import BatchRandoms
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+
+def test_get_hashes():
+    hashes = BatchRandoms.get_hashes(100, 25)
+    assert hashes.shape == (100,)
+    assert all(len(value) == 25 and value.isalnum() for value in hashes)
+
+
+def test_get_uuids():
+    uuids = BatchRandoms.get_uuids(100)
+    assert all(uuid.UUID(value).version == 4 for value in uuids)
+    assert len(set(uuids)) == 100
+
+
+def test_get_datetimes():
+    datetimes = BatchRandoms.get_datetimes(100, min_year=2000, max_year=2001)
+    assert datetimes.min() >= np.datetime64("2000-01-01")
+    assert datetimes.max() < np.datetime64("2002-01-01")
+
+
+def test_get_decimals_of_a_high_scale_numeric():
+    decimals = BatchRandoms.get_decimals(1000, 38, 18, rng=np.random.default_rng(1))
+    assert decimals.dtype == np.float64
+    assert (decimals >= 0).all() and (decimals < 10 ** 9).all()
+    assert (np.round(decimals, 6) == decimals).all()
@@ -0,0 +1,46 @@
+import numpy as np
+
+from bloat_my_db.data_bloaters.column_plan import (compile_table_plan, compile_csv_template_plan, ForeignKeyGenerator,
+                                                   NullGenerator, UuidGenerator)
+from bloat_my_db.randoms.value_pools import ValuePools
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+columns = [
+    {"name": "id", "data_type": "uuid", "is_nullable": False,
+     "constraint": {"orders_pkey": {"type": "PRIMARY KEY", "referenced_table": "orders", "referenced_column": "id"}}},
+    {"name": "user_id", "data_type": "uuid", "is_nullable": False,
+     "constraint": {"orders_user_id_fkey": {"type": "FOREIGN KEY", "referenced_table": "users", "referenced_column": "id"}}},
+    {"name": "note", "data_type": "text", "is_nullable": True},
+    {"name": "total", "data_type": "numeric", "udt_name": "numeric", "numeric_precision": 6, "numeric_scale": 2, "is_nullable": False},
+    {"name": "area", "data_type": "polygon", "udt_name": "polygon", "is_nullable": False},
+]
+
+
+def sample_keys(table_name, column_name, size, rng=None):
+    return np.full(size, "{table}.{column}".format(table=table_name, column=column_name))
+
+
+def test_compile_table_plan(tmp_path):
+    plan = compile_table_plan("orders", columns, sample_keys, ValuePools(cache_directory=str(tmp_path)), lambda table, column: None,
+                              lambda table, column: 1)
+    assert isinstance(plan.generators[0], UuidGenerator)
+    assert isinstance(plan.generators[1], ForeignKeyGenerator)
+    assert isinstance(plan.generators[2], NullGenerator)
+    assert plan.unsupported_columns == [("area", "polygon")]
+
+    batch = plan.build_batch(3, np.random.default_rng(1))
+    assert batch.columns == ["id", "user_id", "note", "total", "area"]
+    assert batch.get_column("total").max() < 10000
+    assert list(batch.get_column("user_id")) == ["users.id"] * 3
+    assert batch.get_column("note") is None
+
+
+def test_compile_csv_template_plan():
+    batch = compile_csv_template_plan("orders", columns, sample_keys).build_batch(2, np.random.default_rng(1))
+    assert list(batch.get_column("user_id")) == ["users.id"] * 2
+    assert list(batch.get_column("note")) == ["NOT NULL"] * 2
+    assert list(batch.get_column("total")) == [""] * 2
+    assert list(batch.get_column("area")) == [""] * 2
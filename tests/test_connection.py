@@ -0,0 +1,22 @@
+import pickle
+
+from bloat_my_db.utilities.connection import ConnectionManager
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+
+def test_get_connect_kwargs():
+    manager = ConnectionManager({"host": "localhost", "database": "bloat"}, {"synchronous_commit": "off", "work_mem": "64MB"})
+    connect_kwargs = manager.get_connect_kwargs()
+    assert connect_kwargs['options'] == "-c synchronous_commit=off -c work_mem=64MB"
+    assert connect_kwargs['database'] == "bloat"
+    assert ConnectionManager({"database": "bloat"}).get_connect_kwargs() == {"database": "bloat"}
+
+
+def test_pickle_connection_manager():
+    manager = pickle.loads(pickle.dumps(ConnectionManager({"database": "bloat"}, {"work_mem": "64MB"}, max_connections=4)))
+    assert manager.database == "bloat"
+    assert manager.session_settings == {"work_mem": "64MB"}
+    assert manager.max_connections == 4
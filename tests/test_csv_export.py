@@ -0,0 +1,55 @@
+import csv
+import gzip
+import io
+
+from bloat_my_db.exporters.csv_export import CsvExporter, open_compressed_csv
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+analyzed_schema = {
+    "0": {"users": {"columns": [
+        {"name": "id", "data_type": "uuid", "is_nullable": False,
+         "constraint": {"users_pkey": {"type": "PRIMARY KEY", "referenced_table": "users", "referenced_column": "id"}}},
+        {"name": "nickname", "data_type": "text", "is_nullable": True},
+        {"name": "email", "data_type": "text", "is_nullable": False},
+    ]}}
+}
+
+
+class FakeConnection:
+    def cursor(self, name=None):
+        return self
+
+    def close(self):
+        pass
+
+
+class FakeConnectionManager:
+    database = "bloat"
+
+    def get_connection(self):
+        return FakeConnection()
+
+    def put_connection(self, connection):
+        pass
+
+
+def test_write_table_in_chunks():
+    exporter = CsvExporter(analyzed_schema, FakeConnectionManager(), chunk_size=2)
+    outfile = io.StringIO(newline='')
+    exporter.write_table(outfile, "0", "users", 5)
+    rows = list(csv.reader(io.StringIO(outfile.getvalue())))
+    assert rows[0] == ["id", "nickname", "email"]
+    assert len(rows) == 6
+    assert len({row[0] for row in rows[1:]}) == 5
+    assert {tuple(row[1:]) for row in rows[1:]} == {("NOT NULL", "")}
+
+
+def test_open_compressed_csv_gzip(tmp_path):
+    file_path = str(tmp_path / "0_users.csv.gz")
+    with open_compressed_csv(file_path, 'gzip') as outfile:
+        CsvExporter(analyzed_schema, FakeConnectionManager()).write_table(outfile, "0", "users", 3)
+    with gzip.open(file_path, 'rt', newline='') as infile:
+        assert len(list(csv.reader(infile))) == 4
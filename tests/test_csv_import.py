@@ -0,0 +1,36 @@
+import gzip
+from zipfile import ZipFile
+
+from bloat_my_db.importers.csv_import import CountingReader, get_csv_sources, get_source_name, get_source_table, open_csv_source
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+tables = ["orders", "order_items", "users"]
+
+
+def test_get_source_table():
+    assert get_source_table("3_orders_20240101", tables) == "orders"
+    assert get_source_table("4_order_items_20240101", tables) == "order_items"
+    assert get_source_table("order_items", tables) == "order_items"
+    assert get_source_table("customers", tables) is None
+
+
+def test_get_csv_sources(tmp_path):
+    with gzip.open(str(tmp_path / "1_users_20240101.csv.gz"), 'wt') as outfile:
+        outfile.write("id\n1\n")
+    (tmp_path / "notes.txt").write_text("not a csv")
+    sources = get_csv_sources(str(tmp_path))
+    assert [get_source_name(source) for source in sources] == ["1_users_20240101"]
+
+    zip_path = str(tmp_path / "bloat.zip")
+    with ZipFile(zip_path, 'w') as zf:
+        zf.writestr("bloat/3_orders_20240101.csv", "id,user_id\n1,2\n")
+    sources = get_csv_sources(zip_path)
+    assert sources == [(zip_path, "bloat/3_orders_20240101.csv")]
+    with open_csv_source(sources[0]) as stream:
+        reader = CountingReader(stream)
+        assert reader.readline() == b"id,user_id\n"
+        assert reader.read() == b"1,2\n"
+        assert reader.bytes_read == 15
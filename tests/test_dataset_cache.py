@@ -0,0 +1,67 @@
+import os
+import time
+import numpy as np
+
+from bloat_my_db.data_bloaters.column_plan import TablePlan
+from bloat_my_db.data_bloaters.dataset_cache import DatasetCache
+from bloat_my_db.data_bloaters.row_batch import RowBatch, ArrayColumn
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+
+def get_plan():
+    return TablePlan("users", ["id", "name", "tags", "note"], [None] * 4,
+                     column_types=[{'udt_name': 'int8'}, {'udt_name': 'text'}, {'data_type': 'ARRAY'}, {'udt_name': 'text'}])
+
+
+def get_batch():
+    batch = RowBatch(3)
+    batch.add_column("id", np.arange(3, dtype=np.int64))
+    batch.add_column("name", np.array(["ann", "bob", "cy"]))
+    batch.add_column("tags", ArrayColumn(np.array(["a", "b", "c"]), [2, 0, 1]))
+    batch.add_column("note", None)
+    return batch
+
+
+def test_chunk_round_trip(tmp_path):
+    cache = DatasetCache(cache_directory=str(tmp_path))
+    entry = cache.get_entry_key("abc", 42, 3, 3, {("users", "id"): 1}, 100)
+    assert cache.read_chunk(entry, get_plan(), 0, 3) is None
+    cache.write_chunk(entry, "users", 0, get_batch())
+    assert not cache.is_complete(entry)
+    cache.complete(entry, {'seed': '42'})
+    assert cache.is_complete(entry)
+
+    batch = cache.read_chunk(entry, get_plan(), 0, 3)
+    assert batch.columns == ["id", "name", "tags", "note"]
+    assert batch.column_types == get_plan().column_types
+    assert list(batch.get_column("id")) == [0, 1, 2]
+    assert list(batch.get_column("name")) == ["ann", "bob", "cy"]
+    assert batch.get_column("tags").tolist() == [["a", "b"], [], ["c"]]
+    assert batch.get_column("note") is None
+
+
+def test_entry_key_depends_on_inputs():
+    key = DatasetCache.get_entry_key("abc", 42, 100, 10, {("users", "id"): 1}, 100)
+    assert key == DatasetCache.get_entry_key("abc", 42, 100, 10, {("users", "id"): 1}, 100)
+    assert key != DatasetCache.get_entry_key("abc", 43, 100, 10, {("users", "id"): 1}, 100)
+    assert key != DatasetCache.get_entry_key("abc", 42, 100, 10, {("users", "id"): 101}, 100)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = DatasetCache(cache_directory=str(tmp_path))
+    entries = []
+    for seed in range(3):
+        entry = cache.get_entry_key("abc", seed, 3, 3, {}, 100)
+        cache.write_chunk(entry, "users", 0, get_batch())
+        cache.complete(entry, {})
+        os.utime(os.path.join(cache.get_entry_path(entry), 'manifest.json'), (time.time() - 100 + seed, time.time() - 100 + seed))
+        entries.append(entry)
+    cache.touch(entries[0])
+    entry_size = cache.get_entries()[0][2]
+
+    cache.max_bytes = entry_size * 2
+    cache.evict()
+    assert [cache.is_complete(entry) for entry in entries] == [True, False, True]
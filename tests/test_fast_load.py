@@ -0,0 +1,29 @@
+from bloat_my_db.utilities.fast_load import get_concurrent_index_definition, get_deferrable_indexes, get_not_valid_constraint_definition
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+
+def test_get_concurrent_index_definition():
+    assert get_concurrent_index_definition("CREATE INDEX orders_placed_idx ON public.orders USING btree (placed)") == \
+        "CREATE INDEX CONCURRENTLY orders_placed_idx ON public.orders USING btree (placed)"
+    assert get_concurrent_index_definition("CREATE UNIQUE INDEX users_email_idx ON public.users USING btree (email)") == \
+        "CREATE UNIQUE INDEX CONCURRENTLY users_email_idx ON public.users USING btree (email)"
+
+
+def test_get_deferrable_indexes_keeps_standalone_unique_indexes():
+    placed_index = {'table_name': 'orders', 'index_name': 'orders_placed_idx', 'is_unique': False, 'is_exclusion': False,
+                    'definition': "CREATE INDEX orders_placed_idx ON public.orders USING btree (placed)"}
+    email_index = {'table_name': 'users', 'index_name': 'users_email_idx', 'is_unique': True, 'is_exclusion': False,
+                   'definition': "CREATE UNIQUE INDEX users_email_idx ON public.users USING btree (email)"}
+    booking_index = {'table_name': 'bookings', 'index_name': 'bookings_during_excl', 'is_unique': False, 'is_exclusion': True,
+                     'definition': "CREATE INDEX bookings_during_excl ON public.bookings USING gist (during)"}
+    assert get_deferrable_indexes([placed_index, email_index, booking_index]) == [placed_index]
+
+
+def test_get_not_valid_constraint_definition():
+    assert get_not_valid_constraint_definition("FOREIGN KEY (user_id) REFERENCES users(id)") == \
+        "FOREIGN KEY (user_id) REFERENCES users(id) NOT VALID"
+    assert get_not_valid_constraint_definition("FOREIGN KEY (user_id) REFERENCES users(id) NOT VALID") == \
+        "FOREIGN KEY (user_id) REFERENCES users(id) NOT VALID"
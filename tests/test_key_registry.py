@@ -0,0 +1,42 @@
+import numpy as np
+
+from bloat_my_db.utilities.key_registry import KeyRegistry
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+
+def test_sample_from_memory():
+    registry = KeyRegistry()
+    registry.record("users", "id", np.array(["a", "b", "c"]))
+    assert registry.has("users", "id")
+    assert not registry.has("orders", "id")
+    assert set(registry.sample("users", "id", 50)) <= {"a", "b", "c"}
+
+
+def test_spills_over_budget(tmp_path):
+    registry = KeyRegistry(memory_budget=1000, spill_directory=str(tmp_path))
+    keys = ["key{index:04d}".format(index=index) for index in range(200)]
+    for start in range(0, 200, 20):
+        registry.record("users", "id", np.array(keys[start:start + 20]))
+    assert registry.spill_count > 0
+    assert registry.memory_used <= 1000
+    assert registry.count("users", "id") == 200
+    assert set(registry.sample("users", "id", 5000)) == set(keys)
+    registry.close()
+
+
+def test_keeps_recorded_order_across_spills(tmp_path):
+    keys = np.array(["key{index:04d}".format(index=index) for index in range(200)])
+    spilling = KeyRegistry(memory_budget=500, spill_directory=str(tmp_path))
+    for start in range(0, 100, 20):
+        spilling.record("users", "id", keys[start:start + 20])
+    importing = KeyRegistry()
+    importing.import_segments("users", "id", spilling.export_segments("users", "id"))
+    importing.record("users", "id", keys[100:])
+    assert spilling.spill_count > 0
+    assert list(np.concatenate(importing.get_segments(("users", "id")))) == list(keys)
+    assert list(importing.sample("users", "id", 10, rng=np.random.default_rng(3))) == \
+        list(keys[np.random.default_rng(3).integers(0, 200, size=10)])
+    spilling.close()
@@ -0,0 +1,42 @@
+from bloat_my_db.data_bloaters.level_scheduler import get_insertion_levels, get_shards
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+
+def table(level=None):
+    metadata = {"has_foreign_keys": False}
+    if level is not None:
+        metadata["insertion_level"] = level
+    return {"columns": [], "@table_metadata": metadata}
+
+
+def test_groups_tables_by_level():
+    analyzed_schema = {
+        "1": {"users": table(1)},
+        "2": {"products": table(1)},
+        "3": {"orders": table(2)},
+        "4": {"order_items": table(3)},
+    }
+    assert get_insertion_levels(analyzed_schema) == [
+        (1, ["users", "products"]),
+        (2, ["orders"]),
+        (3, ["order_items"]),
+    ]
+
+
+def test_tables_without_level_run_alone():
+    analyzed_schema = {"1": {"users": table()}, "2": {"orders": table()}}
+    assert [tables for level, tables in get_insertion_levels(analyzed_schema)] == [["users"], ["orders"]]
+
+
+def test_get_shards():
+    assert get_shards(10, 3) == [(0, 4), (1, 3), (2, 3)]
+    assert get_shards(2, 4) == [(0, 1), (1, 1)]
+    assert sum(rows for shard_index, rows in get_shards(1000001, 32)) == 1000001
+
+
+def test_get_shards_keeps_whole_chunks():
+    assert get_shards(2500, 2, chunk_size=1000) == [(0, 2000), (1, 500)]
+    assert get_shards(2500, 8, chunk_size=1000) == [(0, 1000), (1, 1000), (2, 500)]
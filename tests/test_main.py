@@ -0,0 +1,25 @@
+from argparse import Namespace
+
+import pytest
+
+from bloat_my_db.main import check_freeze
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+
+def table(has_foreign_keys):
+    return {"columns": [], "@table_metadata": {"has_foreign_keys": has_foreign_keys}}
+
+
+def test_freeze_on_a_parent_child_schema_needs_fast_load():
+    analyzed_schema = {"1": {"users": table(False)}, "2": {"orders": table(True)}}
+    with pytest.raises(SystemExit):
+        check_freeze(Namespace(freeze=True, fastLoad=False), analyzed_schema)
+    check_freeze(Namespace(freeze=True, fastLoad=True), analyzed_schema)
+    check_freeze(Namespace(freeze=False, fastLoad=False), analyzed_schema)
+
+
+def test_freeze_without_foreign_keys():
+    check_freeze(Namespace(freeze=True, fastLoad=False), {"1": {"users": table(False)}})
@@ -0,0 +1,47 @@
+import struct
+
+import numpy as np
+
+from bloat_my_db.data_bloaters.row_batch import RowBatch, ArrayColumn
+from bloat_my_db.loaders.pg_binary_encoder import (encode_binary_batch, encode_numerics, encode_uuids, copy_binary_header,
+                                                   copy_binary_trailer)
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+
+def test_encode_numerics():
+    fields = encode_numerics(np.array([12.5, -0.01]), 2)
+    assert struct.unpack('>9h', fields[0].tobytes()) == (5, 3, 0, 2, 0, 0, 0, 12, 5000)
+    assert struct.unpack('>9h', fields[1].tobytes()) == (5, 3, 0x4000, 2, 0, 0, 0, 0, 100)
+
+
+def test_encode_numerics_of_a_high_scale_numeric():
+    # numeric(38,18), only the 15 digits of the float64 are sent
+    fields = encode_numerics(np.array([123456789.123456]), 18)
+    assert struct.unpack('>9h', fields[0].tobytes()) == (5, 2, 0, 18, 1, 2345, 6789, 1234, 5600)
+
+
+def test_encode_uuids():
+    value = "0e4e9371-6e08-4b33-b97e-9d887827d58f"
+    assert encode_uuids(np.array([value]))[0].tobytes() == bytes.fromhex(value.replace("-", ""))
+
+
+def test_encode_binary_batch():
+    batch = RowBatch(2)
+    batch.add_column("id", np.array([1, 2]), {"udt_name": "int4"})
+    batch.add_column("note", None, {"udt_name": "text"})
+    batch.add_column("name", np.array(["x", "yz"]), {"udt_name": "varchar"})
+    batch.add_column("tags", ArrayColumn(np.array(["a"]), [1, 0]), {"data_type": "ARRAY", "udt_name": "_text",
+                                                                    "element_type": {"name": "text", "oid": 25}})
+    payload = encode_binary_batch(batch).read()
+    assert payload.startswith(copy_binary_header) and payload.endswith(copy_binary_trailer)
+
+    first_array = struct.pack('>iiiii', 1, 0, 25, 1, 1) + struct.pack('>i', 1) + b'a'
+    empty_array = struct.pack('>iii', 0, 0, 25)
+    rows = (struct.pack('>hii', 4, 4, 1) + struct.pack('>i', -1) + struct.pack('>i', 1) + b'x' +
+            struct.pack('>i', len(first_array)) + first_array +
+            struct.pack('>hii', 4, 4, 2) + struct.pack('>i', -1) + struct.pack('>i', 2) + b'yz' +
+            struct.pack('>i', len(empty_array)) + empty_array)
+    assert payload[len(copy_binary_header):-len(copy_binary_trailer)] == rows
@@ -0,0 +1,103 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from bloat_my_db.data_bloaters.row_batch import RowBatch
+from bloat_my_db.loaders.pg_copy_loader import PgCopyLoader, encode_copy_batch, encode_copy_value
+from bloat_my_db.utilities.run_metrics import RunMetrics
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+
+def test_encode_copy_value():
+    assert encode_copy_value(None) == "\\N"
+    assert encode_copy_value(True) == "t"
+    assert encode_copy_value(False) == "f"
+    assert encode_copy_value(datetime(2001, 2, 3, 4, 5, 6)) == "2001-02-03T04:05:06"
+    assert encode_copy_value("a\tb\nc\\d") == "a\\tb\\nc\\\\d"
+
+
+def test_encode_copy_batch():
+    batch = RowBatch(2)
+    batch.add_column("id", np.array([1, 2]))
+    batch.add_column("note", None)
+    batch.add_column("active", np.array([True, False]))
+    batch.add_column("name", np.array(["x", "y\tz"]))
+    batch.add_column("created", np.array(["2001-02-03T04:05:06", "2001-02-03"], dtype="datetime64[us]"))
+    payload = encode_copy_batch(batch)
+    assert payload.read() == (
+        "1\t\\N\tt\tx\t2001-02-03T04:05:06.000000\n"
+        "2\t\\N\tf\ty\\tz\t2001-02-03T00:00:00.000000\n"
+    )
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.statements = []
+        self.rowcount = 0
+
+    def execute(self, statement):
+        self.statements.append(statement)
+
+    def copy_expert(self, sql, file):
+        self.statements.append(sql)
+        self.rowcount = len(file.read().splitlines())
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.recording_cursor = RecordingCursor()
+
+    def cursor(self):
+        return self.recording_cursor
+
+    def commit(self):
+        self.recording_cursor.statements.append("COMMIT")
+
+
+def test_freeze_truncates_once_per_table_transaction():
+    connection = RecordingConnection()
+    loader = PgCopyLoader(connection, conflict_mode='direct', copy_format='text', freeze=True)
+    batch = RowBatch(1)
+    batch.add_column("id", np.array([1]))
+    loader.load_chunk("users", batch)
+    loader.load_chunk("users", batch)
+    loader.finish_table()
+    assert connection.recording_cursor.statements == [
+        'TRUNCATE "users"',
+        'COPY "users" ("id") FROM STDIN WITH (FREEZE)',
+        'COPY "users" ("id") FROM STDIN WITH (FREEZE)',
+        "COMMIT",
+    ]
+
+
+def test_get_staging_table_name_of_long_tables():
+    first = PgCopyLoader.get_staging_table_name("customer_order_line_item_adjustment_history_archive_2023_q1")
+    second = PgCopyLoader.get_staging_table_name("customer_order_line_item_adjustment_history_archive_2023_q2")
+    assert first != second
+    assert len(first.encode("utf-8")) <= 63 and len(second.encode("utf-8")) <= 63
+    assert len(PgCopyLoader.get_staging_table_name("ü" * 40).encode("utf-8")) <= 63
+
+
+def test_freeze_needs_direct_table_commits():
+    with pytest.raises(Exception):
+        PgCopyLoader(RecordingConnection(), conflict_mode='merge', freeze=True)
+
+
+def test_load_chunk_records_metrics():
+    metrics = RunMetrics("test")
+    loader = PgCopyLoader(RecordingConnection(), conflict_mode='direct', copy_format='text', metrics=metrics)
+    batch = RowBatch(2)
+    batch.add_column("id", np.array([1, 2]))
+    batch.add_column("name", np.array(["x", "y"]))
+    loader.load_chunk("users", batch)
+    loader.load_chunk("users", batch)
+    table = metrics.get_table("users")
+    assert table['chunks'] == 2
+    assert table['rows_generated'] == 4
+    assert table['rows_landed'] == 4
+    assert table['bytes_sent'] == 2 * len("1\tx\n2\ty\n")
+    assert table['phases']['copy'] > 0
@@ -0,0 +1,57 @@
+from bloat_my_db.schema_builders.pg_schema_builder import PgSchemaBuilder
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+
+class CatalogCursor:
+    """Answers the introspection queries of ``build_all_columns`` by the SQL file they come from."""
+
+    def __init__(self, rows_by_query):
+        self.rows_by_query = rows_by_query
+        self.rows = []
+
+    def execute(self, statement, parameters=None):
+        self.rows = next(rows for query, rows in self.rows_by_query.items() if query in statement)
+
+    def fetchall(self):
+        return self.rows
+
+
+class CatalogConnection:
+    def __init__(self, cursor):
+        self.catalog_cursor = cursor
+
+    def cursor(self):
+        return self.catalog_cursor
+
+
+class CatalogConnectionManager:
+    database = "bloat"
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def get_connection(self):
+        return CatalogConnection(self.cursor)
+
+
+def column(table_name, column_name, udt_name, is_nullable=False):
+    return ('public', table_name, column_name, None, is_nullable, udt_name, udt_name, None, None, None, None, None, None, None)
+
+
+def test_build_all_columns_keeps_check_constraints():
+    cursor = CatalogCursor({
+        'from pg_attribute attribute': [column('products', 'id', 'int4'), column('products', 'price', 'numeric')],
+        'from pg_constraint con': [
+            ('products', 'id', 'products_pkey', 'PRIMARY KEY', 'products', 'id'),
+            ('products', 'price', 'products_price_check', 'CHECK', 'products', 'price'),
+        ],
+        'pg_enum': [],
+    })
+    columns = PgSchemaBuilder(CatalogConnectionManager(cursor)).build_all_columns(['products'])['products']['columns']
+    assert columns[1]['constraint'] == {
+        'products_price_check': {'type': 'CHECK', 'referenced_table': 'products', 'referenced_column': 'price'}
+    }
+    assert columns[0]['constraint']['products_pkey']['type'] == 'PRIMARY KEY'
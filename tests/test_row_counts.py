@@ -0,0 +1,39 @@
+import json
+import pytest
+
+from bloat_my_db.data_bloaters.row_counts import get_table_row_counts
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+
+def get_schema():
+    tables = [("users", []), ("products", []), ("orders", ["users"]), ("order_items", ["orders", "products"])]
+    return {str(index): {table: {'columns': [], '@table_metadata': {'foreign_constraint_tables': parents}}}
+            for index, (table, parents) in enumerate(tables, start=1)}
+
+
+def test_defaults_to_how_many():
+    assert get_table_row_counts(get_schema(), 25, {}) == {"users": 25, "products": 25, "orders": 25, "order_items": 25}
+
+
+def test_tables_and_fan_out():
+    row_counts = {"tables": {"products": 500, "orders": 1000}, "fan_out": {"order_items": {"orders": 20}}}
+    assert get_table_row_counts(get_schema(), 25, row_counts) == {"users": 25, "products": 500, "orders": 1000, "order_items": 20000}
+
+
+def test_snapshot_is_scaled(tmp_path):
+    snapshot_path = tmp_path / "row_counts.json"
+    snapshot_path.write_text(json.dumps({"users": 2000000, "orders": 30000000}))
+    row_counts = {"snapshot": str(snapshot_path), "scale": 0.001, "fan_out": {"order_items": {"orders": 2.5}}}
+    assert get_table_row_counts(get_schema(), 25, row_counts) == {"users": 2000, "products": 25, "orders": 30000, "order_items": 75000}
+
+
+def test_fan_out_needs_a_foreign_key_to_the_parent():
+    with pytest.raises(ValueError):
+        get_table_row_counts(get_schema(), 25, {"fan_out": {"orders": {"products": 3}}})
+    with pytest.raises(ValueError):
+        get_table_row_counts(get_schema(), 25, {"fan_out": {"order_items": {"orders": 3, "products": 2}}})
+    with pytest.raises(ValueError):
+        get_table_row_counts(get_schema(), 25, {"tables": {"invoices": 3}})
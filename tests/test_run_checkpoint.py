@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from bloat_my_db.data_bloaters.pg_data_bloater import PgDataBloater
+from bloat_my_db.data_bloaters.run_checkpoint import RunCheckpoint
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+
+def test_saves_and_loads_task_checkpoints(tmp_path):
+    checkpoint = RunCheckpoint("bloat", checkpoint_directory=str(tmp_path / "checkpoint"))
+    assert not checkpoint.exists()
+    checkpoint.start({'seed': '42', 'rows': 3000})
+    assert checkpoint.exists()
+    assert checkpoint.load_run()['rows'] == 3000
+    assert checkpoint.load("users", 1) is None
+
+    checkpoint.save("users", 1, 2000, 1000, 500, 1, 480)
+    task = checkpoint.load("users", 1)
+    assert task['chunks_committed'] == 1
+    assert task['next_chunk'] == 5
+    assert task['rows_landed'] == 480
+    assert not task['finished']
+    checkpoint.save("users", 1, 2000, 1000, 500, 2, 980, finished=True)
+    assert checkpoint.load("users", 1)['finished']
+    assert [task['table'] for task in checkpoint.get_tasks()] == ["users"]
+    assert not [file for file in os.listdir(checkpoint.checkpoint_directory) if file.endswith('.tmp')]
+
+
+def test_start_discards_the_previous_run(tmp_path):
+    checkpoint = RunCheckpoint("bloat", checkpoint_directory=str(tmp_path / "checkpoint"))
+    checkpoint.start({'seed': '1'})
+    checkpoint.save("users", 0, 0, 1000, 1000, 1, 1000)
+    checkpoint.start({'seed': '2'})
+    assert checkpoint.load("users", 0) is None
+    assert checkpoint.load_run()['seed'] == '2'
+    checkpoint.clear()
+    assert not checkpoint.exists()
+
+
+def test_probe_column_is_a_generated_key():
+    columns = [
+        {'name': 'user_id', 'constraint': {'fk': {'type': 'FOREIGN KEY'}, 'pk': {'type': 'PRIMARY KEY'}}},
+        {'name': 'note'},
+        {'name': 'code', 'constraint': {'code_key': {'type': 'UNIQUE'}}},
+    ]
+    assert PgDataBloater.get_probe_column(columns) == 'code'
+    assert PgDataBloater.get_probe_column([{'name': 'note'}]) is None
+
+
+class StubConnection:
+    def cursor(self):
+        return None
+
+
+class StubConnectionManager:
+    database = "bloat"
+
+    def get_connection(self):
+        return StubConnection()
+
+
+def test_resume_of_a_started_task_without_probe_column_is_refused(tmp_path):
+    checkpoint = RunCheckpoint("bloat", checkpoint_directory=str(tmp_path / "checkpoint"))
+    checkpoint.start({'seed': '1'})
+    bloater = PgDataBloater({}, StubConnectionManager(), chunk_size=500, checkpoint=checkpoint, resuming=True)
+
+    # never started, nothing to probe, and checkpointed so a second interruption knows it started
+    assert bloater.start_task("notes", 0, None, 0, 1000) == (0, 0, False)
+    assert checkpoint.load("notes", 0)['chunks_committed'] == 0
+
+    checkpoint.save("users", 0, 0, 1000, 500, 1, 500)
+    assert bloater.start_task("users", 0, "id", 0, 1000) == (1, 500, True)
+    with pytest.raises(SystemExit):
+        bloater.start_task("users", 0, None, 0, 1000)
+
+    checkpoint.save("users", 0, 0, 1000, 500, 2, 1000, finished=True)
+    assert bloater.start_task("users", 0, None, 0, 1000) == (2, 1000, False)
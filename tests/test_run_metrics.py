@@ -0,0 +1,41 @@
+import json
+
+from bloat_my_db.utilities.run_metrics import RunMetrics, metric_phases
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+
+def get_worker_metrics(rows_landed):
+    metrics = RunMetrics("test")
+    with metrics.table("users"):
+        with metrics.phase("users", "copy"):
+            pass
+        metrics.count("users", chunks=1, rows_generated=10, rows_landed=rows_landed, bytes_sent=100)
+    return metrics
+
+
+def test_merges_worker_tables():
+    metrics = RunMetrics("test")
+    metrics.merge(get_worker_metrics(10).tables)
+    metrics.merge(get_worker_metrics(7).tables)
+    assert metrics.get_total('rows_generated') == 20
+    assert metrics.get_total('rows_landed') == 17
+    assert metrics.get_total('chunks') == 2
+    assert metrics.tables["users"]['phases']['copy'] > 0
+
+
+def test_saves_json_and_prometheus(tmp_path):
+    metrics = get_worker_metrics(9)
+    metrics.finish()
+    metrics.save(str(tmp_path / "metrics.json"))
+    saved = json.loads((tmp_path / "metrics.json").read_text())
+    assert saved['totals']['rows_landed'] == 9
+    assert set(saved['tables']['users']['phases']) == set(metric_phases)
+
+    metrics.save(str(tmp_path / "metrics.prom"), 'prometheus')
+    lines = (tmp_path / "metrics.prom").read_text().splitlines()
+    assert 'bloat_rows_landed_total{database="test",table="users"} 9' in lines
+    assert 'bloat_bytes_sent_total{database="test",table="users"} 100' in lines
+    assert '# TYPE bloat_phase_seconds_total counter' in lines
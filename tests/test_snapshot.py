@@ -0,0 +1,22 @@
+import pytest
+
+from bloat_my_db.utilities.snapshot import get_snapshot_database_name, get_snapshots_to_prune
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+
+def test_get_snapshot_database_name():
+    assert get_snapshot_database_name("bloat", "base") == "bloat__snap_base"
+    with pytest.raises(Exception):
+        get_snapshot_database_name("bloat", "base; DROP DATABASE bloat")
+    with pytest.raises(Exception):
+        get_snapshot_database_name("bloat", "x" * 60)
+
+
+def test_get_snapshots_to_prune():
+    snapshots = [{'name': 'a', 'created': '2024-01-01T00:00:00'}, {'name': 'c', 'created': '2024-03-01T00:00:00'},
+                 {'name': 'b', 'created': '2024-02-01T00:00:00'}]
+    assert [snapshot['name'] for snapshot in get_snapshots_to_prune(snapshots, 1)] == ['b', 'a']
+    assert get_snapshots_to_prune(snapshots, 5) == []
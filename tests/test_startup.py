@@ -0,0 +1,20 @@
+import subprocess
+import sys
+
+from bloat_my_db.utilities import script_intro_title
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+
+def test_main_imports_no_command_modules():
+    # run in a fresh interpreter, the other tests have already imported everything
+    script = "import sys, bloat_my_db.main; print(sorted(name for name in ('numpy', 'psycopg2', 'faker', 'pandas', 'pyfiglet', 'tabulate') if name in sys.modules))"
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
+
+
+def test_no_banner_when_not_a_tty(capsys):
+    script_intro_title()
+    assert capsys.readouterr().out == ""
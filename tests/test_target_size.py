@@ -0,0 +1,38 @@
+import pytest
+
+from bloat_my_db.data_bloaters.target_size import parse_size, format_size, get_target_rows
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+
+def test_parse_size():
+    assert parse_size("200GB") == 200 * 1024 ** 3
+    assert parse_size("1.5tb") == int(1.5 * 1024 ** 4)
+    assert parse_size("500M") == 500 * 1024 ** 2
+    assert parse_size("4096") == 4096
+    with pytest.raises(ValueError):
+        parse_size("200 parsecs")
+    with pytest.raises(ValueError):
+        parse_size("GB")
+
+
+def test_format_size():
+    assert format_size(150 * 1024 ** 2) == "150.0 MB"
+    assert format_size(512) == "512 B"
+
+
+def test_target_rows_fill_the_remaining_bytes():
+    rows = get_target_rows(1000000, {"users": 100, "orders": 150})
+    assert rows == {"users": 4000, "orders": 4000}
+    assert rows["users"] * 100 + rows["orders"] * 150 <= 1000000
+
+
+def test_target_rows_follow_the_weights():
+    rows = get_target_rows(1000000, {"orders": 100, "order_items": 50}, weights={"orders": 1, "order_items": 10})
+    assert rows == {"orders": 1666, "order_items": 16666}
+
+
+def test_no_rows_once_the_target_is_reached():
+    assert get_target_rows(-5, {"users": 100}) == {"users": 0}
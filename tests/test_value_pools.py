@@ -0,0 +1,47 @@
+import numpy as np
+
+from bloat_my_db.randoms.value_pools import ValuePools, get_semantic_type
+
+__author__ = "Jason R Alexander"
+__copyright__ = "Jason R Alexander"
+__license__ = "MIT"
+
+
+def test_get_semantic_type():
+    assert get_semantic_type("FirstName") == "first_name"
+    assert get_semantic_type("phone_number") == "phone_number"
+    assert get_semantic_type("description") is None
+
+
+def test_value_pool_is_cached(tmp_path):
+    value_pools = ValuePools(pool_size=200, cache_directory=str(tmp_path))
+    pool = value_pools.get_pool("last_name")
+    assert len(pool) == len(set(pool))
+    assert len(list(tmp_path.iterdir())) == 1
+    assert list(ValuePools(pool_size=200, cache_directory=str(tmp_path)).get_pool("last_name")) == list(pool)
+
+
+def test_take_unique(tmp_path):
+    value_pools = ValuePools(pool_size=50, cache_directory=str(tmp_path))
+    pool_length = len(value_pools.get_pool("uri"))
+    permutation = value_pools.get_permutation("uri", np.random.default_rng(1))
+    values = np.concatenate([value_pools.take_unique("uri", permutation, start, 20) for start in range(0, pool_length * 3, 20)])
+    assert len(values) == len(set(values))
+    assert values.dtype.kind == "U"
+
+
+def test_take_unique_leaves_room_for_the_pass_number(tmp_path):
+    value_pools = ValuePools(pool_size=50, cache_directory=str(tmp_path))
+    pool = value_pools.get_pool("uri")
+    max_length = int(np.char.str_len(pool).max())
+    permutation = value_pools.get_permutation("uri", np.random.default_rng(1))
+    values = value_pools.take_unique("uri", permutation, 0, len(pool) * 12, max_length=max_length)
+    assert int(np.char.str_len(values).max()) <= max_length
+    assert list(values[:len(pool)]) == list(pool[permutation])
+    assert len(values) == len(set(values))
+
+
+def test_value_pool_is_seeded(tmp_path):
+    first = ValuePools(pool_size=100, cache_directory=str(tmp_path / "first")).get_pool("first_name")
+    second = ValuePools(pool_size=100, cache_directory=str(tmp_path / "second")).get_pool("first_name")
+    assert list(first) == list(second)